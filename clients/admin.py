@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Client, DebtPayment
+from .models import Client, DebtLedgerEntry, DebtPayment
 
 
 @admin.register(Client)
@@ -16,3 +16,26 @@ class DebtPaymentAdmin(admin.ModelAdmin):
     search_fields = ['client__name', 'note']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at']
+
+
+@admin.register(DebtLedgerEntry)
+class DebtLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['client', 'amount', 'kind', 'created_at', 'note']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['client__name', 'note']
+    list_select_related = ['client']
+    readonly_fields = [
+        'client',
+        'amount',
+        'kind',
+        'payment',
+        'note',
+        'created_at',
+    ]
+
+    def has_add_permission(self, request):
+        # Lançamentos são gerados pela aplicação (somente inclusão)
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
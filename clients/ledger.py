@@ -0,0 +1,165 @@
+"""
+Extrato de dívidas dos clientes (DebtLedgerEntry).
+
+A dívida do cliente é a dívida inicial mais os pagamentos fiados ainda não
+quitados. Em vez de recalcular essa soma a cada operação, cada mudança grava
+um lançamento e aplica o mesmo delta em Client.client_debts com F().
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+from .models import Client, DebtLedgerEntry
+
+
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _invalidate_dashboard():
+    # client_debts muda por UPDATE, sem post_save de Client
+    from dashboard.fragments import invalidate_fragments
+
+    invalidate_fragments('kpis')
+
+
+def record_debt(client_id, amount, kind, payment=None, note=''):
+    """Registra um lançamento e soma o valor na dívida do cliente"""
+    if not client_id or not amount:
+        return None
+    with transaction.atomic():
+        entry = DebtLedgerEntry.objects.create(
+            client_id=client_id,
+            amount=amount,
+            kind=kind,
+            payment=payment,
+            note=note,
+        )
+        Client.objects.filter(pk=client_id).update(
+            client_debts=F('client_debts') + amount
+        )
+        _invalidate_dashboard()
+    return entry
+
+
+def record_debts(entries):
+    """
+    Registra vários lançamentos (DebtLedgerEntry não salvos) de uma vez:
+    um INSERT em lote e um UPDATE por cliente.
+    """
+    entries = [entry for entry in entries if entry.amount]
+    if not entries:
+        return []
+    totals = defaultdict(Decimal)
+    for entry in entries:
+        totals[entry.client_id] += entry.amount
+    with transaction.atomic():
+        DebtLedgerEntry.objects.bulk_create(entries)
+        for client_id, amount in totals.items():
+            Client.objects.filter(pk=client_id).update(
+                client_debts=F('client_debts') + amount
+            )
+        _invalidate_dashboard()
+    return entries
+
+
+def record_payment_debt(payment, amount, kind=DebtLedgerEntry.KIND_FIADO):
+    """Lançamento de um pagamento fiado na conta do cliente da venda"""
+    from sales.models import Sale
+
+    if not amount:
+        return None
+    client_id = (
+        Sale.objects.filter(pk=payment.sale_id)
+        .values_list('client_id', flat=True)
+        .first()
+    )
+    return record_debt(
+        client_id,
+        amount,
+        kind,
+        payment=payment if payment.pk else None,
+        note=f'Venda #{payment.sale_id}',
+    )
+
+
+def expected_debt():
+    """Dívida recalculada do zero: inicial + pagamentos fiados"""
+    from sales.models import Payment
+
+    fiado = (
+        Payment.objects.fiado()
+        .filter(sale__client=OuterRef('pk'))
+        .values('sale__client')
+        # Arredondado aos centavos: no SQLite a soma é feita em ponto
+        # flutuante (0.10 + 0.20 - 0.10 - 0.20 = 2.78e-17)
+        .annotate(total=Round(Sum('amount'), 2))
+        .values('total')
+    )
+    return Round(
+        Coalesce(F('initial_debt'), Value(ZERO))
+        + Coalesce(Subquery(fiado, output_field=MONEY), Value(ZERO)),
+        2,
+        output_field=MONEY,
+    )
+
+
+def ledger_balance():
+    """Soma dos lançamentos do extrato de cada cliente"""
+    entries = (
+        DebtLedgerEntry.objects.filter(client=OuterRef('pk'))
+        .values('client')
+        .annotate(total=Round(Sum('amount'), 2))
+        .values('total')
+    )
+    return Coalesce(Subquery(entries, output_field=MONEY), Value(ZERO))
+
+
+def debt_discrepancies():
+    """Clientes cujo saldo ou extrato não bate com a dívida recalculada"""
+    return (
+        Client.objects.annotate(
+            expected_debt=expected_debt(),
+            ledger_total=ledger_balance(),
+            # client_debts recebe deltas com F(), que o SQLite também soma
+            # em ponto flutuante
+            rounded_debts=Round('client_debts', 2, output_field=MONEY),
+        )
+        .exclude(
+            rounded_debts=F('expected_debt'),
+            ledger_total=F('expected_debt'),
+        )
+        .order_by('pk')
+    )
+
+
+def reconcile_client(client_id):
+    """
+    Acerta o extrato e o saldo de um cliente: lança a diferença do extrato
+    como ajuste e grava a dívida recalculada. Retorna o ajuste lançado.
+    """
+    with transaction.atomic():
+        client = (
+            Client.objects.select_for_update()
+            .annotate(
+                expected_debt=expected_debt(), ledger_total=ledger_balance()
+            )
+            .get(pk=client_id)
+        )
+        difference = client.expected_debt - client.ledger_total
+        if difference:
+            DebtLedgerEntry.objects.create(
+                client=client,
+                amount=difference,
+                kind=DebtLedgerEntry.KIND_ADJUSTMENT,
+                note='Conciliação automática',
+            )
+        Client.objects.filter(pk=client_id).update(
+            client_debts=client.expected_debt
+        )
+        _invalidate_dashboard()
+    return difference
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from clients.ledger import debt_discrepancies, reconcile_client
+
+
+class Command(BaseCommand):
+    help = (
+        'Confere a dívida de cada cliente (client_debts) e o extrato de '
+        'dívidas com a dívida recalculada (inicial + pagamentos fiados). '
+        'Use --fix para lançar ajustes e corrigir os saldos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Corrige os clientes com divergência.',
+        )
+
+    def handle(self, *args, **options):
+        divergent = list(
+            debt_discrepancies().values_list(
+                'pk', 'name', 'client_debts', 'ledger_total', 'expected_debt'
+            )
+        )
+        for pk, name, debts, ledger, expected in divergent:
+            self.stdout.write(
+                f'Cliente #{pk} ({name}): saldo {debts}, extrato {ledger}, '
+                f'esperado {expected}'
+            )
+
+        if not divergent:
+            self.stdout.write(
+                self.style.SUCCESS('Todas as dívidas conferem.')
+            )
+            return
+
+        if not options['fix']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{len(divergent)} cliente(s) com divergência. '
+                    f'Execute novamente com --fix para corrigir.'
+                )
+            )
+            return
+
+        for pk, *_ in divergent:
+            reconcile_client(pk)
+        self.stdout.write(
+            self.style.SUCCESS(f'{len(divergent)} cliente(s) corrigido(s).')
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='debtpayment',
+            index=models.Index(fields=['created_at'], name='debtpayment_created_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:53
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Lower
+
+
+def open_debt_ledger(apps, schema_editor):
+    """
+    Saldo de abertura do extrato: a dívida recalculada (inicial + fiados)
+    de cada cliente, que também passa a ser o client_debts.
+    """
+    Client = apps.get_model('clients', 'Client')
+    Payment = apps.get_model('sales', 'Payment')
+    DebtLedgerEntry = apps.get_model('clients', 'DebtLedgerEntry')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    zero = Value(Decimal('0.00'))
+
+    fiado = (
+        Payment.objects.annotate(method_lower=Lower('method'))
+        .filter(method_lower='fiado', sale__client=OuterRef('pk'))
+        .values('sale__client')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    Client.objects.update(
+        client_debts=Coalesce(F('initial_debt'), zero)
+        + Coalesce(Subquery(fiado, output_field=money), zero)
+    )
+    DebtLedgerEntry.objects.bulk_create(
+        [
+            DebtLedgerEntry(
+                client_id=client_id,
+                amount=debt,
+                kind='opening',
+                note='Saldo de abertura',
+            )
+            for client_id, debt in Client.objects.exclude(
+                client_debts=0
+            ).values_list('pk', 'client_debts')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_hot_filter_indexes'),
+        ('sales', '0003_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor')),
+                ('kind', models.CharField(choices=[('opening', 'Saldo de abertura'), ('initial', 'Dívida inicial'), ('fiado', 'Compra fiada'), ('settlement', 'Quitação'), ('reversal', 'Estorno'), ('adjustment', 'Ajuste de conciliação')], max_length=20, verbose_name='Tipo')),
+                ('note', models.CharField(blank=True, max_length=255, verbose_name='Observação')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='debt_ledger', to='clients.client', verbose_name='Cliente')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='debt_entries', to='sales.payment', verbose_name='Pagamento')),
+            ],
+            options={
+                'verbose_name': 'Lançamento de Dívida',
+                'verbose_name_plural': 'Extrato de Dívidas',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['client', 'created_at'], name='debtledger_client_created_idx')],
+            },
+        ),
+        migrations.RunPython(open_debt_ledger, migrations.RunPython.noop),
+    ]
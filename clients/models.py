@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 
 class Client(models.Model):
@@ -39,9 +39,27 @@ class Client(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        creating = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creating and self.initial_debt:
+                # client_debts já nasce com a dívida inicial; só registra
+                # o lançamento correspondente no extrato
+                DebtLedgerEntry.objects.create(
+                    client=self,
+                    amount=self.initial_debt,
+                    kind=DebtLedgerEntry.KIND_INITIAL,
+                    note='Dívida inicial no cadastro',
+                )
+
 
 class DebtPayment(models.Model):
-    """Registra quitações de dívidas iniciais dos clientes"""
+    """
+    Registra quitações de dívidas iniciais dos clientes.
+
+    Ao ser criada, abate o valor da dívida inicial e da dívida do cliente.
+    """
     client = models.ForeignKey(
         Client,
         on_delete=models.CASCADE,
@@ -68,6 +86,100 @@ class DebtPayment(models.Model):
         verbose_name = 'Quitação de Dívida'
         verbose_name_plural = 'Quitações de Dívidas'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['created_at'], name='debtpayment_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'R$ {self.amount} - {self.client.name} - {self.created_at.strftime("%d/%m/%Y")}'
+
+    def save(self, *args, **kwargs):
+        creating = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creating:
+                # Quitações entram no total de vendas do dia
+                from dashboard.rollups import apply_debt_payment
+
+                from .ledger import record_debt
+
+                apply_debt_payment(self)
+                Client.objects.filter(pk=self.client_id).update(
+                    initial_debt=models.F('initial_debt') - self.amount
+                )
+                record_debt(
+                    self.client_id,
+                    -self.amount,
+                    DebtLedgerEntry.KIND_SETTLEMENT,
+                    note=self.note or 'Quitação de dívida inicial',
+                )
+
+
+class DebtLedgerEntry(models.Model):
+    """
+    Lançamento do extrato de dívidas do cliente (somente inclusão).
+
+    Cada alteração da dívida gera um lançamento com o valor assinado (positivo
+    aumenta a dívida) e o mesmo valor é somado em Client.client_debts, sem
+    recalcular o histórico. `manage.py reconcile_client_debts` confere o
+    extrato e o saldo com os pagamentos fiados.
+    """
+
+    KIND_OPENING = 'opening'
+    KIND_INITIAL = 'initial'
+    KIND_FIADO = 'fiado'
+    KIND_SETTLEMENT = 'settlement'
+    KIND_REVERSAL = 'reversal'
+    KIND_ADJUSTMENT = 'adjustment'
+
+    KIND_CHOICES = [
+        (KIND_OPENING, 'Saldo de abertura'),
+        (KIND_INITIAL, 'Dívida inicial'),
+        (KIND_FIADO, 'Compra fiada'),
+        (KIND_SETTLEMENT, 'Quitação'),
+        (KIND_REVERSAL, 'Estorno'),
+        (KIND_ADJUSTMENT, 'Ajuste de conciliação'),
+    ]
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='debt_ledger',
+        verbose_name='Cliente',
+    )
+    amount = models.DecimalField(
+        max_digits=12, decimal_places=2, verbose_name='Valor'
+    )
+    kind = models.CharField(
+        max_length=20, choices=KIND_CHOICES, verbose_name='Tipo'
+    )
+    payment = models.ForeignKey(
+        'sales.Payment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='debt_entries',
+        verbose_name='Pagamento',
+    )
+    note = models.CharField(
+        max_length=255, blank=True, verbose_name='Observação'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Data'
+    )
+
+    class Meta:
+        verbose_name = 'Lançamento de Dívida'
+        verbose_name_plural = 'Extrato de Dívidas'
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['client', 'created_at'],
+                name='debtledger_client_created_idx',
+            ),
+        ]
 
     def __str__(self):
-        return f'R$ {self.amount} - {self.client.name} - {self.created_at.strftime("%d/%m/%Y")}'
\ No newline at end of file
+        return f'{self.client} {self.amount:+} ({self.get_kind_display()})'
@@ -0,0 +1,155 @@
+"""
+Quitação de dívidas de clientes com operações em conjunto.
+
+Os pagamentos fiados são quitados do mais antigo para o mais novo. A soma
+acumulada que encontra o ponto de corte é feita em Decimal sobre (pk,
+valor) dos pagamentos: no SQLite uma window function somaria em ponto
+flutuante (0.10 + 0.20 > 0.30) e erraria a fronteira. Os pagamentos
+totalmente cobertos mudam para "quitado" em um único UPDATE e o pagamento
+da fronteira é dividido (UPDATE do valor + novo pagamento quitado). O que
+sobrar do valor abate a dívida inicial (DebtPayment).
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+
+from .ledger import record_debt
+from .models import Client, DebtLedgerEntry, DebtPayment
+
+
+ZERO = Decimal('0.00')
+SETTLED_METHOD = 'quitado'
+
+
+@dataclass
+class Settlement:
+    """Resultado de uma quitação"""
+
+    amount: Decimal = ZERO
+    fiado_cleared: Decimal = ZERO
+    initial_cleared: Decimal = ZERO
+    payments_settled: int = 0
+    split_payment_id: int = None
+
+
+class SettlementError(ValueError):
+    pass
+
+
+def _fiado_payments(client):
+    """(pk, venda, valor) dos pagamentos fiados, do mais antigo ao mais novo"""
+    from sales.models import Payment
+
+    return list(
+        Payment.objects.fiado()
+        .filter(sale__client=client)
+        .order_by('created_at', 'id')
+        .values_list('pk', 'sale_id', 'amount')
+    )
+
+
+def _split_at(payments, amount):
+    """
+    Pagamentos cobertos inteiramente por `amount` e o da fronteira (ou
+    None), com o total dos cobertos.
+    """
+    covered, running = [], ZERO
+    for payment in payments:
+        if running + payment[2] > amount:
+            return covered, payment, running
+        covered.append(payment[0])
+        running += payment[2]
+    return covered, None, running
+
+
+def settle_client_debt(client_id, amount=None):
+    """
+    Quita `amount` da dívida do cliente (toda a dívida se None).
+
+    Levanta SettlementError se o valor for maior que a dívida.
+    """
+    from sales.models import Payment
+
+    with transaction.atomic():
+        # Serializa quitações simultâneas do mesmo cliente
+        client = Client.objects.select_for_update().get(pk=client_id)
+        payments = _fiado_payments(client)
+
+        total_fiado = sum(
+            (payment_amount for _, _, payment_amount in payments), ZERO
+        ).quantize(Decimal('0.01'))
+        initial_debt = (client.initial_debt or ZERO).quantize(Decimal('0.01'))
+        total_debt = initial_debt + total_fiado
+
+        if amount is None:
+            amount = total_debt
+        elif amount > total_debt:
+            raise SettlementError(
+                f'O valor informado (R$ {amount:.2f}) é maior que a dívida '
+                f'total (R$ {total_debt:.2f}).'
+            )
+
+        settlement = Settlement(amount=amount)
+        to_fiado = min(amount, total_fiado)
+
+        if to_fiado > 0:
+            covered, boundary, cleared = _split_at(payments, to_fiado)
+
+            # Pagamentos inteiramente cobertos: um único UPDATE
+            settlement.payments_settled = Payment.objects.filter(
+                pk__in=covered
+            ).update(method=SETTLED_METHOD)
+
+            # Pagamento da fronteira: cobre só uma parte
+            if boundary is not None:
+                pk, sale_id, payment_amount = boundary
+                part = to_fiado - cleared
+                if part > 0:
+                    # O pagamento fiado diminui e um quitado de mesmo valor
+                    # entra na mesma venda: o total pago não muda
+                    Payment.objects.filter(pk=pk).update(
+                        amount=payment_amount - part
+                    )
+                    Payment.objects.bulk_create(
+                        [
+                            Payment(
+                                sale_id=sale_id,
+                                amount=part,
+                                method=SETTLED_METHOD,
+                                note=(
+                                    f'Quitação parcial (original: R$ '
+                                    f'{payment_amount})'
+                                ),
+                            )
+                        ]
+                    )
+                    settlement.split_payment_id = pk
+                    cleared += part
+
+            settlement.fiado_cleared = cleared
+            note = (
+                f'Quitação de {settlement.payments_settled} pagamento(s) '
+                f'fiado(s)'
+            )
+            if settlement.split_payment_id:
+                note += ' e parte de outro'
+            record_debt(
+                client.pk,
+                -cleared,
+                DebtLedgerEntry.KIND_SETTLEMENT,
+                note=note,
+            )
+
+        # O restante abate a dívida inicial
+        to_initial = min(amount - settlement.fiado_cleared, initial_debt)
+        if to_initial > 0:
+            DebtPayment.objects.create(
+                client=client,
+                amount=to_initial,
+                note='Quitação de dívida inicial',
+            )
+            settlement.initial_cleared = to_initial
+
+    return settlement
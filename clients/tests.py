@@ -1,3 +1,143 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from clients.ledger import debt_discrepancies, reconcile_client
+from clients.models import Client, DebtLedgerEntry
+from clients.settlement import SettlementError, settle_client_debt
+from sales.models import Payment, Sale
+
+
+class SettleClientDebtTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(
+            name='Cliente', phone_number='11999999999'
+        )
+        self.sale = Sale.objects.create(client=self.client_obj)
+
+    def fiado(self, amount):
+        return Payment.objects.create(
+            sale=self.sale, amount=Decimal(amount), method='fiado'
+        )
+
+    def debt(self):
+        self.client_obj.refresh_from_db()
+        return self.client_obj.client_debts
+
+    def test_settles_payments_whose_float_sum_exceeds_amount(self):
+        # 0.10 + 0.20 em ponto flutuante é 0.30000000000000004
+        first, second = self.fiado('0.10'), self.fiado('0.20')
+
+        settlement = settle_client_debt(self.client_obj.pk, Decimal('0.30'))
+
+        self.assertEqual(settlement.payments_settled, 2)
+        self.assertIsNone(settlement.split_payment_id)
+        self.assertEqual(settlement.fiado_cleared, Decimal('0.30'))
+        for payment in (first, second):
+            payment.refresh_from_db()
+            self.assertEqual(payment.method, 'quitado')
+        self.assertEqual(self.debt(), Decimal('0.00'))
+
+    def test_stops_before_payment_beyond_amount(self):
+        self.fiado('0.10')
+        self.fiado('0.20')
+        last = self.fiado('0.40')
+
+        settle_client_debt(self.client_obj.pk, Decimal('0.30'))
+
+        last.refresh_from_db()
+        self.assertEqual(last.method, 'fiado')
+        self.assertEqual(last.amount, Decimal('0.40'))
+        self.assertEqual(self.debt(), Decimal('0.40'))
+
+    def test_splits_boundary_payment(self):
+        self.fiado('0.10')
+        second = self.fiado('0.20')
+
+        settlement = settle_client_debt(self.client_obj.pk, Decimal('0.25'))
+
+        self.assertEqual(settlement.payments_settled, 1)
+        self.assertEqual(settlement.split_payment_id, second.pk)
+        second.refresh_from_db()
+        self.assertEqual(second.method, 'fiado')
+        self.assertEqual(second.amount, Decimal('0.05'))
+        settled = Payment.objects.filter(sale=self.sale, method='quitado')
+        self.assertEqual(
+            sorted(payment.amount for payment in settled),
+            [Decimal('0.10'), Decimal('0.15')],
+        )
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.paid_amount, Decimal('0.30'))
+        self.assertEqual(self.debt(), Decimal('0.05'))
+
+    def test_remainder_clears_initial_debt(self):
+        Client.objects.filter(pk=self.client_obj.pk).update(
+            initial_debt=Decimal('1.00'), client_debts=Decimal('1.00')
+        )
+        self.fiado('0.10')
+        self.fiado('0.20')
+
+        settlement = settle_client_debt(self.client_obj.pk, Decimal('0.70'))
+
+        self.assertEqual(settlement.fiado_cleared, Decimal('0.30'))
+        self.assertEqual(settlement.initial_cleared, Decimal('0.40'))
+        self.assertEqual(self.debt(), Decimal('0.60'))
+
+    def test_rejects_amount_above_debt(self):
+        self.fiado('0.10')
+
+        with self.assertRaises(SettlementError):
+            settle_client_debt(self.client_obj.pk, Decimal('0.11'))
+        self.assertEqual(self.debt(), Decimal('0.10'))
+
+
+
+class LedgerReconciliationTests(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(
+            name='Cliente', phone_number='11999999999'
+        )
+        self.sale = Sale.objects.create(client=self.client_obj)
+
+    def fiado(self, amount):
+        return Payment.objects.create(
+            sale=self.sale, amount=Decimal(amount), method='fiado'
+        )
+
+    def test_deleted_cent_payments_are_not_divergent(self):
+        # No SQLite 0.10 + 0.20 - 0.10 - 0.20 soma 2.78e-17
+        payments = [self.fiado('0.10'), self.fiado('0.20')]
+        self.assertFalse(debt_discrepancies().exists())
+
+        for payment in payments:
+            payment.delete()
+
+        self.assertFalse(debt_discrepancies().exists())
+        self.assertEqual(reconcile_client(self.client_obj.pk), 0)
+        self.assertFalse(
+            DebtLedgerEntry.objects.filter(
+                kind=DebtLedgerEntry.KIND_ADJUSTMENT
+            ).exists()
+        )
+
+    def test_reconcile_fixes_balance_and_ledger(self):
+        self.fiado('0.10')
+        self.fiado('0.20')
+        # Alteração por fora do extrato
+        Payment.objects.filter(amount=Decimal('0.20')).update(
+            amount=Decimal('0.50')
+        )
+        Client.objects.filter(pk=self.client_obj.pk).update(
+            client_debts=Decimal('9.99')
+        )
+        self.assertEqual(
+            list(debt_discrepancies().values_list('pk', flat=True)),
+            [self.client_obj.pk],
+        )
+
+        difference = reconcile_client(self.client_obj.pk)
+
+        self.assertEqual(difference, Decimal('0.30'))
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.client_debts, Decimal('0.60'))
+        self.assertFalse(debt_discrepancies().exists())
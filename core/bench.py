@@ -0,0 +1,487 @@
+"""
+Benchmark das principais views (`manage.py bench`).
+
+Gera uma base sintética (clientes, produtos e anos de vendas com itens,
+pagamentos e quitações) e mede, para cada cenário, o tempo de resposta e o
+número de consultas SQL. A primeira execução de cada cenário é medida à
+parte (caches vazios); as demais dão mínimo, mediana e máximo.
+
+A base é gravada com bulk_create e os dados derivados (extrato de dívidas,
+histórico de estoque, resumos diários) são recalculados no final pelas
+mesmas rotinas de conciliação usadas em produção.
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import Client as TestClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+
+BENCH_USERNAME = 'bench'
+SEED_BATCH_SIZE = 2000
+CENTS = Decimal('0.01')
+
+
+@dataclass
+class DatasetSize:
+    clients: int = 200
+    products: int = 2000
+    years: int = 2
+    sales_per_day: int = 30
+    items_per_sale: int = 3
+    seed: int = 1
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    status: int = 0
+    queries: int = 0
+    cold_ms: float = 0.0
+    min_ms: float = 0.0
+    median_ms: float = 0.0
+    max_ms: float = 0.0
+    runs: int = 0
+    skipped: str = ''
+
+
+@dataclass
+class Scenario:
+    """`request(client, arg)` é medido; `setup()` prepara `arg` fora dele"""
+
+    name: str
+    request: object
+    setup: object = None
+
+
+@contextmanager
+def _manual_timestamps(*models):
+    """Permite gravar created_at/updated_at do histórico sintético"""
+    fields = [
+        model_field
+        for model in models
+        for model_field in model._meta.fields
+        if getattr(model_field, 'auto_now_add', False)
+        or getattr(model_field, 'auto_now', False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for model_field in fields:
+        model_field.auto_now = model_field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for model_field, auto_now, auto_now_add in saved:
+            model_field.auto_now = auto_now
+            model_field.auto_now_add = auto_now_add
+
+
+def _money(value):
+    return Decimal(value).quantize(CENTS)
+
+
+def _seed_products(size, rng, now):
+    from products.models import Product
+    from products.search import normalize
+
+    categories = [value for value, _ in Product.Category.choices]
+    words = ['Camisa', 'Calça', 'Boné', 'Tênis', 'Bermuda', 'Vestido']
+    colors = ['Azul', 'Preto', 'Branco', 'Verde', 'Estampado', 'Jeans']
+    products = []
+    for index in range(size.products):
+        name = f'{rng.choice(words)} {rng.choice(colors)} {index:05d}'
+        cost = _money(rng.uniform(5, 80))
+        products.append(
+            Product(
+                name=name,
+                search_name=normalize(name),
+                category=rng.choice(categories),
+                cost_price=cost,
+                sale_price=_money(cost * Decimal('1.8')),
+                # Estoque alto: os cenários nunca esbarram em falta
+                quantity=rng.randint(10_000, 20_000),
+                low_quantity=5,
+                created_at=now,
+                updated_at=now,
+            )
+        )
+    with _manual_timestamps(Product):
+        Product.objects.bulk_create(products, batch_size=SEED_BATCH_SIZE)
+    return [(product.pk, product.sale_price) for product in products]
+
+
+def _seed_clients(size, rng, now):
+    from clients.models import Client, DebtPayment
+
+    clients, debt_payments = [], []
+    first_day = now - timedelta(days=365 * size.years)
+    for index in range(size.clients):
+        opening = _money(rng.choice([0, 0, 0, 50, 120, 300]))
+        paid = []
+        if opening:
+            for _ in range(rng.randint(0, 2)):
+                amount = _money(opening / 4)
+                when = first_day + timedelta(
+                    seconds=rng.randint(0, 365 * size.years * 86400)
+                )
+                paid.append((amount, when))
+        remaining = opening - sum(amount for amount, _ in paid)
+        client = Client(
+            name=f'Cliente {index:05d}',
+            phone_number=f'11 9{index:08d}',
+            initial_debt=remaining,
+            client_debts=remaining,
+            created_at=first_day,
+            updated_at=first_day,
+        )
+        clients.append(client)
+        debt_payments.append((client, paid))
+
+    with _manual_timestamps(Client, DebtPayment):
+        Client.objects.bulk_create(clients, batch_size=SEED_BATCH_SIZE)
+        DebtPayment.objects.bulk_create(
+            [
+                DebtPayment(
+                    client=client,
+                    amount=amount,
+                    note='Quitação (bench)',
+                    created_at=when,
+                )
+                for client, paid in debt_payments
+                for amount, when in paid
+            ],
+            batch_size=SEED_BATCH_SIZE,
+        )
+    return [client.pk for client in clients]
+
+
+def _seed_sales(size, rng, now, products, client_ids):
+    from sales.models import Payment, Sale, SaleItem
+
+    days = 365 * size.years
+    total_sales = days * size.sales_per_day
+    created = 0
+    with _manual_timestamps(Sale, Payment):
+        while created < total_sales:
+            count = min(SEED_BATCH_SIZE, total_sales - created)
+            sales, lines = [], []
+            for offset in range(count):
+                position = created + offset
+                when = now - timedelta(
+                    days=days - 1 - position // size.sales_per_day,
+                    seconds=rng.randint(0, 12 * 3600),
+                )
+                # Vendas abertas só nos últimos dias
+                roll = rng.random()
+                if roll < 0.1:
+                    status = Sale.STATUS_CANCELLED
+                elif roll < 0.13 and now - when < timedelta(days=3):
+                    status = Sale.STATUS_OPEN
+                else:
+                    status = Sale.STATUS_FINALIZED
+                client_id = (
+                    rng.choice(client_ids)
+                    if client_ids and rng.random() < 0.6
+                    else None
+                )
+                items = [
+                    (pk, price, rng.randint(1, 3))
+                    for pk, price in rng.sample(
+                        products, min(size.items_per_sale, len(products))
+                    )
+                ]
+                total = sum(price * qty for _, price, qty in items)
+                payments = []
+                if status == Sale.STATUS_FINALIZED:
+                    if client_id and rng.random() < 0.3:
+                        payments.append(('fiado', total))
+                    else:
+                        payments.append(
+                            (rng.choice(['pix', 'cash', 'card']), total)
+                        )
+                sales.append(
+                    Sale(
+                        client_id=client_id,
+                        client_name='' if client_id else 'Avulso',
+                        status=status,
+                        created_at=when,
+                        updated_at=when,
+                        total_amount=total,
+                        paid_amount=sum(amount for _, amount in payments),
+                    )
+                )
+                lines.append((items, payments, when))
+
+            Sale.objects.bulk_create(sales)
+            SaleItem.objects.bulk_create(
+                [
+                    SaleItem(
+                        sale_id=sale.pk,
+                        product_id=pk,
+                        price=price,
+                        quantity=qty,
+                    )
+                    for sale, (items, _, _) in zip(sales, lines)
+                    for pk, price, qty in items
+                ],
+                batch_size=SEED_BATCH_SIZE,
+            )
+            Payment.objects.bulk_create(
+                [
+                    Payment(
+                        sale_id=sale.pk,
+                        method=method,
+                        amount=amount,
+                        created_at=when,
+                    )
+                    for sale, (_, payments, when) in zip(sales, lines)
+                    for method, amount in payments
+                ],
+                batch_size=SEED_BATCH_SIZE,
+            )
+            created += count
+    return created
+
+
+def seed_dataset(size, stdout=None):
+    """Grava a base sintética e recalcula os dados derivados"""
+    from django.contrib.auth.models import User
+
+    from clients.ledger import debt_discrepancies, reconcile_client
+    from dashboard.rollups import rebuild_rollups
+    from products.inventory import reconcile_stock
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    rng = random.Random(size.seed)
+    now = timezone.now()
+    with transaction.atomic():
+        if not User.objects.filter(username=BENCH_USERNAME).exists():
+            User.objects.create_superuser(BENCH_USERNAME, '', BENCH_USERNAME)
+        products = _seed_products(size, rng, now)
+        client_ids = _seed_clients(size, rng, now)
+        log(f'{len(products)} produtos e {len(client_ids)} clientes.')
+        sales = _seed_sales(size, rng, now, products, client_ids)
+        log(f'{sales} vendas.')
+
+        # Extrato de dívidas, histórico de estoque e resumos diários
+        for client_id in debt_discrepancies().values_list('pk', flat=True):
+            reconcile_client(client_id)
+        reconcile_stock()
+        rebuild_rollups()
+    log('Dados derivados recalculados.')
+
+
+def _clear_caches():
+    """Caches do Django e dos processos vazios (execução fria)"""
+    from dashboard.charts import chart_cache
+    from products.catalog import catalog
+
+    for alias in settings.CACHES:
+        caches[alias].clear()
+    chart_cache.clear()
+    catalog.versions = None
+
+
+def _open_sale_with_item():
+    from products.models import Product
+    from sales.models import Sale
+
+    sale = Sale.objects.create(client_name='Bench')
+    product_id = (
+        Product.objects.filter(is_active=True, quantity__gt=10)
+        .values_list('pk', flat=True)
+        .first()
+    )
+    sale.add_items({product_id: 2})
+    sale.refresh_from_db()
+    return sale
+
+
+def scenarios():
+    """Cenários medidos, na ordem do relatório"""
+    from clients.models import Client
+    from products.models import Product
+    from sales.models import Sale
+
+    def sale_to_show():
+        return (
+            Sale.objects.filter(status=Sale.STATUS_FINALIZED)
+            .order_by('-created_at')
+            .values_list('pk', flat=True)
+            .first()
+        )
+
+    def product_to_add():
+        return (
+            Sale.objects.create(client_name='Bench').pk,
+            Product.objects.filter(is_active=True, quantity__gt=10)
+            .values_list('pk', flat=True)
+            .first(),
+        )
+
+    def indebted_client():
+        # Cada execução quita um cliente diferente, do maior devedor
+        return (
+            Client.objects.filter(client_debts__gt=0)
+            .order_by('-client_debts')
+            .values_list('pk', flat=True)
+            .first()
+        )
+
+    last_year = {
+        'start_date': (timezone.localdate() - timedelta(days=365)).isoformat(),
+        'end_date': timezone.localdate().isoformat(),
+    }
+
+    def run_pdf_job(client, job_id):
+        from dashboard.jobs import run_report_job
+
+        job = run_report_job(job_id)
+        return 200 if job and job.status == job.STATUS_DONE else 500
+
+    def new_pdf_job():
+        from dashboard.models import ReportJob
+
+        end = timezone.now()
+        return ReportJob.objects.create(
+            start_date=end - timedelta(days=30), end_date=end
+        ).pk
+
+    return [
+        Scenario('dashboard_view', lambda c, _: c.get(reverse('dashboard'))),
+        Scenario(
+            'generate_report_data',
+            lambda c, _: c.get(reverse('generate_report_data')),
+        ),
+        Scenario(
+            'generate_report_data_year',
+            lambda c, _: c.get(reverse('generate_report_data'), last_year),
+        ),
+        Scenario(
+            'generate_report_pdf',
+            lambda c, _: c.get(reverse('generate_report_pdf')),
+        ),
+        Scenario('report_pdf_build', run_pdf_job, setup=new_pdf_job),
+        Scenario('sale_list', lambda c, _: c.get(reverse('sale_list'))),
+        Scenario(
+            'sale_detail',
+            lambda c, pk: c.get(reverse('sale_detail', args=[pk])),
+            setup=sale_to_show,
+        ),
+        Scenario(
+            'add_item',
+            lambda c, arg: c.post(
+                reverse('add_item', args=[arg[0]]),
+                {'product_id': arg[1], 'quantity': 1},
+            ),
+            setup=product_to_add,
+        ),
+        Scenario(
+            'pay_sale',
+            lambda c, sale: c.post(
+                reverse('pay_sale', args=[sale.pk]),
+                {'amount': str(sale.balance), 'method': 'pix'},
+            ),
+            setup=_open_sale_with_item,
+        ),
+        Scenario('client_list', lambda c, _: c.get(reverse('client_list'))),
+        Scenario(
+            'client_clear_debts',
+            lambda c, pk: c.post(reverse('client_clear_debts', args=[pk])),
+            setup=indebted_client,
+        ),
+    ]
+
+
+def _status(response):
+    return response if isinstance(response, int) else response.status_code
+
+
+def run_benchmarks(repeat=5, only=None):
+    """Executa os cenários e devolve uma lista de ScenarioResult"""
+    from django.contrib.auth.models import User
+
+    client = TestClient()
+    client.force_login(User.objects.get(username=BENCH_USERNAME))
+    results = []
+    for scenario in scenarios():
+        if only and scenario.name not in only:
+            continue
+        _clear_caches()
+        result = ScenarioResult(scenario.name)
+        timings = []
+        for _ in range(repeat + 1):
+            arg = scenario.setup() if scenario.setup else None
+            if scenario.setup and arg is None:
+                result.skipped = 'sem dados para o cenário'
+                break
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = scenario.request(client, arg)
+                elapsed = (time.perf_counter() - started) * 1000
+            result.status = _status(response)
+            result.queries = len(queries)
+            timings.append(elapsed)
+
+        if timings:
+            result.cold_ms = round(timings[0], 2)
+            warm = timings[1:] or timings
+            result.min_ms = round(min(warm), 2)
+            result.median_ms = round(statistics.median(warm), 2)
+            result.max_ms = round(max(warm), 2)
+            result.runs = len(warm)
+        results.append(result)
+    return results
+
+
+def compare(results, baseline, time_tolerance=0.25, min_delta_ms=5.0):
+    """
+    Regressões em relação a um resultado anterior (dict do JSON): mais
+    consultas, ou mediana acima da tolerância (e de min_delta_ms).
+    """
+    previous = {
+        row['name']: row for row in baseline.get('results', [])
+    }
+    regressions = []
+    for result in results:
+        before = previous.get(result.name)
+        if before is None or result.skipped or before.get('skipped'):
+            continue
+        if result.queries > before['queries']:
+            regressions.append(
+                f'{result.name}: {before["queries"]} -> {result.queries} '
+                f'consultas'
+            )
+        limit = before['median_ms'] * (1 + time_tolerance)
+        if (
+            result.median_ms > limit
+            and result.median_ms - before['median_ms'] > min_delta_ms
+        ):
+            regressions.append(
+                f'{result.name}: mediana {before["median_ms"]:.1f} -> '
+                f'{result.median_ms:.1f} ms'
+            )
+    return regressions
+
+
+def as_json(size, results, repeat):
+    return {
+        'created_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'dataset': asdict(size),
+        'repeat': repeat,
+        'results': [asdict(result) for result in results],
+    }
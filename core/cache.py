@@ -0,0 +1,64 @@
+"""
+Cache em arquivos para contadores compartilhados entre processos.
+
+O incr do FileBasedCache lê o valor e grava o novo sem lock: dois
+processos incrementando ao mesmo tempo podem devolver o mesmo número (duas
+mensagens do pub/sub com a mesma sequência, uma invalidação perdida). Aqui
+incr e add seguram um lock exclusivo (flock) em um arquivo do diretório do
+cache, o que vale para todos os processos da mesma máquina.
+
+Usado pelo cache `counters` (versões do catálogo e do dashboard, sequência
+do pub/sub). Com REDIS_URL o settings usa o RedisCache, cujo incr já é
+atômico.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads
+    fcntl = None
+
+
+LOCK_FILENAME = 'counters.lock'
+
+
+class LockedFileBasedCache(FileBasedCache):
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            # O arquivo não termina em .djcache: fica fora do cull e do clear
+            with open(os.path.join(self._dir, LOCK_FILENAME), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked():
+            return super().incr(key, delta, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    async def aincr(self, key, delta=1, version=None):
+        return await sync_to_async(self.incr)(key, delta, version)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return await sync_to_async(self.add)(key, value, timeout, version)
@@ -0,0 +1,173 @@
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from core.bench import (
+    DatasetSize,
+    as_json,
+    compare,
+    run_benchmarks,
+    seed_dataset,
+)
+
+
+# Caches isolados: o benchmark não toca nos caches em disco de produção
+BENCH_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'bench-{alias}',
+    }
+    for alias in settings.CACHES
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma base sintética em um banco de teste e mede o tempo e o '
+        'número de consultas das principais views. Com --baseline, falha '
+        'se algum cenário ficou mais lento ou passou a fazer mais consultas.'
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatasetSize()
+        for name in (
+            'clients',
+            'products',
+            'years',
+            'sales_per_day',
+            'items_per_sale',
+            'seed',
+        ):
+            parser.add_argument(
+                '--' + name.replace('_', '-'),
+                type=int,
+                default=getattr(defaults, name),
+                help=f'Base sintética (padrão: {getattr(defaults, name)}).',
+            )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Execuções medidas por cenário além da fria (padrão: 5).',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Executa só os cenários informados (ex.: sale_detail).',
+        )
+        parser.add_argument(
+            '--output', help='Grava o resultado em JSON neste arquivo.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON de uma execução anterior para comparar.',
+        )
+        parser.add_argument(
+            '--time-tolerance',
+            type=float,
+            default=0.25,
+            help='Aumento aceito na mediana (padrão: 0.25 = 25%%).',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Reaproveita o banco de teste (e a base) entre execuções.',
+        )
+
+    def handle(self, *args, **options):
+        size = DatasetSize(
+            clients=options['clients'],
+            products=options['products'],
+            years=options['years'],
+            sales_per_day=options['sales_per_day'],
+            items_per_sale=options['items_per_sale'],
+            seed=options['seed'],
+        )
+        if options['repeat'] < 1:
+            raise CommandError('--repeat deve ser pelo menos 1.')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Baseline inválido: {e}')
+
+        setup_test_environment(debug=False)
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options['keepdb']
+        )
+        try:
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(
+                    CACHES=BENCH_CACHES,
+                    MEDIA_ROOT=media_root,
+                    REPORT_JOBS_IN_PROCESS=False,
+                ):
+                    results = self._run(size, options)
+        finally:
+            teardown_databases(
+                old_config, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+
+        report = as_json(size, results, options['repeat'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Resultado gravado em {options["output"]}.')
+
+        if baseline is not None:
+            regressions = compare(
+                results, baseline, time_tolerance=options['time_tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Regressões em relação ao baseline:\n'
+                    + '\n'.join(f'  {line}' for line in regressions)
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    'Nenhuma regressão em relação ao baseline.'
+                )
+            )
+
+    def _run(self, size, options):
+        from sales.models import Sale
+
+        if options['keepdb'] and Sale.objects.exists():
+            self.stdout.write('Reaproveitando a base do banco de teste.')
+        else:
+            self.stdout.write('Gerando a base sintética...')
+            seed_dataset(size, stdout=self.stdout)
+
+        results = run_benchmarks(
+            repeat=options['repeat'], only=options['only']
+        )
+        self.stdout.write(
+            f'\n{"cenário":<28} {"status":>6} {"consultas":>9} '
+            f'{"fria":>9} {"mediana":>9} {"máx":>9}'
+        )
+        for result in results:
+            if result.skipped:
+                self.stdout.write(f'{result.name:<28} ({result.skipped})')
+                continue
+            line = (
+                f'{result.name:<28} {result.status:>6} {result.queries:>9} '
+                f'{result.cold_ms:>7.1f}ms {result.median_ms:>7.1f}ms '
+                f'{result.max_ms:>7.1f}ms'
+            )
+            style = self.style.SUCCESS
+            if result.status >= 400:
+                style = self.style.ERROR
+            self.stdout.write(style(line))
+        return results
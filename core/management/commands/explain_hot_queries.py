@@ -0,0 +1,146 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+def hot_queries():
+    """
+    Consultas mais frequentes da aplicação e o índice esperado em cada uma.
+
+    Retorna (descrição, queryset, índices aceitos).
+    """
+    from clients.models import Client, DebtPayment
+    from products.models import Product
+    from sales.models import Payment, Sale
+
+    month_ago = timezone.now() - timedelta(days=30)
+    client_id = (
+        Client.objects.values_list('pk', flat=True).order_by('pk').first()
+        or 0
+    )
+    return [
+        (
+            'Vendas finalizadas no período',
+            Sale.objects.filter(
+                status=Sale.STATUS_FINALIZED, created_at__gte=month_ago
+            ),
+            ['sale_status_created_idx'],
+        ),
+        (
+            'Vendas em aberto',
+            Sale.objects.filter(status=Sale.STATUS_OPEN).order_by(
+                '-created_at'
+            ),
+            ['sale_open_created_idx', 'sale_status_created_idx'],
+        ),
+        (
+            'Lista de vendas (página seguinte)',
+            Sale.objects.filter(created_at__lt=timezone.now()).order_by(
+                '-created_at', '-id'
+            )[:26],
+            ['sale_created_id_idx'],
+        ),
+        (
+            'Pagamentos fiados do cliente',
+            Payment.objects.fiado().filter(sale__client_id=client_id),
+            ['payment_sale_method_lower_idx'],
+        ),
+        (
+            'Produtos ativos por nome',
+            Product.objects.filter(is_active=True).order_by('name'),
+            ['product_active_name_idx'],
+        ),
+        (
+            'Produtos ativos esgotados',
+            Product.objects.filter(is_active=True, quantity=0),
+            ['product_active_quantity_idx'],
+        ),
+        (
+            'Quitações de dívidas no período',
+            DebtPayment.objects.filter(created_at__gte=month_ago),
+            ['debtpayment_created_idx'],
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mostra o plano de execução (EXPLAIN) e o tempo médio das consultas '
+        'mais frequentes, indicando se cada uma usa o índice esperado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Execuções por consulta para medir o tempo (padrão: 20).',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Falha se alguma consulta não usar o índice esperado.',
+        )
+
+    def handle(self, *args, **options):
+        missing = []
+        for description, queryset, indexes in hot_queries():
+            plan = queryset.explain()
+
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / options['repeat']
+
+            used = [name for name in indexes if name in plan]
+            self.stdout.write(self.style.MIGRATE_HEADING(description))
+            self.stdout.write(plan)
+            if used:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'usa {used[0]} - {elapsed * 1000:.2f} ms'
+                    )
+                )
+            else:
+                missing.append(description)
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'não usa {" / ".join(indexes)} - '
+                        f'{elapsed * 1000:.2f} ms'
+                    )
+                )
+            self.stdout.write('')
+
+        index_missing = self.check_search_index()
+        if index_missing:
+            missing.append('Busca de produtos por trecho')
+
+        if missing and options['check']:
+            raise CommandError(
+                f'{len(missing)} consulta(s) sem o índice esperado: '
+                f'{", ".join(missing)}.'
+            )
+
+    def check_search_index(self):
+        """Tabela FTS5/gatilhos (SQLite) ou índice pg_trgm da busca"""
+        from django.db import connection
+
+        from products.search_index import missing_search_index
+
+        missing = missing_search_index(connection)
+        self.stdout.write(
+            self.style.MIGRATE_HEADING('Busca de produtos por trecho')
+        )
+        if missing:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'faltando: {", ".join(missing)} (rode o migrate para '
+                    f'recriar)'
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS('índice de trigramas ok'))
+        self.stdout.write('')
+        return missing
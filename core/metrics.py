@@ -0,0 +1,392 @@
+"""
+Métricas no formato texto do Prometheus (`/metrics`).
+
+Cada processo acumula seus contadores e histogramas em memória (Registry)
+e, no máximo a cada METRICS_FLUSH_INTERVAL segundos, grava uma cópia no
+cache compartilhado (METRICS_CACHE). O endpoint soma as cópias de todos os
+workers, então o scrape não depende de qual processo atende a requisição.
+Nada disso consulta o banco por requisição.
+
+Contadores do Prometheus não podem diminuir (seria lido como reinício e
+estraga o rate()). Por isso a cópia de um worker sem atualização há mais
+de METRICS_WORKER_TTL segundos não expira: ela é somada a um agregado
+permanente (RETIRED_KEY) e sai do índice. Se o worker estava só ocioso,
+ele percebe que saiu do índice e passa a gravar apenas o que acumulou
+depois disso. O índice e o agregado são alterados sob um lock feito com
+cache.add, então METRICS_CACHE precisa de add atômico e não pode descartar
+entradas (o cache `counters`).
+
+Os indicadores do negócio (vendas abertas, produtos esgotados, dívida dos
+clientes) são três agregações simples, recalculadas no máximo uma vez por
+METRICS_BUSINESS_TTL segundos e compartilhadas entre os workers.
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+PREFIX = 'germani'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+REPORT_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+WORKERS_KEY = 'core:metrics:workers'
+RETIRED_KEY = 'core:metrics:retired'
+LOCK_KEY = 'core:metrics:lock'
+BUSINESS_KEY = 'core:metrics:business'
+
+# Segundos: validade do lock (worker morto no meio) e espera máxima
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+
+# nome: (tipo, descrição)
+METRICS = {
+    'http_request_duration_seconds': (
+        'histogram',
+        'Tempo de resposta por view',
+    ),
+    'http_requests_total': ('counter', 'Requisições por view e status'),
+    'db_queries_total': ('counter', 'Consultas SQL por view'),
+    'db_query_seconds_total': ('counter', 'Tempo em consultas SQL por view'),
+    'report_render_seconds': (
+        'histogram',
+        'Tempo de geração dos relatórios em PDF',
+    ),
+    'chart_cache_requests_total': (
+        'counter',
+        'Consultas ao cache de gráficos por resultado',
+    ),
+    'catalog_syncs_total': (
+        'counter',
+        'Sincronizações do catálogo de produtos por resultado',
+    ),
+    'open_sales': ('gauge', 'Vendas abertas'),
+    'open_sales_amount': ('gauge', 'Valor das vendas abertas'),
+    'out_of_stock_products': ('gauge', 'Produtos ativos sem estoque'),
+    'client_debt_total': ('gauge', 'Dívida total dos clientes'),
+    'metrics_workers': ('gauge', 'Processos com métricas recentes'),
+}
+
+
+def _shared():
+    return caches[getattr(settings, 'METRICS_CACHE', 'default')]
+
+
+def _labels(**labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+@contextmanager
+def _state_lock(shared):
+    """Lock entre processos do índice e do agregado; devolve se obteve"""
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_WAIT
+    acquired = shared.add(LOCK_KEY, token, timeout=LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.01)
+        acquired = shared.add(LOCK_KEY, token, timeout=LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired and shared.get(LOCK_KEY) == token:
+            shared.delete(LOCK_KEY)
+
+
+def _empty():
+    return {'counters': {}, 'histograms': {}}
+
+
+def _merge(into, snapshot, sign=1):
+    """Soma (ou subtrai, sign=-1) uma cópia em outra, no lugar"""
+    counters = into['counters']
+    for key, value in snapshot['counters'].items():
+        counters[key] = counters.get(key, 0) + sign * value
+    histograms = into['histograms']
+    for key, (buckets, counts, total, count) in (
+        snapshot['histograms'].items()
+    ):
+        merged = histograms.get(key)
+        if merged is None or merged[0] != buckets:
+            histograms[key] = (
+                buckets,
+                [sign * value for value in counts],
+                sign * total,
+                sign * count,
+            )
+            continue
+        histograms[key] = (
+            buckets,
+            [a + sign * b for a, b in zip(merged[1], counts)],
+            merged[2] + sign * total,
+            merged[3] + sign * count,
+        )
+    return into
+
+
+class Registry:
+    """Contadores e histogramas do processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (nome, labels) -> valor
+        self.counters = {}
+        # (nome, labels) -> [buckets, contagens por bucket, soma, total]
+        self.histograms = {}
+        self.flushed_at = 0.0
+        # Última cópia gravada e o que dela já foi para o agregado
+        self.flushed = None
+        self.retired = _empty()
+        self._pid = None
+        self._key = None
+
+    @property
+    def key(self):
+        # Recalculada após fork (gunicorn com --preload). O sufixo evita
+        # que um processo novo com o mesmo pid sobrescreva a cópia antiga
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._key = (
+                f'core:metrics:{socket.gethostname()}:{self._pid}:'
+                f'{uuid.uuid4().hex[:8]}'
+            )
+        return self._key
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            key = (name, labels)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = [buckets, [0] * len(buckets), 0.0, 0]
+                self.histograms[key] = histogram
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][index] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (buckets, list(counts), total, count)
+                for key, (buckets, counts, total, count) in (
+                    self.histograms.items()
+                )
+            }
+        counters.update(_runtime_counters())
+        return {'counters': counters, 'histograms': histograms}
+
+    def flush(self, force=False):
+        """Grava a cópia do processo no cache compartilhado"""
+        now = time.monotonic()
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 15)
+        if not force and now - self.flushed_at < interval:
+            return
+        self.flushed_at = now
+        ttl = getattr(settings, 'METRICS_WORKER_TTL', 60 * 10)
+        shared = _shared()
+        key = self.key
+        snapshot = self.snapshot()
+        with _state_lock(shared) as acquired:
+            if not acquired:
+                # Tenta de novo no próximo intervalo
+                return
+            workers = shared.get(WORKERS_KEY) or {}
+            if key not in workers and self.flushed is not None:
+                # Aposentado por inatividade: a última cópia já está no
+                # agregado, então daqui em diante grava só a diferença
+                self.retired = self.flushed
+            shared.set(
+                key,
+                _merge(_merge(_empty(), snapshot), self.retired, sign=-1),
+                timeout=None,
+            )
+            self.flushed = snapshot
+
+            wall = time.time()
+            workers[key] = wall
+            stale = [
+                worker
+                for worker, seen in workers.items()
+                if wall - seen >= ttl
+            ]
+            if stale:
+                retired = shared.get(RETIRED_KEY) or _empty()
+                for old in shared.get_many(stale).values():
+                    _merge(retired, old)
+                shared.set(RETIRED_KEY, retired, timeout=None)
+                shared.delete_many(stale)
+                for worker in stale:
+                    del workers[worker]
+            shared.set(WORKERS_KEY, workers, timeout=None)
+
+
+registry = Registry()
+
+
+def _runtime_counters():
+    """Estatísticas do cache de gráficos e do catálogo, se carregados"""
+    counters = {}
+    # Só lê módulos já importados: não carrega o matplotlib à toa
+    charts = sys.modules.get('dashboard.charts')
+    if charts is not None:
+        for result, value in charts.chart_cache.stats.items():
+            key = ('chart_cache_requests_total', _labels(result=result))
+            counters[key] = value
+    catalog = sys.modules.get('products.catalog')
+    if catalog is not None:
+        for result, value in catalog.catalog.stats.items():
+            key = ('catalog_syncs_total', _labels(result=result))
+            counters[key] = value
+    return counters
+
+
+def observe_request(view, method, status, duration, queries, db_time):
+    """Chamado pelo RequestProfileMiddleware ao fim de cada requisição"""
+    registry.observe(
+        'http_request_duration_seconds',
+        _labels(view=view, method=method),
+        duration,
+        LATENCY_BUCKETS,
+    )
+    registry.inc(
+        'http_requests_total',
+        _labels(view=view, method=method, status=status),
+    )
+    registry.inc('db_queries_total', _labels(view=view), queries)
+    registry.inc('db_query_seconds_total', _labels(view=view), db_time)
+    registry.flush()
+
+
+def observe_report(duration, status):
+    """Chamado ao fim de cada relatório em PDF (dashboard.jobs)"""
+    registry.observe(
+        'report_render_seconds',
+        _labels(status=status),
+        duration,
+        REPORT_BUCKETS,
+    )
+    # Relatórios são raros e podem rodar em um worker sem requisições
+    registry.flush(force=True)
+
+
+def business_gauges():
+    """Indicadores do negócio, recalculados no máximo a cada TTL"""
+    shared = _shared()
+    values = shared.get(BUSINESS_KEY)
+    if values is None:
+        values = _compute_business_gauges()
+        shared.set(
+            BUSINESS_KEY,
+            values,
+            timeout=getattr(settings, 'METRICS_BUSINESS_TTL', 60),
+        )
+    return values
+
+
+def _compute_business_gauges():
+    from django.db.models import Count, Sum
+
+    from clients.models import Client
+    from products.models import Product
+    from sales.models import Sale
+
+    open_sales = Sale.objects.filter(status=Sale.STATUS_OPEN).aggregate(
+        count=Count('pk'), total=Sum('total_amount')
+    )
+    return {
+        'open_sales': open_sales['count'],
+        'open_sales_amount': float(open_sales['total'] or 0),
+        'out_of_stock_products': Product.objects.filter(
+            is_active=True, quantity=0
+        ).count(),
+        'client_debt_total': float(
+            Client.objects.aggregate(total=Sum('client_debts'))['total'] or 0
+        ),
+    }
+
+
+def collect():
+    """Soma das cópias de todos os workers: (contadores, histogramas, n)"""
+    registry.flush(force=True)
+    shared = _shared()
+    # Sob o lock: um worker aposentado no meio seria contado duas vezes
+    with _state_lock(shared):
+        workers = shared.get(WORKERS_KEY) or {}
+        retired = shared.get(RETIRED_KEY) or _empty()
+        snapshots = shared.get_many(list(workers)).values()
+    totals = _merge(_empty(), retired)
+    for snapshot in snapshots:
+        _merge(totals, snapshot)
+    return totals['counters'], totals['histograms'], len(snapshots)
+
+
+def _escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def _number(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _series(name, labels, value, extra=()):
+    pairs = list(labels) + list(extra)
+    rendered = ','.join(f'{key}="{_escape(val)}"' for key, val in pairs)
+    suffix = '{' + rendered + '}' if rendered else ''
+    return f'{PREFIX}_{name}{suffix} {_number(value)}'
+
+
+def render():
+    """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+    counters, histograms, workers = collect()
+    gauges = dict(business_gauges(), metrics_workers=workers)
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {PREFIX}_{name} {description}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+        if kind == 'gauge':
+            lines.append(_series(name, (), gauges.get(name, 0)))
+        elif kind == 'counter':
+            for (series, labels), value in sorted(counters.items()):
+                if series == name:
+                    lines.append(_series(name, labels, value))
+        else:
+            for (series, labels), histogram in sorted(histograms.items()):
+                if series != name:
+                    continue
+                buckets, counts, total, count = histogram
+                for bound, cumulative in zip(buckets, counts):
+                    lines.append(
+                        _series(
+                            f'{name}_bucket',
+                            labels,
+                            cumulative,
+                            [('le', f'{bound:g}')],
+                        )
+                    )
+                lines.append(
+                    _series(
+                        f'{name}_bucket', labels, count, [('le', '+Inf')]
+                    )
+                )
+                lines.append(_series(f'{name}_sum', labels, total))
+                lines.append(_series(f'{name}_count', labels, count))
+    return '\n'.join(lines) + '\n'
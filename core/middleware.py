@@ -0,0 +1,350 @@
+"""
+Perfil de cada requisição: consultas SQL, tempo de banco, de template e de
+Python, sem depender de DEBUG.
+
+As consultas são medidas por um execute_wrapper instalado em todas as
+conexões, que acha o perfil da requisição pelo contexto (ContextVar): assim
+as consultas do ORM assíncrono, feitas em outra thread e outra conexão,
+também entram. Elas são agrupadas por "impressão digital" (SQL sem
+literais e com listas IN colapsadas): a mesma impressão repetida várias
+vezes na requisição é o sintoma de N+1. O tempo de banco é o do execute; a
+leitura das linhas de um iterator() (ex.: carga do catálogo) aparece como
+tempo de Python ou da seção. Em views assíncronas a pilha das consultas
+fica vazia (o código da view roda em outra thread).
+
+Cada requisição gera o cabeçalho Server-Timing, as métricas de latência
+do /metrics (core.metrics) e uma linha de log JSON (logger
+`core.requests`): DEBUG normalmente, WARNING acima de
+REQUEST_PROFILE_BUDGET_MS, com a pilha (só código da aplicação) das
+consultas mais caras e das repetidas. Percorrer a pilha custa caro, então
+ela só é capturada depois que a requisição passa do orçamento: uma
+consulta feita só antes disso aparece sem pilha.
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import observe_request
+
+
+logger = logging.getLogger('core.requests')
+
+# Quantas vezes a mesma consulta pode se repetir antes de ser apontada
+DUPLICATE_THRESHOLD = 3
+# Consultas (por impressão digital) detalhadas em requisições lentas
+SLOW_REQUEST_TOP_QUERIES = 5
+STACK_DEPTH = 8
+SQL_PREVIEW_LENGTH = 300
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+_THIS_FILE = os.path.abspath(__file__)
+
+_current = ContextVar('request_profile', default=None)
+
+
+def fingerprint(sql):
+    """SQL sem literais: `id IN (%s, %s)` e `id = 3` viram o mesmo texto"""
+    return _IN_LIST.sub('(...)', _LITERAL.sub('?', sql))
+
+
+def _app_stack():
+    """Quadros da pilha atual que pertencem à aplicação (sem o Django)"""
+    root = str(settings.BASE_DIR)
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < STACK_DEPTH:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(root)
+            and 'site-packages' not in filename
+            and filename != _THIS_FILE
+        ):
+            frames.append(
+                f'{os.path.relpath(filename, root)}:{frame.f_lineno} '
+                f'in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return frames
+
+
+class RequestProfile:
+    """Tempos e consultas de uma requisição"""
+
+    def __init__(self, stacks_after=None):
+        # Segundos a partir dos quais as pilhas são capturadas (None: nunca)
+        self.stacks_after = stacks_after
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        # Consultas feitas durante a renderização (querysets preguiçosos)
+        self.template_db_time = 0.0
+        self.sections = {}
+        # impressão digital -> [execuções, tempo, sql, pilha ou None]
+        self.statements = {}
+        self._template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """execute_wrapper das conexões"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if self._template_depth:
+                self.template_db_time += elapsed
+            key = fingerprint(sql)
+            statement = self.statements.get(key)
+            if statement is None:
+                statement = [0, 0.0, sql[:SQL_PREVIEW_LENGTH], None]
+                self.statements[key] = statement
+            statement[0] += 1
+            statement[1] += elapsed
+            if statement[3] is None and self._over_budget():
+                statement[3] = _app_stack()
+
+    def _over_budget(self):
+        return (
+            self.stacks_after is not None
+            and time.perf_counter() - self.started > self.stacks_after
+        )
+
+    @contextmanager
+    def template(self):
+        # Só a renderização mais externa conta (include/render_to_string)
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template_time += time.perf_counter() - started
+
+    def add_section(self, name, elapsed):
+        self.sections[name] = self.sections.get(name, 0.0) + elapsed
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    @property
+    def python_time(self):
+        """Tempo fora do banco e dos templates (view, forms, middleware)"""
+        template_only = self.template_time - self.template_db_time
+        return max(self.duration - self.db_time - template_only, 0.0)
+
+    def duplicates(self, threshold=DUPLICATE_THRESHOLD):
+        return sorted(
+            (
+                statement
+                for statement in self.statements.values()
+                if statement[0] >= threshold
+            ),
+            key=lambda statement: -statement[0],
+        )
+
+    def slowest(self, limit=SLOW_REQUEST_TOP_QUERIES):
+        return sorted(
+            self.statements.values(), key=lambda statement: -statement[1]
+        )[:limit]
+
+    def server_timing(self):
+        entries = [
+            ('db', self.db_time, f'{self.queries} consultas'),
+            ('tpl', self.template_time - self.template_db_time, 'templates'),
+            ('app', self.python_time, 'python'),
+        ]
+        entries += [(name, t, name) for name, t in self.sections.items()]
+        entries.append(('total', self.duration, 'total'))
+        return ', '.join(
+            f'{name};dur={elapsed * 1000:.1f};desc="{desc}"'
+            for name, elapsed, desc in entries
+        )
+
+
+def current_profile():
+    """Perfil da requisição em andamento (None fora de uma requisição)"""
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """
+    Mede um trecho como seção própria no log e no Server-Timing, ex.:
+    `with timed('chart'): ...`. Fora de uma requisição não faz nada.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_section(name, time.perf_counter() - started)
+
+
+def _profile_execute(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.execute(execute, sql, params, many, context)
+
+
+def _add_query_timer(connection, **kwargs):
+    if _profile_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profile_execute)
+
+
+def _install_query_timer():
+    """Mede as consultas de todas as conexões, inclusive as já abertas"""
+    connection_created.connect(
+        _add_query_timer, dispatch_uid='core.middleware.query_timer'
+    )
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(connection)
+
+
+def _install_template_timer():
+    """Mede Template.render do backend do Django (uma vez por processo)"""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'profiled', False):
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return original(self, context, request)
+        with profile.template():
+            return original(self, context, request)
+
+    render.profiled = True
+    Template.render = render
+
+
+def _statement_json(statement, with_stack=False):
+    count, elapsed, sql, stack = statement
+    row = {'sql': sql, 'count': count, 'ms': round(elapsed * 1000, 2)}
+    if with_stack:
+        row['stack'] = stack or []
+    return row
+
+
+class RequestProfileMiddleware:
+    """
+    Perfil de SQL/templates por requisição (ver docstring do módulo).
+    Desligado com REQUEST_PROFILE=False. Funciona sob WSGI e ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILE', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.budget = getattr(settings, 'REQUEST_PROFILE_BUDGET_MS', 500)
+        self.server_timing = getattr(
+            settings, 'REQUEST_PROFILE_SERVER_TIMING', True
+        )
+        collect_stacks = getattr(settings, 'REQUEST_PROFILE_STACKS', True)
+        self.stacks_after = self.budget / 1000 if collect_stacks else None
+        _install_query_timer()
+        _install_template_timer()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = RequestProfile(stacks_after=self.stacks_after)
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile(stacks_after=self.stacks_after)
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        profile.finish()
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        observe_request(
+            view,
+            request.method,
+            response.status_code,
+            profile.duration,
+            profile.queries,
+            profile.db_time,
+        )
+        if self.server_timing:
+            response['Server-Timing'] = profile.server_timing()
+        self.log(request, response, profile, view)
+        return response
+
+    def log(self, request, response, profile, view):
+        duration_ms = profile.duration * 1000
+        slow = duration_ms > self.budget
+        level = logging.WARNING if slow else logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'db_ms': round(profile.db_time * 1000, 2),
+            'queries': profile.queries,
+            'template_ms': round(
+                (profile.template_time - profile.template_db_time) * 1000, 2
+            ),
+            'python_ms': round(profile.python_time * 1000, 2),
+            'sections': {
+                name: round(elapsed * 1000, 2)
+                for name, elapsed in profile.sections.items()
+            },
+            'duplicates': [
+                _statement_json(statement, with_stack=slow)
+                for statement in profile.duplicates()
+            ],
+        }
+        if slow:
+            record['slow'] = True
+            record['budget_ms'] = self.budget
+            record['slowest'] = [
+                _statement_json(statement, with_stack=True)
+                for statement in profile.slowest()
+            ]
+        logger.log(level, json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,236 @@
+"""
+Pub/sub simples para eventos ao vivo (SSE do dashboard).
+
+Quem publica é código síncrono (sinais, views, threads); quem assina são
+views assíncronas rodando no event loop do servidor ASGI. Cada assinatura
+é uma asyncio.Queue limitada: se o cliente não acompanhar, as mensagens
+mais antigas são descartadas.
+
+O backend é escolhido em PUBSUB_BACKEND:
+
+- LocalBroker: só o próprio processo (um único worker ASGI);
+- CacheBroker: as mensagens passam pelo cache compartilhado
+  (PUBSUB_CACHE), para quando quem publica (ex.: workers WSGI da caixa)
+  não é o processo que mantém as conexões SSE. Cada processo ASGI lê o
+  cache em uma única tarefa e distribui para as assinaturas locais.
+
+O CacheBroker numera as mensagens com incr no PUBSUB_SEQUENCE_CACHE, que
+precisa ser atômico entre os processos: o cache `counters`
+(core.cache.LockedFileBasedCache na mesma máquina, Redis entre máquinas).
+Com o FileBasedCache comum, publicações simultâneas recebem o mesmo número
+e uma delas se perde.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_QUEUE_SIZE = 100
+# Leituras esperando uma mensagem numerada que ainda não está no cache
+MISSING_MESSAGE_RETRIES = 3
+
+
+class Subscription:
+    def __init__(self, channel, loop):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def put(self, message):
+        """Chamado no event loop da assinatura"""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    def drain(self):
+        """Mensagens já recebidas, sem esperar"""
+        messages = []
+        while not self.queue.empty():
+            messages.append(self.queue.get_nowait())
+        return messages
+
+    async def get(self, timeout=None):
+        """Próxima mensagem, ou None se `timeout` passar sem nenhuma"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """Entrega às assinaturas do próprio processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, channel, message):
+        self._deliver(channel, message)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.put, message
+                )
+            except RuntimeError:
+                # Loop já encerrado: a assinatura sai no unsubscribe
+                pass
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions.setdefault(subscription.channel, set()).add(
+                subscription
+            )
+
+    def _remove(self, subscription):
+        with self._lock:
+            channel = self._subscriptions.get(subscription.channel, set())
+            channel.discard(subscription)
+            if not channel:
+                self._subscriptions.pop(subscription.channel, None)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        subscription = Subscription(channel, asyncio.get_running_loop())
+        self._add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._remove(subscription)
+
+
+class CacheBroker(LocalBroker):
+    """
+    Mensagens numeradas no cache compartilhado: `publish` grava a mensagem
+    na chave do próximo número do canal; uma tarefa por processo acompanha
+    o número e entrega as novas mensagens às assinaturas locais.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.interval = getattr(settings, 'PUBSUB_POLL_INTERVAL', 1.0)
+        self.ttl = getattr(settings, 'PUBSUB_MESSAGE_TTL', 60)
+        self._pollers = {}
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'PUBSUB_CACHE', 'default')]
+
+    @property
+    def sequence(self):
+        return caches[getattr(settings, 'PUBSUB_SEQUENCE_CACHE', 'default')]
+
+    def _seq_key(self, channel):
+        return f'pubsub:{channel}:seq'
+
+    def _message_key(self, channel, seq):
+        return f'pubsub:{channel}:{seq}'
+
+    def publish(self, channel, message):
+        key = self._seq_key(channel)
+        try:
+            seq = self.sequence.incr(key)
+        except ValueError:
+            self.sequence.add(key, 0, timeout=None)
+            seq = self.sequence.incr(key)
+        self.cache.set(self._message_key(channel, seq), message, self.ttl)
+
+    def _add(self, subscription):
+        super()._add(subscription)
+        # Uma tarefa de leitura por canal e event loop
+        poller_key = (subscription.channel, subscription.loop)
+        with self._lock:
+            task = self._pollers.get(poller_key)
+            if task is None or task.done():
+                self._pollers[poller_key] = subscription.loop.create_task(
+                    self._poll(subscription.channel, subscription.loop)
+                )
+
+    def _keep_polling(self, channel, loop):
+        """False (e a tarefa sai do registro) sem assinaturas no loop"""
+        with self._lock:
+            if any(
+                subscription.loop is loop
+                for subscription in self._subscriptions.get(channel, ())
+            ):
+                return True
+            self._pollers.pop((channel, loop), None)
+            return False
+
+    async def _poll(self, channel, loop):
+        seq_key = self._seq_key(channel)
+        last = await self.sequence.aget(seq_key, 0)
+        # Leituras em que a próxima mensagem ainda não apareceu
+        waiting = 0
+        while self._keep_polling(channel, loop):
+            await asyncio.sleep(self.interval)
+            current = await self.sequence.aget(seq_key, 0)
+            if current <= last:
+                continue
+            # Mensagens expiradas (leitor muito atrasado) são puladas
+            first = max(last + 1, current - SUBSCRIPTION_QUEUE_SIZE + 1)
+            seqs = range(first, current + 1)
+            messages = await self.cache.aget_many(
+                [self._message_key(channel, seq) for seq in seqs]
+            )
+            last = first - 1
+            for seq in seqs:
+                message = messages.get(self._message_key(channel, seq))
+                if message is None and waiting < MISSING_MESSAGE_RETRIES:
+                    # Número já reservado, mensagem ainda não gravada:
+                    # espera a próxima leitura para manter a ordem
+                    waiting += 1
+                    break
+                waiting = 0
+                if message is not None:
+                    self._deliver(channel, message)
+                last = seq
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            backend = getattr(
+                settings, 'PUBSUB_BACKEND', 'core.pubsub.LocalBroker'
+            )
+            _broker = import_string(backend)()
+        return _broker
+
+
+def publish(channel, **message):
+    """
+    Publica depois do commit (quem assina pode reler o banco). Falhas no
+    backend não afetam quem publica.
+    """
+    message.setdefault('at', time.time())
+
+    def send():
+        try:
+            get_broker().publish(channel, message)
+        except Exception:
+            logger.exception('Falha ao publicar em %s', channel)
+
+    transaction.on_commit(send)
+
+
+def subscribe(channel):
+    """`async with subscribe(canal) as subscription: ...`"""
+    return get_broker().subscribe(channel)
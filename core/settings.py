@@ -27,11 +27,13 @@ INSTALLED_APPS = [
     'accounts',
     'sales',
     'dashboard',
+    'core',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.RequestProfileMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -77,6 +79,113 @@ else:
     }
 
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Imagens dos gráficos do relatório em PDF (compartilhadas entre workers)
+    'charts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CHART_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'charts')
+        ),
+        'TIMEOUT': 60 * 60 * 24 * 7,
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+    # Dados compartilhados entre os workers que podem ser descartados
+    # (HTML do dashboard, mensagens do pub/sub, métricas)
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'shared')
+        ),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Contadores compartilhados (versões do catálogo e do dashboard, sequência
+# do pub/sub): separados do 'shared' para o cull não apagá-los e com incr
+# atômico entre processos (core.cache ou Redis)
+if os.environ.get('REDIS_URL'):
+    CACHES['counters'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'TIMEOUT': None,
+    }
+else:
+    CACHES['counters'] = {
+        'BACKEND': 'core.cache.LockedFileBasedCache',
+        'LOCATION': os.environ.get(
+            'COUNTER_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'counters')
+        ),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+
+REPORT_CHART_CACHE = 'charts'
+REPORT_CHART_CACHE_SIZE = 64
+
+CATALOG_VERSION_CACHE = 'counters'
+
+# HTML e versões dos blocos do dashboard (dashboard.fragments)
+DASHBOARD_CACHE = 'shared'
+DASHBOARD_VERSION_CACHE = 'counters'
+
+# Eventos do dashboard ao vivo (core.pubsub): LocalBroker quando tudo roda
+# em um único processo ASGI; CacheBroker quando a caixa roda em workers
+# WSGI e o SSE em um processo ASGI separado. A sequência das mensagens
+# precisa de incr atômico (cache 'counters')
+PUBSUB_BACKEND = os.environ.get('PUBSUB_BACKEND', 'core.pubsub.CacheBroker')
+PUBSUB_CACHE = 'shared'
+PUBSUB_SEQUENCE_CACHE = 'counters'
+PUBSUB_POLL_INTERVAL = 1.0
+PUBSUB_MESSAGE_TTL = 60
+
+# Relatórios em PDF: gerados em threads do próprio processo web ou, com
+# REPORT_JOBS_IN_PROCESS=False, por `manage.py run_report_worker`
+REPORT_JOBS_IN_PROCESS = (
+    os.environ.get('REPORT_JOBS_IN_PROCESS', 'True') == 'True'
+)
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', '2'))
+# Jobs parados há mais que isso (segundos) são marcados como falhos
+REPORT_JOB_TIMEOUT = int(os.environ.get('REPORT_JOB_TIMEOUT', '900'))
+
+# Perfil por requisição (core.middleware): cabeçalho Server-Timing e log
+# JSON em `core.requests` (DEBUG; WARNING com as pilhas das consultas
+# quando passa do orçamento)
+REQUEST_PROFILE = os.environ.get('REQUEST_PROFILE', 'True') == 'True'
+REQUEST_PROFILE_BUDGET_MS = int(
+    os.environ.get('REQUEST_PROFILE_BUDGET_MS', '500')
+)
+REQUEST_PROFILE_SERVER_TIMING = True
+REQUEST_PROFILE_STACKS = True
+
+# /metrics (core.metrics): cada worker grava seus contadores no cache
+# 'counters' (sem cull, add atômico); os indicadores do negócio são
+# recalculados a cada TTL
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_CACHE = 'counters'
+METRICS_FLUSH_INTERVAL = 15
+METRICS_WORKER_TTL = 60 * 10
+METRICS_BUSINESS_TTL = 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -0,0 +1,17 @@
+"""
+Atalhos para views assíncronas (o Django 5.2 ainda não tem as versões
+assíncronas de django.shortcuts).
+"""
+
+from django.http import Http404
+
+
+async def aget_object_or_404(klass, *args, **kwargs):
+    """get_object_or_404 com o ORM assíncrono (`aget`)"""
+    queryset = getattr(klass, '_default_manager', klass)
+    try:
+        return await queryset.aget(*args, **kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(
+            f'No {queryset.model._meta.object_name} matches the given query.'
+        )
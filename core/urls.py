@@ -8,6 +8,7 @@ from accounts.views import login_view
 
 urlpatterns = [
     path('ping/', views.ping),
+    path('metrics/', views.metrics, name='metrics'),
     path('base/', views.base_view, name='base_view'),
     path('admin/', admin.site.urls),
     path('', login_view, name='login'),
@@ -1,10 +1,32 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.utils.crypto import constant_time_compare
+
+from .metrics import render as render_metrics
 
 @login_required
 def base_view(request):
     return render(request, 'base.html')
 
 def ping(request):
-    return JsonResponse({"status": "OK"}, status=200)
\ No newline at end of file
+    return JsonResponse({"status": "OK"}, status=200)
+
+
+def metrics(request):
+    """
+    Métricas para o Prometheus. Exige `Authorization: Bearer <token>` com
+    METRICS_TOKEN; sem token configurado, só responde com DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        given = request.headers.get('Authorization', '')
+        if not constant_time_compare(given, f'Bearer {token}'):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,6 +1,28 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete, post_save
 
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        # Fragmentos em cache do dashboard (dashboard.fragments)
+        from .fragments import INVALIDATED_BY, invalidate_dashboard
+
+        for label in INVALIDATED_BY:
+            model = apps.get_model(label)
+            post_save.connect(invalidate_dashboard, sender=model)
+            post_delete.connect(invalidate_dashboard, sender=model)
+
+        # Eventos do dashboard ao vivo (dashboard.live), depois da
+        # invalidação: o on_commit roda na ordem de registro
+        from .live import debt_payment_created, payment_created, sale_changed
+
+        post_save.connect(sale_changed, sender=apps.get_model('sales.Sale'))
+        post_save.connect(
+            payment_created, sender=apps.get_model('sales.Payment')
+        )
+        post_save.connect(
+            debt_payment_created, sender=apps.get_model('clients.DebtPayment')
+        )
@@ -0,0 +1,166 @@
+"""
+Renderização dos gráficos do relatório em PDF com cache de imagens.
+
+Cada PNG é identificado por um hash do tipo de gráfico, dos dados e do
+estilo. O mesmo período gera sempre a mesma chave, então downloads repetidos
+(comuns no fechamento do mês) reutilizam a imagem sem passar pelo
+matplotlib. As imagens ficam em um LRU limitado no processo e no cache do
+Django configurado em REPORT_CHART_CACHE (compartilhado entre workers).
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import matplotlib.colors as mcolors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Incrementar quando o visual dos gráficos mudar, para invalidar o cache
+CHART_STYLE_VERSION = 1
+
+FIGSIZE = (6, 4)
+BAR_COLOR = '#2563EB'
+PIE_COLORS = ['#2563EB', '#F97316', '#10B981', '#06B6D4', '#8B5CF6']
+
+
+class ChartCache:
+    """LRU em memória com um cache do Django como segundo nível"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'REPORT_CHART_CACHE', 'default')
+        return caches[alias]
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return png
+
+        png = self.shared.get(key)
+        if png is not None:
+            self._remember(key, png)
+            with self._lock:
+                self.stats['shared_hits'] += 1
+            return png
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, png):
+        self._remember(key, png)
+        self.shared.set(key, png)
+
+    def _remember(self, key, png):
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+chart_cache = ChartCache(
+    max_entries=getattr(settings, 'REPORT_CHART_CACHE_SIZE', 64)
+)
+
+
+def chart_key(kind, **data):
+    """Chave do gráfico: hash do tipo, dos dados e da versão do estilo"""
+    payload = json.dumps(
+        {'kind': kind, 'style': CHART_STYLE_VERSION, 'data': data},
+        sort_keys=True,
+        default=str,
+    )
+    return f'chart:{hashlib.sha256(payload.encode()).hexdigest()}'
+
+
+def _cached_png(key, draw):
+    from core.middleware import timed
+
+    png = chart_cache.get(key)
+    if png is None:
+        with timed('chart'):
+            png = _figure_to_png(draw)
+        chart_cache.set(key, png)
+    return png
+
+
+def _figure_to_png(draw):
+    # Figure direto (sem pyplot) não usa estado global e não precisa
+    # ser fechada; é descartada junto com a função
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.subplots()
+    draw(ax)
+    fig.tight_layout()
+    buffer = BytesIO()
+    FigureCanvasAgg(fig).print_png(buffer)
+    return buffer.getvalue()
+
+
+def render_months_chart(labels, values):
+    """PNG do gráfico de barras de vendas por mês"""
+    values = [float(v) for v in values]
+
+    def draw(ax):
+        bars = ax.bar(labels, values, color=BAR_COLOR, edgecolor='black')
+        ax.set_ylabel('Valor (R$)', fontsize=10)
+        ax.set_xlabel('Mês', fontsize=10)
+        ax.set_title('Vendas por Mês', fontsize=12, fontweight='bold')
+        ax.grid(axis='y', alpha=0.3)
+
+        # Adicionar valores nas barras
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(
+                bar.get_x() + bar.get_width() / 2.0,
+                height,
+                f'R$ {height:,.0f}'.replace(',', '.'),
+                ha='center',
+                va='bottom',
+                fontsize=8,
+            )
+
+    key = chart_key('months', labels=labels, values=values)
+    return _cached_png(key, draw)
+
+
+def render_products_chart(labels, sizes):
+    """PNG do gráfico de pizza de participação por produto"""
+    sizes = [round(float(s), 4) for s in sizes]
+
+    def draw(ax):
+        pie_colors = [mcolors.to_rgba(c) for c in PIE_COLORS[: len(sizes)]]
+        ax.pie(
+            sizes,
+            labels=labels,
+            colors=pie_colors,
+            autopct='%1.1f%%',
+            startangle=90,
+            textprops={'fontsize': 9},
+        )
+        ax.set_title(
+            'Participação por Produto', fontsize=12, fontweight='bold'
+        )
+
+    key = chart_key('products', labels=labels, sizes=sizes)
+    return _cached_png(key, draw)
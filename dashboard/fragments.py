@@ -0,0 +1,142 @@
+"""
+Blocos do dashboard renderizados e guardados em cache separadamente.
+
+Cada fragmento (cards, gráfico de 7 dias, top produtos, vendas recentes)
+tem uma versão no cache de contadores (DASHBOARD_VERSION_CACHE) e o HTML
+no cache compartilhado (DASHBOARD_CACHE). O post_save e o
+post_delete dos modelos que alimentam o bloco incrementam a versão (após o
+commit) e o HTML seguinte é gerado de novo; os outros blocos continuam
+vindo do cache. A chave inclui o dia, então "hoje" muda à meia-noite.
+
+Alterações feitas com QuerySet.update, que não disparam sinais, avisam
+pelo invalidate_fragments (Sale.add_to_totals e clients.ledger). Baixas
+de estoque e importações de produtos entram pelas versões do catálogo
+(products.catalog) na chave dos blocos que mostram produtos.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .metrics import (
+    compute_kpis,
+    compute_recent_sales,
+    compute_sales_by_day,
+    compute_top_products,
+)
+
+
+FRAGMENT_TIMEOUT = 60 * 10
+
+# nome: (cálculo, template)
+FRAGMENTS = {
+    'kpis': (compute_kpis, 'dashboard/partials/kpis.html'),
+    'sales_chart': (
+        compute_sales_by_day,
+        'dashboard/partials/sales_chart.html',
+    ),
+    'top_products': (
+        compute_top_products,
+        'dashboard/partials/top_products.html',
+    ),
+    'recent_sales': (
+        lambda now: compute_recent_sales(),
+        'dashboard/partials/recent_sales.html',
+    ),
+}
+
+# Blocos com as versões do catálogo de produtos na chave
+PRODUCT_FRAGMENTS = {'kpis', 'top_products'}
+
+# Fragmentos afetados por cada modelo (sinais ligados em DashboardConfig)
+INVALIDATED_BY = {
+    'sales.Sale': ['kpis', 'sales_chart', 'top_products', 'recent_sales'],
+    'sales.SaleItem': ['kpis', 'top_products'],
+    'sales.Payment': ['kpis', 'sales_chart', 'recent_sales'],
+    'products.Product': ['kpis', 'top_products'],
+    'clients.Client': ['kpis', 'recent_sales'],
+    'clients.DebtPayment': ['kpis'],
+}
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE', 'default')]
+
+
+def _version_key(name):
+    return f'dashboard:fragment-version:{name}'
+
+
+def _versions():
+    return caches[getattr(settings, 'DASHBOARD_VERSION_CACHE', 'default')]
+
+
+def _bump(name):
+    cache = _versions()
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.add(_version_key(name), 1, timeout=None)
+
+
+def invalidate_fragments(*names):
+    """Faz os fragmentos serem gerados de novo (após o commit)"""
+    def bump():
+        for name in names:
+            _bump(name)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_dashboard(sender, **kwargs):
+    """Receptor de post_save/post_delete dos modelos em INVALIDATED_BY"""
+    invalidate_fragments(*INVALIDATED_BY[sender._meta.label])
+
+
+def fragment_key(name, now=None):
+    """Chave do HTML do fragmento: versão, dia e versões do catálogo"""
+    from products.catalog import catalog_version, stock_version
+
+    today = timezone.localdate(now)
+    version = _versions().get(_version_key(name), 0)
+    key = f'dashboard:fragment:{name}:{version}:{today.isoformat()}'
+    if name in PRODUCT_FRAGMENTS:
+        key += f':{catalog_version()}:{stock_version()}'
+    return key
+
+
+def fragment_etag(key):
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def render_fragment(name, key=None, now=None):
+    """HTML do fragmento, do cache ou calculado agora"""
+    compute, template = FRAGMENTS[name]
+    key = key or fragment_key(name, now)
+    cache = _cache()
+    html = cache.get(key)
+    if html is None:
+        context = compute(timezone.localtime(now))
+        html = render_to_string(template, context)
+        cache.set(key, html, FRAGMENT_TIMEOUT)
+    return mark_safe(html)
+
+
+def kpi_values(now=None):
+    """Valores dos cards, em cache pela mesma chave do fragmento"""
+    key = fragment_key('kpis', now) + ':values'
+    cache = _cache()
+    values = cache.get(key)
+    if values is None:
+        values = compute_kpis(timezone.localtime(now))
+        cache.set(key, values, FRAGMENT_TIMEOUT)
+    return values
+
+
+def render_fragments(now=None):
+    return {name: render_fragment(name, now=now) for name in FRAGMENTS}
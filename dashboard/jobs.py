@@ -0,0 +1,176 @@
+"""
+Fila de geração de relatórios em PDF.
+
+A view só cria o ReportJob; a renderização roda em um pool de threads do
+próprio processo (REPORT_JOBS_IN_PROCESS) ou em workers separados
+(`manage.py run_report_worker`), que podem rodar em paralelo em vários
+processos. Cada job é reivindicado com um UPDATE condicional, então dois
+workers nunca processam o mesmo relatório.
+
+Um job parado há mais de REPORT_JOB_TIMEOUT segundos (na fila ou em
+execução), por exemplo porque o processo foi reiniciado no meio da geração,
+é marcado como falho: não prende mais o período do usuário e a página de
+acompanhamento mostra o erro em vez de esperar para sempre.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ReportJob
+from .pdf import build_report_pdf, report_filename
+from .reports import build_report
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_WORKERS', 2),
+                thread_name_prefix='report-job',
+            )
+        return _executor
+
+
+def expire_stale_jobs(**filters):
+    """
+    Marca como falhos os jobs (filtrados por `filters`) na fila ou em
+    execução há mais de REPORT_JOB_TIMEOUT segundos. Retorna quantos.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(
+        seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 60 * 15)
+    )
+    return (
+        ReportJob.objects.filter(**filters)
+        .filter(
+            Q(status=ReportJob.STATUS_PENDING, created_at__lt=cutoff)
+            | Q(status=ReportJob.STATUS_RUNNING, started_at__lt=cutoff)
+        )
+        .update(
+            status=ReportJob.STATUS_FAILED,
+            error='Geração interrompida ou não iniciada a tempo.',
+            finished_at=now,
+        )
+    )
+
+
+def enqueue_report(start_date, end_date, user=None):
+    """
+    Cria o job do período (ou reaproveita um ainda na fila do mesmo
+    usuário) e agenda a geração depois do commit.
+    """
+    # Jobs perdidos (processo reiniciado) não podem ser reaproveitados
+    expire_stale_jobs(requested_by=user)
+    job = ReportJob.objects.filter(
+        start_date=start_date,
+        end_date=end_date,
+        requested_by=user,
+        status__in=[ReportJob.STATUS_PENDING, ReportJob.STATUS_RUNNING],
+    ).first()
+    if job is not None:
+        return job
+
+    job = ReportJob.objects.create(
+        start_date=start_date, end_date=end_date, requested_by=user
+    )
+    if getattr(settings, 'REPORT_JOBS_IN_PROCESS', True):
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run_in_thread, job.pk)
+        )
+    return job
+
+
+def claim_job(job_id):
+    """Marca o job como em execução; None se outro worker já o pegou"""
+    claimed = ReportJob.objects.filter(
+        pk=job_id, status=ReportJob.STATUS_PENDING
+    ).update(status=ReportJob.STATUS_RUNNING, started_at=timezone.now())
+    if not claimed:
+        return None
+    return ReportJob.objects.get(pk=job_id)
+
+
+def claim_next_job():
+    """Reivindica o job pendente mais antigo, se houver"""
+    pending = ReportJob.objects.filter(
+        status=ReportJob.STATUS_PENDING
+    ).order_by('created_at', 'pk')
+    for job_id in pending.values_list('pk', flat=True)[:10]:
+        job = claim_job(job_id)
+        if job is not None:
+            return job
+    return None
+
+
+def run_job(job):
+    """Gera o PDF de um job já reivindicado e salva no storage"""
+    # O banco devolve as datas em UTC; o relatório usa o dia local
+    from core.metrics import observe_report
+
+    start_date = timezone.localtime(job.start_date)
+    end_date = timezone.localtime(job.end_date)
+    started = time.monotonic()
+    try:
+        report = build_report(start_date, end_date)
+        pdf = build_report_pdf(report)
+        job.file.save(
+            report_filename(start_date, end_date),
+            ContentFile(pdf),
+            save=False,
+        )
+        job.status = ReportJob.STATUS_DONE
+    except Exception as exc:
+        logger.exception('Falha ao gerar o relatório #%s', job.pk)
+        job.status = ReportJob.STATUS_FAILED
+        job.error = str(exc)
+    job.finished_at = timezone.now()
+    # Só conclui se o job ainda estiver em execução: expire_stale_jobs pode
+    # tê-lo marcado como falho (e outro job já pode ter sido enfileirado)
+    finished = ReportJob.objects.filter(
+        pk=job.pk, status=ReportJob.STATUS_RUNNING
+    ).update(
+        file=job.file.name or '',
+        status=job.status,
+        error=job.error,
+        finished_at=job.finished_at,
+    )
+    if not finished:
+        if job.file:
+            job.file.delete(save=False)
+        job.refresh_from_db()
+    observe_report(time.monotonic() - started, job.status)
+    return job
+
+
+def run_report_job(job_id):
+    """Reivindica e processa um job; retorna o job ou None"""
+    job = claim_job(job_id)
+    if job is None:
+        return None
+    return run_job(job)
+
+
+def _run_in_thread(job_id):
+    # Threads do pool não passam pelo ciclo de requisição do Django, então
+    # as conexões precisam ser fechadas manualmente
+    close_old_connections()
+    try:
+        run_report_job(job_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,92 @@
+"""
+Dashboard ao vivo por Server-Sent Events (`dashboard_events`).
+
+Vendas criadas ou com status alterado, pagamentos e quitações publicam um
+evento no canal `dashboard` (core.pubsub) depois do commit. Cada conexão
+SSE aberta recebe o evento e, em seguida, só os valores dos cards que
+mudaram desde o último envio (kpi_values, em cache e compartilhado entre
+as conexões). Rajadas de eventos geram um único cálculo.
+
+O stream só roda sob ASGI; sob WSGI ele prenderia um worker por
+dashboard aberto, então a view responde 204 e o navegador desiste.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+
+from core.pubsub import publish, subscribe
+
+from .fragments import kpi_values
+
+
+CHANNEL = 'dashboard'
+# Comentário enviado sem eventos, para proxies não fecharem a conexão
+HEARTBEAT_INTERVAL = 15
+RETRY_MS = 5000
+
+
+def sale_changed(sender, instance, created, update_fields=None, **kwargs):
+    """post_save de Sale: nova venda ou mudança de status"""
+    if created or (update_fields and 'status' in update_fields):
+        publish(
+            CHANNEL,
+            type='sale',
+            sale_id=instance.pk,
+            status=instance.status,
+            total=float(instance.total_amount),
+        )
+
+
+def payment_created(sender, instance, created, **kwargs):
+    """post_save de Payment"""
+    if created:
+        publish(
+            CHANNEL,
+            type='payment',
+            sale_id=instance.sale_id,
+            amount=float(instance.amount),
+            method=instance.method,
+        )
+
+
+def debt_payment_created(sender, instance, created, **kwargs):
+    """post_save de DebtPayment"""
+    if created:
+        publish(
+            CHANNEL,
+            type='debt_payment',
+            client_id=instance.client_id,
+            amount=float(instance.amount),
+        )
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def event_stream():
+    """Eventos do canal e diferenças dos cards, até o cliente desconectar"""
+    async with subscribe(CHANNEL) as subscription:
+        # Valores atuais primeiro: a página pode ter sido gerada antes
+        sent = dict(await sync_to_async(kpi_values)())
+        yield f'retry: {RETRY_MS}\n\n'
+        yield _sse('kpis', sent)
+        while True:
+            message = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+            if message is None:
+                yield ': ping\n\n'
+                continue
+            messages = [message] + subscription.drain()
+            for message in messages:
+                yield _sse(message['type'], message)
+
+            values = await sync_to_async(kpi_values)()
+            changed = {
+                key: value
+                for key, value in values.items()
+                if sent.get(key) != value
+            }
+            if changed:
+                sent.update(changed)
+                yield _sse('kpis', changed)
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.rollups import rebuild_rollups
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida: {value} (use AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói os resumos diários de vendas (DailySalesSummary e '
+        'DailyProductSales) a partir do histórico.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start', type=_date, help='Primeiro dia (AAAA-MM-DD).'
+        )
+        parser.add_argument(
+            '--end', type=_date, help='Último dia (AAAA-MM-DD).'
+        )
+
+    def handle(self, *args, **options):
+        days, product_rows = rebuild_rollups(
+            start=options['start'], end=options['end']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{days} dia(s) e {product_rows} linha(s) por produto '
+                f'reconstruídos.'
+            )
+        )
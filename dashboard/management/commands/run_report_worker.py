@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dashboard.jobs import claim_next_job, expire_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Processa os relatórios em PDF pendentes. Vários workers podem rodar '
+        'em paralelo (um por núcleo); cada job é processado uma única vez.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa os jobs pendentes e encerra.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos entre consultas à fila quando vazia (padrão: 2).',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            close_old_connections()
+            expire_stale_jobs()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            job = run_job(job)
+            processed += 1
+            self.stdout.write(str(job))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{processed} relatório(s) processado(s).')
+        )
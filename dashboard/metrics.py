@@ -0,0 +1,164 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from clients.models import Client
+from products.models import Product
+from sales.models import Sale
+
+from .models import DailyProductSales, DailySalesSummary
+
+
+ZERO = Decimal('0.00')
+
+
+def _money(expression, **extra):
+    """Soma monetária que retorna 0.00 em vez de None"""
+    return Coalesce(
+        Sum(expression, **extra),
+        ZERO,
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def _dashboard_periods(now=None):
+    """Limites de tempo usados pelos cards e gráficos do dashboard"""
+    now = timezone.localtime(now)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'now': now,
+        'today_start': today_start,
+        'month_start': today_start.replace(day=1),
+        'week_start': today_start - timedelta(days=6),
+        'thirty_days_ago': today_start - timedelta(days=30),
+    }
+
+
+def compute_kpis(now=None):
+    """Cards de métricas principais (vendas, pendências, dívidas e estoque)"""
+    periods = _dashboard_periods(now)
+    today = periods['today_start'].date()
+
+    # 1. Vendas finalizadas e quitações do dia e do mês (resumos diários)
+    summary = DailySalesSummary.objects.filter(
+        date__gte=periods['month_start'].date(), date__lte=today
+    ).aggregate(
+        today=_money(
+            F('sales_total') + F('debt_payments_total'),
+            filter=Q(date=today),
+        ),
+        count_today=Coalesce(Sum('sales_count', filter=Q(date=today)), 0),
+        month=_money(F('sales_total') + F('debt_payments_total')),
+        count_month=Coalesce(Sum('sales_count'), 0),
+    )
+
+    # 2. Vendas abertas (pendentes)
+    open_sales = Sale.objects.filter(status=Sale.STATUS_OPEN).aggregate(
+        total=_money('total_amount'), count=Count('pk')
+    )
+
+    # 3. Clientes e dívidas
+    clients = Client.objects.aggregate(
+        total_debts=_money('client_debts'),
+        with_debts=Count('pk', filter=Q(client_debts__gt=0)),
+        total=Count('pk'),
+    )
+
+    # 4. Estoque
+    stock = Product.objects.filter(is_active=True).aggregate(
+        out_of_stock=Count('pk', filter=Q(quantity=0)),
+        low_stock=Count(
+            'pk',
+            filter=Q(quantity__gt=0, quantity__lte=F('low_quantity')),
+        ),
+        total=Count('pk'),
+    )
+
+    return {
+        'total_sales_today': float(summary['today']),
+        'count_sales_today': summary['count_today'],
+        'total_sales_month': float(summary['month']),
+        'count_sales_month': summary['count_month'],
+        'count_open_sales': open_sales['count'],
+        'total_open_sales': float(open_sales['total']),
+        'total_debts': float(clients['total_debts']),
+        'clients_with_debts': clients['with_debts'],
+        'out_of_stock_count': stock['out_of_stock'],
+        'low_stock_count': stock['low_stock'],
+        'total_products': stock['total'],
+        'total_clients': clients['total'],
+    }
+
+
+def compute_sales_by_day(now=None):
+    """Série de vendas finalizadas dos últimos 7 dias (resumos diários)"""
+    periods = _dashboard_periods(now)
+    totals = dict(
+        DailySalesSummary.objects.filter(
+            date__gte=periods['week_start'].date(),
+            date__lte=periods['now'].date(),
+        ).values_list('date', 'sales_total')
+    )
+
+    labels = []
+    values = []
+    for i in range(6, -1, -1):
+        day = (periods['now'] - timedelta(days=i)).date()
+        labels.append(day.strftime('%d/%m'))
+        values.append(float(totals.get(day, ZERO)))
+
+    return {'sales_by_day_labels': labels, 'sales_by_day_values': values}
+
+
+def compute_top_products(now=None, limit=5):
+    """Produtos mais vendidos (em quantidade) nos últimos 30 dias"""
+    periods = _dashboard_periods(now)
+    rows = (
+        DailyProductSales.objects.filter(
+            date__gte=periods['thirty_days_ago'].date(),
+            date__lte=periods['now'].date(),
+        )
+        .values('product__name')
+        .annotate(quantity_sold=Sum('quantity'), total_sold=_money('total'))
+        .filter(quantity_sold__gt=0)
+        .order_by('-quantity_sold', 'product__name')[:limit]
+    )
+    top_products = [
+        (
+            row['product__name'],
+            {'quantity': row['quantity_sold'], 'total': row['total_sold']},
+        )
+        for row in rows
+    ]
+    return {'top_products': top_products}
+
+
+def compute_recent_sales(limit=5):
+    """Últimas vendas finalizadas, já com o cliente carregado"""
+    recent_sales = (
+        Sale.objects.filter(status=Sale.STATUS_FINALIZED)
+        .select_related('client')
+        .order_by('-created_at')[:limit]
+    )
+    return {'recent_sales': list(recent_sales)}
+
+
+def compute_dashboard_metrics(now=None):
+    """
+    Calcula todas as métricas do dashboard com consultas agregadas.
+
+    Cada bloco do dashboard é resolvido por uma consulta agrupada ou
+    condicional (Sum/Count com filter=Q(...)); os totais de vendas
+    finalizadas vêm dos resumos diários, então o número de consultas e de
+    linhas lidas não depende da quantidade de vendas ou itens.
+    """
+    now = timezone.localtime(now)
+    metrics = {}
+    metrics.update(compute_kpis(now))
+    metrics.update(compute_sales_by_day(now))
+    metrics.update(compute_top_products(now))
+    metrics.update(compute_recent_sales())
+    return metrics
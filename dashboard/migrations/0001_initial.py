@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0002_alter_product_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Data')),
+                ('sales_count', models.IntegerField(default=0, verbose_name='Vendas Finalizadas')),
+                ('sales_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Vendido')),
+                ('items_quantity', models.IntegerField(default=0, verbose_name='Itens Vendidos')),
+                ('debt_payments_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Quitações de Dívidas')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Vendas',
+                'verbose_name_plural': 'Resumos Diários de Vendas',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Quantidade')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Vendido')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária por Produto',
+                'verbose_name_plural': 'Vendas Diárias por Produto',
+                'ordering': ['date'],
+                'unique_together': {('date', 'product')},
+            },
+        ),
+    ]
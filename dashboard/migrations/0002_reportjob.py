@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateTimeField(verbose_name='Início do Período')),
+                ('end_date', models.DateTimeField(verbose_name='Fim do Período')),
+                ('status', models.CharField(choices=[('pending', 'Na fila'), ('running', 'Gerando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=10, verbose_name='Status')),
+                ('file', models.FileField(blank=True, upload_to='reports/', verbose_name='Arquivo')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Relatório em PDF',
+                'verbose_name_plural': 'Relatórios em PDF',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='dashboard_r_status_1a249d_idx')],
+            },
+        ),
+    ]
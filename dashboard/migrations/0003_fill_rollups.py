@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def fill_rollups(apps, schema_editor):
+    """
+    Preenche os resumos diários com o histórico: o dashboard e os
+    relatórios leem só dessas tabelas. `manage.py rebuild_sales_rollups`
+    continua disponível para reconstruções posteriores.
+    """
+    from dashboard.rollups import rebuild_rollups
+
+    rebuild_rollups(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_reportjob'),
+        ('clients', '0001_initial'),
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
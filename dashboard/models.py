@@ -1,3 +1,131 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class DailySalesSummary(models.Model):
+    """
+    Totais diários de vendas finalizadas e quitações de dívidas iniciais.
+
+    Mantido incrementalmente por dashboard.rollups; pode ser reconstruído a
+    partir do histórico com `manage.py rebuild_sales_rollups`.
+    """
+
+    date = models.DateField(unique=True, verbose_name='Data')
+    sales_count = models.IntegerField(
+        default=0, verbose_name='Vendas Finalizadas'
+    )
+    sales_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Total Vendido',
+    )
+    items_quantity = models.IntegerField(
+        default=0, verbose_name='Itens Vendidos'
+    )
+    debt_payments_total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Quitações de Dívidas',
+    )
+
+    class Meta:
+        verbose_name = 'Resumo Diário de Vendas'
+        verbose_name_plural = 'Resumos Diários de Vendas'
+        ordering = ['date']
+
+    def __str__(self):
+        return f'{self.date.strftime("%d/%m/%Y")} - R$ {self.sales_total}'
+
+
+class DailyProductSales(models.Model):
+    """Quantidade e total vendidos de cada produto por dia"""
+
+    date = models.DateField(verbose_name='Data')
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='Produto',
+    )
+    quantity = models.IntegerField(default=0, verbose_name='Quantidade')
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name='Total Vendido',
+    )
+
+    class Meta:
+        verbose_name = 'Venda Diária por Produto'
+        verbose_name_plural = 'Vendas Diárias por Produto'
+        unique_together = ('date', 'product')
+        ordering = ['date']
+
+    def __str__(self):
+        return f'{self.date.strftime("%d/%m/%Y")} - {self.product} x {self.quantity}'
+
+
+class ReportJob(models.Model):
+    """
+    Geração de um relatório em PDF fora do ciclo da requisição.
+
+    Criado pela view na fila (pendente), processado por dashboard.jobs e
+    baixado pelo usuário quando concluído.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Na fila'),
+        (STATUS_RUNNING, 'Gerando'),
+        (STATUS_DONE, 'Concluído'),
+        (STATUS_FAILED, 'Falhou'),
+    ]
+
+    start_date = models.DateTimeField(verbose_name='Início do Período')
+    end_date = models.DateTimeField(verbose_name='Fim do Período')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Status',
+    )
+    file = models.FileField(
+        upload_to='reports/', blank=True, verbose_name='Arquivo'
+    )
+    error = models.TextField(blank=True, verbose_name='Erro')
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs',
+        verbose_name='Solicitado por',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Criado em'
+    )
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Iniciado em'
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name='Concluído em'
+    )
+
+    class Meta:
+        verbose_name = 'Relatório em PDF'
+        verbose_name_plural = 'Relatórios em PDF'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f'Relatório #{self.pk} ({self.get_status_display()})'
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
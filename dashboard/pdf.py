@@ -0,0 +1,229 @@
+"""
+Montagem do relatório financeiro em PDF (reportlab).
+
+Usado pelos jobs de relatório (dashboard.jobs); não depende da requisição.
+"""
+
+from io import BytesIO
+
+from django.utils import timezone
+
+# Imports do reportlab
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    SimpleDocTemplate,
+    Table,
+    TableStyle,
+    Paragraph,
+    Spacer,
+    Image,
+)
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+
+from .charts import render_months_chart, render_products_chart
+
+
+def report_filename(start_date, end_date):
+    """Nome do arquivo do relatório do período"""
+    return (
+        f'relatorio_{start_date.strftime("%Y%m%d")}_'
+        f'{end_date.strftime("%Y%m%d")}.pdf'
+    )
+
+
+def build_report_pdf(report):
+    """Gera o PDF do relatório (ReportData) e retorna os bytes"""
+    start_date, end_date = report.start_date, report.end_date
+    total_vendas = report.total_vendas
+    total_produtos_vendidos = report.total_produtos_vendidos
+    out_of_stock = report.out_of_stock
+    most_sold_product = report.most_sold_product
+    months_labels = report.months_labels
+    months_values = [float(v) for v in report.months_values]
+    product_percentages = report.product_percentages
+
+    # Criar o PDF
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=30,
+        leftMargin=30,
+        topMargin=30,
+        bottomMargin=30,
+    )
+
+    # Container para os elementos do PDF
+    story = []
+
+    # Estilos
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor("#000000"),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor("#000000"),
+        spaceAfter=12,
+        spaceBefore=12,
+    )
+
+    # Título
+    story.append(Paragraph('Relatório Financeiro', title_style))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # Período
+    period_text = f"Período: {start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}"
+    story.append(Paragraph(period_text, styles['Normal']))
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Estatísticas gerais
+    story.append(Paragraph('Estatísticas Gerais', heading_style))
+    stats_data = [
+        [
+            'Total de Vendas',
+            f'R$ {float(total_vendas):,.2f}'.replace(',', 'X')
+            .replace('.', ',')
+            .replace('X', '.'),
+        ],
+        ['Total de Produtos Vendidos', f'{total_produtos_vendidos} unidades'],
+        ['Produtos em Falta', f'{out_of_stock} produtos'],
+    ]
+
+    if most_sold_product:
+        stats_data.append(
+            [
+                'Produto Mais Vendido',
+                f"{most_sold_product.name} ({most_sold_product.quantity} unidades)",
+            ]
+        )
+
+    # Mensagem se não houver dados
+    if not report.has_data:
+        story.append(
+            Paragraph(
+                'Não há vendas no período selecionado.', styles['Normal']
+            )
+        )
+        story.append(Spacer(1, 0.2 * inch))
+
+    stats_table = Table(stats_data, colWidths=[4 * inch, 2.5 * inch])
+    stats_table.setStyle(
+        TableStyle(
+            [
+                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#FEE2E2')),
+                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 11),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+                ('TOPPADDING', (0, 0), (-1, -1), 12),
+                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ]
+        )
+    )
+    story.append(stats_table)
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Gráfico de vendas por mês
+    if months_values:
+        story.append(Paragraph('Vendas por Mês', heading_style))
+
+        png = render_months_chart(months_labels, months_values)
+
+        # Adicionar imagem ao PDF
+        img = Image(BytesIO(png), width=5.5 * inch, height=3.7 * inch)
+        story.append(img)
+        story.append(Spacer(1, 0.3 * inch))
+
+    # Participação por produto
+    if product_percentages:
+        story.append(Paragraph('Participação por Produto', heading_style))
+
+        # Tabela de participação
+        product_data = [['Produto', 'Participação', 'Total Vendido']]
+        for product in product_percentages:
+            product_data.append(
+                [
+                    product.name,
+                    f"{product.percentage:.1f}%",
+                    f"R$ {float(product.total):,.2f}".replace(',', 'X')
+                    .replace('.', ',')
+                    .replace('X', '.'),
+                ]
+            )
+
+        product_table = Table(
+            product_data, colWidths=[2.5 * inch, 2 * inch, 2 * inch]
+        )
+        product_table.setStyle(
+            TableStyle(
+                [
+                    (
+                        'BACKGROUND',
+                        (0, 0),
+                        (-1, 0),
+                        colors.HexColor('#B91C1C'),
+                    ),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTSIZE', (0, 0), (-1, 0), 12),
+                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+                    (
+                        'ROWBACKGROUNDS',
+                        (0, 1),
+                        (-1, -1),
+                        [colors.white, colors.lightgrey],
+                    ),
+                ]
+            )
+        )
+        story.append(product_table)
+        story.append(Spacer(1, 0.3 * inch))
+
+        # Gráfico de pizza
+        png = render_products_chart(
+            [p.name for p in product_percentages],
+            [p.percentage for p in product_percentages],
+        )
+
+        # Adicionar imagem ao PDF
+        img2 = Image(BytesIO(png), width=5.5 * inch, height=3.7 * inch)
+        story.append(img2)
+
+    # Rodapé
+    story.append(Spacer(1, 0.3 * inch))
+    footer_text = (
+        f"Relatório gerado em {timezone.now().strftime('%d/%m/%Y às %H:%M')}"
+    )
+    story.append(
+        Paragraph(
+            footer_text,
+            ParagraphStyle(
+                'Footer',
+                parent=styles['Normal'],
+                alignment=TA_CENTER,
+                fontSize=9,
+                textColor=colors.grey,
+            ),
+        )
+    )
+
+    # Construir PDF
+    doc.build(story)
+
+    return buffer.getvalue()
@@ -0,0 +1,265 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from products.models import Product
+
+from .models import DailyProductSales, DailySalesSummary
+
+
+ZERO = Decimal('0.00')
+
+MONTHS_PT = [
+    'Jan',
+    'Fev',
+    'Mar',
+    'Abr',
+    'Mai',
+    'Jun',
+    'Jul',
+    'Ago',
+    'Set',
+    'Out',
+    'Nov',
+    'Dez',
+]
+
+# Quantidade de produtos exibidos individualmente; o resto vira "Outros"
+TOP_PRODUCTS = 4
+
+
+@dataclass
+class ProductShare:
+    """Participação de um produto (ou do grupo "Outros") no período"""
+
+    name: str
+    quantity: int
+    total: Decimal
+    percentage: Decimal = ZERO
+
+
+@dataclass
+class ReportData:
+    """Resultado do relatório financeiro de um período"""
+
+    start_date: datetime
+    end_date: datetime
+    months_labels: list = field(default_factory=list)
+    months_values: list = field(default_factory=list)
+    product_percentages: list = field(default_factory=list)
+    total_vendas: Decimal = ZERO
+    total_produtos_vendidos: int = 0
+    out_of_stock: int = 0
+    most_sold_product: ProductShare = None
+    least_sold_product: ProductShare = None
+    has_data: bool = False
+
+    def as_json(self):
+        """Formato consumido pelo modal de relatório do dashboard"""
+
+        def product_summary(product):
+            if product is None:
+                return None
+            return {'name': product.name, 'quantity': product.quantity}
+
+        return {
+            'start_date': self.start_date.strftime('%d/%m/%Y'),
+            'end_date': self.end_date.strftime('%d/%m/%Y'),
+            'months': {
+                'labels': self.months_labels,
+                'values': [float(v) for v in self.months_values],
+            },
+            'products': {
+                'labels': [p.name for p in self.product_percentages],
+                'values': [float(p.total) for p in self.product_percentages],
+                'quantities': [p.quantity for p in self.product_percentages],
+                'percentages': [
+                    {
+                        'name': p.name,
+                        'percentage': float(p.percentage),
+                        'total': float(p.total),
+                        'quantity': p.quantity,
+                    }
+                    for p in self.product_percentages
+                ],
+            },
+            'stats': {
+                'total_vendas': float(self.total_vendas),
+                'total_produtos_vendidos': self.total_produtos_vendidos,
+                'out_of_stock': self.out_of_stock,
+                'most_sold_product': product_summary(self.most_sold_product),
+                'least_sold_product': product_summary(
+                    self.least_sold_product
+                ),
+            },
+        }
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_report_period(params):
+    """
+    Lê start_date/end_date (AAAA-MM-DD) dos parâmetros da requisição.
+
+    Padrão: últimos 30 dias. Datas inválidas são ignoradas e mantêm o padrão.
+    """
+    end_date = timezone.now()
+    start_date = end_date - timedelta(days=30)
+
+    naive_start = _parse_date(params.get('start_date'))
+    if naive_start:
+        # Início do dia no timezone local
+        start_date = timezone.make_aware(
+            naive_start.replace(hour=0, minute=0, second=0, microsecond=0)
+        )
+
+    naive_end = _parse_date(params.get('end_date'))
+    if naive_end:
+        # Fim do dia no timezone local
+        end_date = timezone.make_aware(
+            naive_end.replace(
+                hour=23, minute=59, second=59, microsecond=999999
+            )
+        )
+
+    return start_date, end_date
+
+
+def _money(expression):
+    return Coalesce(
+        Sum(expression),
+        ZERO,
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def report_querysets(start_date, end_date):
+    """
+    Consultas agregadas do relatório, lidas dos resumos diários.
+
+    Cada queryset retorna poucas linhas (uma por mês ou por produto) e lê no
+    máximo uma linha por dia do período, independente da quantidade de
+    vendas.
+    """
+    start_day = timezone.localdate(start_date)
+    end_day = timezone.localdate(end_date)
+    return {
+        'months': (
+            DailySalesSummary.objects.filter(
+                date__gte=start_day, date__lte=end_day
+            )
+            .annotate(month=TruncMonth('date'))
+            .values('month')
+            .annotate(
+                sales_total=_money('sales_total'),
+                debt_total=_money('debt_payments_total'),
+                sales_count=Coalesce(Sum('sales_count'), 0),
+            )
+            .order_by('month')
+        ),
+        'products': (
+            DailyProductSales.objects.filter(
+                date__gte=start_day, date__lte=end_day
+            )
+            .values('product__name')
+            .annotate(
+                quantity_sold=Sum('quantity'),
+                total_sold=_money('total'),
+            )
+            .filter(quantity_sold__gt=0)
+            .order_by('-total_sold', 'product__name')
+        ),
+        'out_of_stock': Product.objects.filter(quantity=0),
+    }
+
+
+def assemble_report(start_date, end_date, months, products, out_of_stock):
+    """Monta o ReportData a partir das linhas já agregadas pelo banco"""
+    report = ReportData(
+        start_date=start_date,
+        end_date=end_date,
+        out_of_stock=out_of_stock,
+    )
+
+    # 1. Vendas por mês (vendas finalizadas + quitações de dívidas iniciais)
+    for row in months:
+        total = row['sales_total'] + row['debt_total']
+        if not total and not row['sales_count']:
+            continue
+        report.months_labels.append(MONTHS_PT[row['month'].month - 1])
+        report.months_values.append(total)
+        report.total_vendas += total
+        report.has_data = report.has_data or row['sales_count'] > 0
+
+    # 2. Participação por produto (já ordenado por total vendido)
+    sorted_products = [
+        ProductShare(
+            name=row['product__name'],
+            quantity=row['quantity_sold'],
+            total=row['total_sold'],
+        )
+        for row in products
+    ]
+    report.total_produtos_vendidos = sum(p.quantity for p in sorted_products)
+
+    top_products = sorted_products[:TOP_PRODUCTS]
+    others = sorted_products[TOP_PRODUCTS:]
+    others_total = sum((p.total for p in others), ZERO)
+    if others_total > 0:
+        top_products.append(
+            ProductShare(
+                name='Outros',
+                quantity=sum(p.quantity for p in others),
+                total=others_total,
+            )
+        )
+
+    products_total = sum((p.total for p in sorted_products), ZERO)
+    for product in top_products:
+        product.percentage = (
+            product.total / products_total * 100
+            if products_total > 0
+            else ZERO
+        )
+    report.product_percentages = top_products
+
+    # 3. Produto mais e menos vendido (dos que foram vendidos)
+    if sorted_products:
+        report.most_sold_product = sorted_products[0]
+    if len(sorted_products) > 1:
+        report.least_sold_product = sorted_products[-1]
+
+    return report
+
+
+def build_report(start_date, end_date):
+    """Calcula o relatório financeiro do período com agregações no banco"""
+    querysets = report_querysets(start_date, end_date)
+    return assemble_report(
+        start_date,
+        end_date,
+        months=list(querysets['months']),
+        products=list(querysets['products']),
+        out_of_stock=querysets['out_of_stock'].count(),
+    )
+
+
+async def abuild_report(start_date, end_date):
+    """build_report com o ORM assíncrono (views servidas pelo ASGI)"""
+    querysets = report_querysets(start_date, end_date)
+    return assemble_report(
+        start_date,
+        end_date,
+        months=[row async for row in querysets['months']],
+        products=[row async for row in querysets['products']],
+        out_of_stock=await querysets['out_of_stock'].acount(),
+    )
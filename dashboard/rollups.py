@@ -0,0 +1,192 @@
+"""
+Manutenção incremental das tabelas de resumo diário (rollups).
+
+As vendas entram no resumo do dia em que foram criadas (mesmo critério de
+created_at usado pelos relatórios) no momento em que são finalizadas, e saem
+quando são canceladas, reabertas ou excluídas depois de finalizadas (em
+Sale.delete, o que cobre também o admin). Itens alterados em uma venda já
+finalizada (inline do admin) passam por apply_sale_item.
+"""
+
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySalesSummary
+
+
+ZERO = Decimal('0.00')
+
+
+def _bump_summary(day, **deltas):
+    DailySalesSummary.objects.get_or_create(date=day)
+    DailySalesSummary.objects.filter(date=day).update(
+        **{name: F(name) + value for name, value in deltas.items()}
+    )
+
+
+def apply_sale(sale, sign=1):
+    """
+    Soma (sign=1) ou subtrai (sign=-1) os itens de uma venda finalizada
+    nos resumos do dia em que ela foi criada.
+    """
+    from sales.models import SaleItem
+
+    lines = list(
+        SaleItem.objects.filter(sale_id=sale.pk).values_list(
+            'product_id', 'quantity', 'price'
+        )
+    )
+    _apply_lines(sale, lines, sign, sales_count=sign)
+
+
+def apply_sale_item(sale, product_id, quantity, price, sign=1):
+    """Item incluído (sign=1) ou retirado (sign=-1) de venda finalizada"""
+    _apply_lines(sale, [(product_id, quantity, price)], sign)
+
+
+def _apply_lines(sale, lines, sign, **counts):
+    day = timezone.localdate(sale.created_at)
+    with transaction.atomic():
+        _bump_summary(
+            day,
+            sales_total=sign * sum((q * p for _, q, p in lines), ZERO),
+            items_quantity=sign * sum(q for _, q, _ in lines),
+            **counts,
+        )
+        if not lines:
+            return
+        DailyProductSales.objects.bulk_create(
+            [
+                DailyProductSales(date=day, product_id=product_id)
+                for product_id, _, _ in lines
+            ],
+            ignore_conflicts=True,
+        )
+        for product_id, quantity, price in lines:
+            DailyProductSales.objects.filter(
+                date=day, product_id=product_id
+            ).update(
+                quantity=F('quantity') + sign * quantity,
+                total=F('total') + sign * quantity * price,
+            )
+
+
+def apply_debt_payment(debt_payment):
+    """Soma uma quitação de dívida inicial no resumo do dia"""
+    _bump_summary(
+        timezone.localdate(debt_payment.created_at),
+        debt_payments_total=debt_payment.amount,
+    )
+
+
+def _money(expression):
+    return Coalesce(
+        Sum(expression),
+        ZERO,
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def rebuild_rollups(start=None, end=None, apps=global_apps):
+    """
+    Reconstrói os resumos diários a partir do histórico de vendas.
+
+    start/end são datas (inclusive); sem elas, todo o histórico é refeito.
+    `apps` permite usar os modelos históricos (migração que preenche as
+    tabelas). Retorna a quantidade de dias e de linhas por produto gravadas.
+    """
+    from sales.models import Sale as CurrentSale
+
+    DailySalesSummary = apps.get_model('dashboard', 'DailySalesSummary')
+    DailyProductSales = apps.get_model('dashboard', 'DailyProductSales')
+    DebtPayment = apps.get_model('clients', 'DebtPayment')
+    Sale = apps.get_model('sales', 'Sale')
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    # Modelos históricos não têm as constantes da classe
+    finalized = CurrentSale.STATUS_FINALIZED
+
+    def in_range(queryset, prefix):
+        if start:
+            queryset = queryset.filter(**{f'{prefix}__date__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{prefix}__date__lte': end})
+        return queryset
+
+    sales = (
+        in_range(
+            Sale.objects.filter(status=finalized), 'created_at'
+        )
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(
+            count=Count('id', distinct=True),
+            total=_money(F('items__price') * F('items__quantity')),
+            quantity=Coalesce(Sum('items__quantity'), 0),
+        )
+    )
+    debts = (
+        in_range(DebtPayment.objects.all(), 'created_at')
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(total=_money('amount'))
+    )
+    products = (
+        in_range(
+            SaleItem.objects.filter(sale__status=finalized),
+            'sale__created_at',
+        )
+        .annotate(day=TruncDate('sale__created_at'))
+        .values('day', 'product_id')
+        .annotate(
+            quantity_sold=Sum('quantity'),
+            total_sold=_money(F('price') * F('quantity')),
+        )
+    )
+
+    summaries = {}
+    for row in sales:
+        summaries[row['day']] = DailySalesSummary(
+            date=row['day'],
+            sales_count=row['count'],
+            sales_total=row['total'],
+            items_quantity=row['quantity'],
+        )
+    for row in debts:
+        summary = summaries.setdefault(
+            row['day'], DailySalesSummary(date=row['day'])
+        )
+        summary.debt_payments_total = row['total']
+
+    product_rows = [
+        DailyProductSales(
+            date=row['day'],
+            product_id=row['product_id'],
+            quantity=row['quantity_sold'],
+            total=row['total_sold'],
+        )
+        for row in products
+    ]
+
+    with transaction.atomic():
+        old_summaries = DailySalesSummary.objects.all()
+        old_products = DailyProductSales.objects.all()
+        if start:
+            old_summaries = old_summaries.filter(date__gte=start)
+            old_products = old_products.filter(date__gte=start)
+        if end:
+            old_summaries = old_summaries.filter(date__lte=end)
+            old_products = old_products.filter(date__lte=end)
+        old_summaries.delete()
+        old_products.delete()
+
+        DailySalesSummary.objects.bulk_create(
+            summaries.values(), batch_size=1000
+        )
+        DailyProductSales.objects.bulk_create(product_rows, batch_size=1000)
+
+    return len(summaries), len(product_rows)
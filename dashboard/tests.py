@@ -1,3 +1,94 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.jobs import claim_job, enqueue_report, run_job
+from dashboard.models import ReportJob
+
+
+@override_settings(REPORT_JOBS_IN_PROCESS=False, REPORT_JOB_TIMEOUT=60)
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('dono', password='x')
+        self.end = timezone.now()
+        self.start = self.end - timedelta(days=30)
+
+    def test_reuses_job_in_progress(self):
+        job = enqueue_report(self.start, self.end, user=self.user)
+
+        self.assertEqual(
+            enqueue_report(self.start, self.end, user=self.user), job
+        )
+
+    def test_stale_running_job_fails_and_is_not_reused(self):
+        # Processo reiniciado no meio da geração
+        job = enqueue_report(self.start, self.end, user=self.user)
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=ReportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(minutes=5),
+        )
+
+        new_job = enqueue_report(self.start, self.end, user=self.user)
+
+        self.assertNotEqual(new_job, job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+
+    def test_stale_pending_job_fails_on_status_poll(self):
+        job = enqueue_report(self.start, self.end, user=self.user)
+        ReportJob.objects.filter(pk=job.pk).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('report_job_status', args=[job.pk]))
+
+        self.assertContains(response, 'Não foi possível gerar o relatório')
+
+    def test_jobs_of_other_users_are_not_found(self):
+        job = enqueue_report(self.start, self.end, user=self.user)
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=ReportJob.STATUS_DONE
+        )
+        other = User.objects.create_user('outro', password='x')
+        self.client.force_login(other)
+
+        for name in (
+            'report_job_detail',
+            'report_job_status',
+            'report_job_download',
+        ):
+            response = self.client.get(reverse(name, args=[job.pk]))
+            self.assertEqual(response.status_code, 404, name)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_render_finishing_after_expiry_keeps_failure(self):
+        job = enqueue_report(self.start, self.end, user=self.user)
+        job = claim_job(job.pk)
+
+        def slow_build(start, end):
+            # Passou do REPORT_JOB_TIMEOUT durante a geração
+            ReportJob.objects.filter(pk=job.pk).update(
+                started_at=timezone.now() - timedelta(minutes=5)
+            )
+            enqueue_report(self.start, self.end, user=self.user)
+            return {}
+
+        with mock.patch('dashboard.jobs.build_report', slow_build):
+            with mock.patch(
+                'dashboard.jobs.build_report_pdf', return_value=b'%PDF'
+            ):
+                run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_FAILED)
+        self.assertFalse(job.file)
+        _, files = default_storage.listdir('reports')
+        self.assertEqual(files, [])
@@ -3,6 +3,12 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
+    path('eventos/', views.dashboard_events, name='dashboard_events'),
+    path(
+        'fragmentos/<str:name>/',
+        views.dashboard_fragment,
+        name='dashboard_fragment',
+    ),
     path(
         'dados-relatorio/',
         views.generate_report_data,
@@ -13,4 +19,19 @@ urlpatterns = [
         views.generate_report_pdf,
         name='generate_report_pdf',
     ),
+    path(
+        'relatorios/<int:job_id>/',
+        views.report_job_detail,
+        name='report_job_detail',
+    ),
+    path(
+        'relatorios/<int:job_id>/status/',
+        views.report_job_status,
+        name='report_job_status',
+    ),
+    path(
+        'relatorios/<int:job_id>/download/',
+        views.report_job_download,
+        name='report_job_download',
+    ),
 ]
@@ -1,3 +1,34 @@
 from django.contrib import admin
+from .models import InventorySnapshot, StockMovement
 
-# Register your models here.
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['product', 'quantity', 'kind', 'created_at', 'note']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['product__name', 'note']
+    list_select_related = ['product']
+    readonly_fields = [
+        'product',
+        'quantity',
+        'kind',
+        'sale',
+        'note',
+        'created_at',
+    ]
+
+    def has_add_permission(self, request):
+        # Movimentações são geradas pela aplicação (somente inclusão)
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['product', 'taken_at', 'quantity', 'cost_price']
+    list_filter = ['taken_at']
+    search_fields = ['product__name']
+    list_select_related = ['product']
+    date_hierarchy = 'taken_at'
@@ -1,6 +1,28 @@
+import sys
+
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def restore_search_index(sender, using, verbosity=1, stdout=None, **kwargs):
+    """Migrações que recriam products_product apagam os gatilhos do FTS5"""
+    from .search_index import ensure_search_index
+
+    missing = ensure_search_index(using)
+    if missing and verbosity:
+        (stdout or sys.stdout).write(
+            f'  Índice de busca de produtos recriado: {", ".join(missing)}\n'
+        )
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from .catalog import invalidate_catalog
+
+        Product = self.get_model('Product')
+        post_save.connect(invalidate_catalog, sender=Product)
+        post_delete.connect(invalidate_catalog, sender=Product)
+        post_migrate.connect(restore_search_index, sender=self)
@@ -0,0 +1,172 @@
+"""
+Catálogo de produtos em memória para a caixa (busca e lista do modal).
+
+Cada processo guarda os produtos ativos como tuplas (CatalogRow) em ordem
+de nome, e a maior parte das requisições da venda não consulta a tabela de
+produtos. A coerência entre os workers vem de duas versões gravadas no
+cache de contadores (CATALOG_VERSION_CACHE):
+
+- versão do catálogo: muda em qualquer Product.save (post_save) e na
+  importação; o processo recarrega o catálogo inteiro;
+- versão do estoque: muda a cada baixa/devolução (products.stock); o
+  processo relê só as quantidades dos produtos com StockMovement desde a
+  última atualização.
+
+Quantidades no catálogo são para exibição: a baixa continua sendo
+conferida no UPDATE condicional de take_stock.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Product, StockMovement
+
+
+CATALOG_VERSION_KEY = 'products:catalog-version'
+STOCK_VERSION_KEY = 'products:stock-version'
+
+# Recarga completa periódica, para corrigir alterações feitas sem
+# Product.save (ex.: QuerySet.update)
+CATALOG_MAX_AGE = 60 * 10
+
+# Margem ao reler movimentações: transações gravadas um pouco antes da
+# última atualização, mas confirmadas depois dela
+STOCK_REFRESH_OVERLAP = timedelta(seconds=30)
+
+CatalogRow = namedtuple(
+    'CatalogRow',
+    ['product_id', 'name', 'sale_price', 'quantity', 'category'],
+)
+
+
+def _shared():
+    return caches[getattr(settings, 'CATALOG_VERSION_CACHE', 'default')]
+
+
+def _bump(key):
+    shared = _shared()
+    try:
+        shared.incr(key)
+    except ValueError:
+        shared.add(key, 1, timeout=None)
+
+
+def catalog_version():
+    return _shared().get(CATALOG_VERSION_KEY, 0)
+
+
+def stock_version():
+    return _shared().get(STOCK_VERSION_KEY, 0)
+
+
+def bump_catalog_version():
+    """Invalida os catálogos de todos os processos (após o commit)"""
+    transaction.on_commit(lambda: _bump(CATALOG_VERSION_KEY))
+
+
+def bump_stock_version():
+    """Avisa os processos que quantidades mudaram (após o commit)"""
+    transaction.on_commit(lambda: _bump(STOCK_VERSION_KEY))
+
+
+class Catalog:
+    """Produtos ativos do processo, em ordem de nome"""
+
+    def __init__(self):
+        self.rows = {}
+        self.order = []
+        self.versions = None
+        self.loaded_at = 0
+        self.synced_at = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'loads': 0, 'stock_refreshes': 0}
+
+    def _versions(self):
+        shared = _shared()
+        versions = shared.get_many([CATALOG_VERSION_KEY, STOCK_VERSION_KEY])
+        return (
+            versions.get(CATALOG_VERSION_KEY, 0),
+            versions.get(STOCK_VERSION_KEY, 0),
+        )
+
+    def _load(self):
+        synced_at = timezone.now()
+        rows = Product.objects.filter(is_active=True).order_by('name', 'pk')
+        self.rows = {
+            row[0]: CatalogRow(*row)
+            for row in rows.values_list(
+                'pk', 'name', 'sale_price', 'quantity', 'category'
+            ).iterator(chunk_size=5000)
+        }
+        self.order = list(self.rows)
+        self.loaded_at = time.monotonic()
+        self.synced_at = synced_at
+        self.stats['loads'] += 1
+
+    def _refresh_stock(self):
+        synced_at = timezone.now()
+        changed = set(
+            StockMovement.objects.filter(
+                created_at__gte=self.synced_at - STOCK_REFRESH_OVERLAP
+            ).values_list('product_id', flat=True)
+        )
+        if changed:
+            for pk, quantity in Product.objects.filter(
+                pk__in=changed, is_active=True
+            ).values_list('pk', 'quantity'):
+                row = self.rows.get(pk)
+                if row is not None:
+                    self.rows[pk] = row._replace(quantity=quantity)
+        self.synced_at = synced_at
+        self.stats['stock_refreshes'] += 1
+
+    def sync(self):
+        """Atualiza o catálogo se outro processo alterou produtos/estoque"""
+        from core.middleware import timed
+
+        versions = self._versions()
+        with self._lock, timed('catalog'):
+            expired = time.monotonic() - self.loaded_at > CATALOG_MAX_AGE
+            if self.versions is None or expired or (
+                versions[0] != self.versions[0]
+            ):
+                self._load()
+            elif versions[1] != self.versions[1]:
+                self._refresh_stock()
+            else:
+                self.stats['hits'] += 1
+            self.versions = versions
+        return self
+
+    def get(self, pk):
+        return self.rows.get(pk)
+
+    def in_stock(self, limit):
+        """Primeiros `limit` produtos com estoque, em ordem de nome"""
+        found = []
+        for pk in self.order:
+            row = self.rows[pk]
+            if row.quantity > 0:
+                found.append(row)
+                if len(found) >= limit:
+                    break
+        return found
+
+
+catalog = Catalog()
+
+
+def get_catalog():
+    return catalog.sync()
+
+
+def invalidate_catalog(sender, **kwargs):
+    """Receptor de post_save/post_delete de Product (ProductsConfig)"""
+    bump_catalog_version()
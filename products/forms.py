@@ -11,3 +11,16 @@ class ProductForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         for field in self.fields.values():
             field.widget.attrs.update({'class': 'input input-bordered w-full'})
+
+
+class ProductImportForm(forms.Form):
+    file = forms.FileField(label='Arquivo CSV')
+    dry_run = forms.BooleanField(
+        label='Apenas validar (não gravar)', required=False
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith('.csv'):
+            raise forms.ValidationError('Envie um arquivo .csv.')
+        return file
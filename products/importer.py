@@ -0,0 +1,207 @@
+"""
+Importação do catálogo de produtos a partir de CSV.
+
+O arquivo é lido linha a linha, cada linha é validada pelas regras do
+ProductForm e as válidas são gravadas em lotes com bulk_create: linhas com
+product_id de um produto existente o atualizam (update_conflicts), as demais
+criam produtos novos. Linhas inválidas são ignoradas e relatadas. As
+diferenças de quantidade entram no histórico de estoque (StockMovement).
+"""
+
+import csv
+import itertools
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .forms import ProductForm
+from .models import Product, StockMovement
+from .catalog import bump_catalog_version
+from .search import normalize
+from .stock import record_movements
+
+
+IMPORT_BATCH_SIZE = 1000
+
+# Colunas gravadas (e atualizadas, no caso de produtos existentes)
+IMPORT_FIELDS = [
+    'name',
+    'category',
+    'sale_price',
+    'cost_price',
+    'quantity',
+    'low_quantity',
+]
+
+DEFAULTS = {
+    'category': Product.Category.SEM_CATEGORIA,
+    'quantity': '0',
+    'low_quantity': '0',
+}
+
+# Limite de erros guardados no resultado (o total é sempre contado)
+MAX_REPORTED_ERRORS = 200
+
+_CATEGORY_BY_LABEL = {
+    label.lower(): value for value, label in Product.Category.choices
+}
+
+
+@dataclass
+class RowError:
+    line: int
+    message: str
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    dry_run: bool = False
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line, message))
+
+
+def _normalize(row):
+    """Ajusta uma linha do CSV para o formato esperado pelo ProductForm"""
+    data = {
+        key.strip().lower(): (value or '').strip()
+        for key, value in row.items()
+        if key
+    }
+    for name, default in DEFAULTS.items():
+        if not data.get(name):
+            data[name] = default
+
+    # Aceita o nome da categoria ("Boné") além do código ("BONE")
+    category = data['category']
+    data['category'] = _CATEGORY_BY_LABEL.get(category.lower(), category)
+
+    # Aceita decimais com vírgula (19,90)
+    for name in ('sale_price', 'cost_price'):
+        data[name] = data.get(name, '').replace(',', '.')
+    return data
+
+
+def _form_errors(form):
+    messages = []
+    for name, errors in form.errors.items():
+        prefix = '' if name == '__all__' else f'{name}: '
+        messages.append(prefix + ' '.join(errors))
+    return '; '.join(messages)
+
+
+def _open_reader(stream):
+    first_line = stream.readline()
+    delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+    # O cabeçalho volta para o DictReader, para line_num contar essa linha
+    return csv.DictReader(
+        itertools.chain([first_line], stream), delimiter=delimiter
+    )
+
+
+def _write_batch(batch, result):
+    """Grava um lote de (linha, produto); produtos com pk são atualizados"""
+    ids = [product.pk for _, product in batch if product.pk]
+    with transaction.atomic():
+        existing = Product.objects.filter(pk__in=ids)
+        if not result.dry_run:
+            existing = existing.select_for_update()
+        # Quantidade atual, para lançar a diferença no histórico de estoque
+        previous = dict(existing.values_list('pk', 'quantity'))
+
+        products = []
+        for line, product in batch:
+            if product.pk and product.pk not in previous:
+                result.add_error(
+                    line, f'product_id: produto {product.pk} não encontrado.'
+                )
+                continue
+            products.append(product)
+
+        if not result.dry_run and products:
+            # bulk_create não passa por Product.save
+            for product in products:
+                product.search_name = normalize(product.name)
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['product_id'],
+                update_fields=IMPORT_FIELDS + ['search_name', 'updated_at'],
+            )
+            record_movements(
+                {
+                    product.pk: product.quantity
+                    - previous.get(product.pk, 0)
+                    for product in products
+                },
+                StockMovement.KIND_IMPORT,
+                note='Importação de CSV',
+            )
+
+    updated = sum(1 for product in products if product.pk in previous)
+    result.updated += updated
+    result.created += len(products) - updated
+
+
+def import_products(stream, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    Importa produtos de um CSV (arquivo de texto) e retorna um ImportResult.
+
+    Colunas: name, sale_price, cost_price e, opcionais, product_id,
+    category, quantity e low_quantity. Separador ',' ou ';'.
+    Com dry_run=True apenas valida, sem gravar.
+    """
+    result = ImportResult(dry_run=dry_run)
+    reader = _open_reader(stream)
+    missing = {'name', 'sale_price', 'cost_price'} - {
+        (name or '').strip().lower() for name in reader.fieldnames or []
+    }
+    if missing:
+        result.add_error(
+            1, f'Colunas obrigatórias ausentes: {", ".join(sorted(missing))}.'
+        )
+        return result
+
+    batch = []
+    seen_ids = set()
+    for row in reader:
+        line = reader.line_num
+        data = _normalize(row)
+        product_id = data.get('product_id', '')
+        if product_id and not product_id.isdigit():
+            result.add_error(line, 'product_id: valor inválido.')
+            continue
+        if product_id and int(product_id) in seen_ids:
+            result.add_error(
+                line, f'product_id: {product_id} repetido no arquivo.'
+            )
+            continue
+
+        form = ProductForm(data=data)
+        if not form.is_valid():
+            result.add_error(line, _form_errors(form))
+            continue
+
+        product = form.save(commit=False)
+        if product_id:
+            product.pk = int(product_id)
+            seen_ids.add(product.pk)
+        batch.append((line, product))
+
+        if len(batch) >= batch_size:
+            _write_batch(batch, result)
+            batch = []
+
+    if batch:
+        _write_batch(batch, result)
+    if not dry_run and result.created + result.updated:
+        # bulk_create não dispara post_save
+        bump_catalog_version()
+    result.errors.sort(key=lambda error: error.line)
+    return result
@@ -0,0 +1,208 @@
+"""
+Estoque em uma data e valorização do estoque.
+
+A quantidade de um produto em uma data sai da posição conhecida mais
+próxima mais as movimentações (StockMovement) entre as duas datas, sem
+percorrer as vendas:
+
+- inventário anterior (InventorySnapshot) + movimentações até a data;
+- inventário posterior - movimentações depois da data;
+- quantidade atual (Product.quantity) - movimentações depois da data.
+
+Usa-se a base mais próxima da data, então o intervalo de movimentações
+lido é limitado pela frequência dos inventários.
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    DecimalField,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import InventorySnapshot, Product, StockMovement
+from .stock import record_movements
+
+
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+@dataclass
+class StockValuation:
+    """Valorização do estoque (preço de custo × quantidade) em uma data"""
+
+    at: object
+    quantity: int = 0
+    value: Decimal = ZERO
+    # categoria: (quantidade, valor)
+    by_category: dict = field(default_factory=dict)
+    # Data da base usada (inventário ou None para a posição atual)
+    base: object = None
+
+
+def take_snapshot(at=None):
+    """
+    Grava a posição atual do estoque como inventário e retorna o número de
+    produtos incluídos. Produtos zerados ficam de fora.
+    """
+    taken_at = at or timezone.now()
+    with transaction.atomic():
+        rows = (
+            Product.objects.exclude(quantity=0)
+            .order_by('pk')
+            .values_list('pk', 'quantity', 'cost_price')
+        )
+        snapshots = [
+            InventorySnapshot(
+                product_id=pk,
+                taken_at=taken_at,
+                quantity=quantity,
+                cost_price=cost_price,
+            )
+            for pk, quantity, cost_price in rows.iterator(
+                chunk_size=SNAPSHOT_BATCH_SIZE
+            )
+        ]
+        InventorySnapshot.objects.bulk_create(
+            snapshots, batch_size=SNAPSHOT_BATCH_SIZE
+        )
+    return len(snapshots)
+
+
+def _movements(**filters):
+    """Soma das movimentações de cada produto no intervalo"""
+    moved = (
+        StockMovement.objects.filter(product=OuterRef('pk'), **filters)
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return Coalesce(Subquery(moved, output_field=IntegerField()), Value(0))
+
+
+def _snapshot(taken_at, field_name, output_field):
+    row = InventorySnapshot.objects.filter(
+        product=OuterRef('pk'), taken_at=taken_at
+    ).values(field_name)[:1]
+    return Subquery(row, output_field=output_field)
+
+
+def _nearest_base(at):
+    """(data da base, é inventário) mais próxima de `at`"""
+    now = timezone.now()
+    before = (
+        InventorySnapshot.objects.filter(taken_at__lte=at)
+        .order_by('-taken_at')
+        .values_list('taken_at', flat=True)
+        .first()
+    )
+    after = (
+        InventorySnapshot.objects.filter(taken_at__gt=at)
+        .order_by('taken_at')
+        .values_list('taken_at', flat=True)
+        .first()
+    )
+    candidates = [(now, False)]
+    if before is not None:
+        candidates.append((before, True))
+    if after is not None:
+        candidates.append((after, True))
+    return min(candidates, key=lambda base: abs(base[0] - at))
+
+
+def stock_at(at, queryset=None):
+    """
+    Produtos anotados com `stock_quantity` (quantidade em `at`) e
+    `unit_cost` (custo do inventário usado, ou o custo atual).
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    return _annotate_stock(queryset, at, *_nearest_base(at))
+
+
+def _annotate_stock(queryset, at, base, is_snapshot):
+    if not is_snapshot:
+        return queryset.annotate(
+            stock_quantity=F('quantity') - _movements(created_at__gt=at),
+            unit_cost=F('cost_price'),
+        )
+
+    start = _snapshot(base, 'quantity', IntegerField())
+    if base <= at:
+        moved = _movements(created_at__gt=base, created_at__lte=at)
+        quantity = Coalesce(start, Value(0)) + moved
+    else:
+        moved = _movements(created_at__gt=at, created_at__lte=base)
+        quantity = Coalesce(start, Value(0)) - moved
+    return queryset.annotate(
+        stock_quantity=quantity,
+        unit_cost=Coalesce(
+            _snapshot(base, 'cost_price', MONEY), F('cost_price')
+        ),
+    )
+
+
+def stock_valuation(at):
+    """Valorização do estoque em `at`, no total e por categoria"""
+    base, is_snapshot = _nearest_base(at)
+    rows = (
+        _annotate_stock(Product.objects.all(), at, base, is_snapshot)
+        .filter(~Q(stock_quantity=0))
+        .values('category')
+        .annotate(
+            total_quantity=Sum('stock_quantity'),
+            total_value=Sum(
+                F('stock_quantity') * F('unit_cost'), output_field=MONEY
+            ),
+        )
+        .order_by('category')
+    )
+    labels = dict(Product.Category.choices)
+    valuation = StockValuation(at=at, base=base if is_snapshot else None)
+    for row in rows:
+        label = labels.get(row['category'], row['category'])
+        value = (row['total_value'] or ZERO).quantize(Decimal('0.01'))
+        valuation.by_category[label] = (row['total_quantity'], value)
+        valuation.quantity += row['total_quantity']
+        valuation.value += value
+    return valuation
+
+
+def stock_discrepancies():
+    """Produtos cuja quantidade não bate com a soma das movimentações"""
+    return (
+        Product.objects.annotate(journal_quantity=_movements())
+        .exclude(quantity=F('journal_quantity'))
+        .order_by('pk')
+    )
+
+
+def reconcile_stock():
+    """
+    Lança como ajuste a diferença entre a quantidade de cada produto e o
+    histórico de movimentações. Retorna o número de produtos ajustados.
+    """
+    with transaction.atomic():
+        differences = {
+            pk: quantity - journal
+            for pk, quantity, journal in stock_discrepancies()
+            .select_for_update()
+            .values_list('pk', 'quantity', 'journal_quantity')
+        }
+        record_movements(
+            differences,
+            StockMovement.KIND_ADJUSTMENT,
+            note='Conciliação automática',
+        )
+    return len(differences)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import IMPORT_BATCH_SIZE, import_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa o catálogo de produtos de um arquivo CSV (colunas: name, '
+        'sale_price, cost_price e, opcionais, product_id, category, quantity '
+        'e low_quantity). Linhas com product_id atualizam o produto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo CSV (UTF-8).')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Produtos gravados por lote (padrão: {IMPORT_BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas valida o arquivo, sem gravar.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(
+                options['path'], encoding='utf-8-sig', newline=''
+            ) as stream:
+                result = import_products(
+                    stream,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'Não foi possível ler o arquivo: {e}')
+
+        for error in result.errors:
+            self.stdout.write(f'Linha {error.line}: {error.message}')
+        if result.error_count > len(result.errors):
+            self.stdout.write(
+                f'... e mais {result.error_count - len(result.errors)} erro(s).'
+            )
+
+        prefix = '[simulação] ' if result.dry_run else ''
+        style = self.style.WARNING if result.error_count else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f'{prefix}{result.created} produto(s) criado(s), '
+                f'{result.updated} atualizado(s), '
+                f'{result.error_count} linha(s) com erro.'
+            )
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from products.inventory import reconcile_stock, stock_discrepancies
+
+
+class Command(BaseCommand):
+    help = (
+        'Confere a quantidade de cada produto com a soma do histórico de '
+        'movimentações de estoque. Use --fix para lançar ajustes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Lança ajustes para os produtos com divergência.',
+        )
+
+    def handle(self, *args, **options):
+        divergent = list(
+            stock_discrepancies().values_list(
+                'pk', 'name', 'quantity', 'journal_quantity'
+            )
+        )
+        for pk, name, quantity, journal in divergent:
+            self.stdout.write(
+                f'Produto #{pk} ({name}): quantidade {quantity}, '
+                f'histórico {journal}'
+            )
+
+        if not divergent:
+            self.stdout.write(
+                self.style.SUCCESS('Todos os estoques conferem.')
+            )
+            return
+
+        if not options['fix']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{len(divergent)} produto(s) com divergência. '
+                    f'Execute novamente com --fix para corrigir.'
+                )
+            )
+            return
+
+        count = reconcile_stock()
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} produto(s) ajustado(s).')
+        )
@@ -0,0 +1,53 @@
+import calendar
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from products.inventory import stock_valuation
+
+
+class Command(BaseCommand):
+    help = (
+        'Valorização do estoque (preço de custo × quantidade) no fim de um '
+        'dia (--date AAAA-MM-DD) ou de um mês (--month AAAA-MM). Sem '
+        'argumentos, usa a posição atual.'
+    )
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--date', help='Fim do dia AAAA-MM-DD.')
+        group.add_argument('--month', help='Fim do mês AAAA-MM.')
+
+    def _end_of_day(self, day):
+        return timezone.make_aware(datetime.combine(day, time.max))
+
+    def handle(self, *args, **options):
+        try:
+            if options['date']:
+                at = self._end_of_day(date.fromisoformat(options['date']))
+            elif options['month']:
+                year, month = map(int, options['month'].split('-'))
+                last_day = calendar.monthrange(year, month)[1]
+                at = self._end_of_day(date(year, month, last_day))
+            else:
+                at = timezone.now()
+        except ValueError:
+            raise CommandError('Data inválida.')
+
+        valuation = stock_valuation(at)
+        self.stdout.write(
+            f'Estoque em {timezone.localtime(at):%d/%m/%Y %H:%M}'
+        )
+        if valuation.base:
+            self.stdout.write(
+                f'(a partir do inventário de '
+                f'{timezone.localtime(valuation.base):%d/%m/%Y %H:%M})'
+            )
+        for category, (quantity, value) in valuation.by_category.items():
+            self.stdout.write(f'  {category}: {quantity} un., R$ {value}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Total: {valuation.quantity} un., R$ {valuation.value}'
+            )
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.inventory import take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava a posição atual do estoque como inventário '
+        '(InventorySnapshot). Agende periodicamente (ex.: diário ou no fechamento do mês) para '
+        'limitar as movimentações lidas nas consultas de estoque por data.'
+    )
+
+    def handle(self, *args, **options):
+        count = take_snapshot()
+        self.stdout.write(
+            self.style.SUCCESS(f'Inventário gravado: {count} produto(s).')
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.CharField(choices=[('SEM-CAT', 'Sem Categoria'), ('BONE', 'Boné'), ('ESP-MASC', 'Esportiva - Masculino'), ('ESP-FEM', 'Esportiva - Feminino'), ('SOC-MASC', 'Social - Masculino'), ('SOC-FEM', 'Social - Feminino'), ('LINGERIE', 'Lingerie'), ('CASUAL', 'Casual'), ('JEANS', 'Jeans'), ('TEN-MASC', 'Tenis - Masculino'), ('TEN-FEM', 'Tenis - Feminino'), ('SANDALIAS', 'Sandálias'), ('ACESSORIOS', 'Acessórios'), ('OUTROS', 'Outros')], default='SEM-CAT', max_length=20, verbose_name='Categoria'),
+        ),
+    ]
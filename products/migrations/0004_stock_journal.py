@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_stock_journal(apps, schema_editor):
+    """Saldo de abertura do histórico: a quantidade atual de cada produto"""
+    Product = apps.get_model('products', 'Product')
+    StockMovement = apps.get_model('products', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                product_id=product_id,
+                quantity=quantity,
+                kind='opening',
+                note='Saldo de abertura',
+            )
+            for product_id, quantity in Product.objects.exclude(
+                quantity=0
+            ).values_list('pk', 'quantity')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_hot_filter_indexes'),
+        ('sales', '0003_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(verbose_name='Data do Inventário')),
+                ('quantity', models.IntegerField(verbose_name='Quantidade')),
+                ('cost_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço de Custo')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='products.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Inventário',
+                'verbose_name_plural': 'Inventários',
+                'ordering': ['-taken_at', 'product'],
+                'indexes': [models.Index(fields=['taken_at'], name='inventorysnapshot_taken_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'taken_at'), name='inventorysnapshot_product_taken_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Quantidade')),
+                ('kind', models.CharField(choices=[('opening', 'Saldo de abertura'), ('initial', 'Estoque inicial'), ('edit', 'Edição do produto'), ('import', 'Importação'), ('sale', 'Venda'), ('return', 'Devolução de item'), ('cancel', 'Cancelamento de venda'), ('reopen', 'Reabertura de venda'), ('sale_delete', 'Exclusão de venda'), ('adjustment', 'Ajuste de conciliação')], max_length=20, verbose_name='Tipo')),
+                ('note', models.CharField(blank=True, max_length=255, verbose_name='Observação')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product', verbose_name='Produto')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='sales.sale', verbose_name='Venda')),
+            ],
+            options={
+                'verbose_name': 'Movimentação de Estoque',
+                'verbose_name_plural': 'Movimentações de Estoque',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='stockmove_product_created_idx'), models.Index(fields=['created_at'], name='stockmove_created_idx')],
+            },
+        ),
+        migrations.RunPython(open_stock_journal, migrations.RunPython.noop),
+    ]
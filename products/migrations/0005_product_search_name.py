@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:04
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def fill_search_name(apps, schema_editor):
+    """Nome normalizado (igual a products.search.normalize)"""
+    Product = apps.get_model('products', 'Product')
+
+    def normalize(text):
+        text = unicodedata.normalize('NFKD', text or '')
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+        return ' '.join(text.casefold().split())
+
+    batch = []
+    for product in Product.objects.only('pk', 'name').iterator(
+        chunk_size=1000
+    ):
+        product.search_name = normalize(product.name)
+        batch.append(product)
+        if len(batch) >= 1000:
+            Product.objects.bulk_update(batch, ['search_name'])
+            batch = []
+    Product.objects.bulk_update(batch, ['search_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_stock_journal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['search_name'], name='product_active_search_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from products.search_index import create_search_index, drop_search_index
+
+
+def create_index(apps, schema_editor):
+    """
+    Índice de trigramas da busca por trecho: FTS5 (mantido por gatilhos)
+    no SQLite e GIN com pg_trgm no PostgreSQL. Bancos criados antes desta
+    migração já podem ter os índices (eram criados após o migrate).
+    """
+    create_search_index(schema_editor, apps.get_model('products', 'Product'))
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_search_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
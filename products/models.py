@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 
 class Product(models.Model):
@@ -20,6 +20,10 @@ class Product(models.Model):
 
     product_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255, blank=False, verbose_name='Nome')
+    # Nome normalizado para a busca (products.search)
+    search_name = models.CharField(
+        max_length=255, blank=True, default='', editable=False
+    )
     category = models.CharField(
         max_length=20,
         choices=Category.choices,
@@ -51,9 +55,182 @@ class Product(models.Model):
 
     is_active = models.BooleanField(default=True, verbose_name='Ativo')
 
+    class Meta:
+        # Parciais (só produtos ativos): o filtro is_active=True vira
+        # WHERE "is_active", que só casa com o índice pela condição
+        indexes = [
+            # Estoque ativo por quantidade (estoque baixo, esgotados)
+            models.Index(
+                fields=['quantity'],
+                condition=models.Q(is_active=True),
+                name='product_active_quantity_idx',
+            ),
+            # Listagens e buscas de produtos ativos ordenadas por nome
+            models.Index(
+                fields=['name'],
+                condition=models.Q(is_active=True),
+                name='product_active_name_idx',
+            ),
+            # Busca por prefixo do nome normalizado
+            models.Index(
+                fields=['search_name'],
+                condition=models.Q(is_active=True),
+                name='product_active_search_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from .search import normalize
+
+        creating = self.pk is None
+        update_fields = kwargs.get('update_fields')
+        tracks_quantity = update_fields is None or 'quantity' in update_fields
+        self.search_name = normalize(self.name)
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        with transaction.atomic():
+            previous = 0
+            if not creating and tracks_quantity:
+                previous = (
+                    Product.objects.filter(pk=self.pk)
+                    .values_list('quantity', flat=True)
+                    .first()
+                ) or 0
+            super().save(*args, **kwargs)
+            # Cadastro e edição manual da quantidade entram no histórico
+            diff = self.quantity - previous if tracks_quantity else 0
+            if diff:
+                StockMovement.objects.create(
+                    product=self,
+                    quantity=diff,
+                    kind=(
+                        StockMovement.KIND_INITIAL
+                        if creating
+                        else StockMovement.KIND_EDIT
+                    ),
+                )
+
     def soft_delete(self):
         self.is_active = False
-        self.save()
+        self.save(update_fields=['is_active', 'updated_at'])
+
+
+class StockMovement(models.Model):
+    """
+    Movimentação de estoque (somente inclusão).
+
+    Toda mudança em Product.quantity gera uma movimentação com a quantidade
+    assinada (negativa nas saídas), de modo que a quantidade de um produto
+    em qualquer data é a de um InventorySnapshot mais as movimentações
+    desde então (products.inventory).
+    """
+
+    KIND_OPENING = 'opening'
+    KIND_INITIAL = 'initial'
+    KIND_EDIT = 'edit'
+    KIND_IMPORT = 'import'
+    KIND_SALE = 'sale'
+    KIND_RETURN = 'return'
+    KIND_CANCEL = 'cancel'
+    KIND_REOPEN = 'reopen'
+    KIND_SALE_DELETE = 'sale_delete'
+    KIND_ADJUSTMENT = 'adjustment'
+
+    KIND_CHOICES = [
+        (KIND_OPENING, 'Saldo de abertura'),
+        (KIND_INITIAL, 'Estoque inicial'),
+        (KIND_EDIT, 'Edição do produto'),
+        (KIND_IMPORT, 'Importação'),
+        (KIND_SALE, 'Venda'),
+        (KIND_RETURN, 'Devolução de item'),
+        (KIND_CANCEL, 'Cancelamento de venda'),
+        (KIND_REOPEN, 'Reabertura de venda'),
+        (KIND_SALE_DELETE, 'Exclusão de venda'),
+        (KIND_ADJUSTMENT, 'Ajuste de conciliação'),
+    ]
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_movements',
+        verbose_name='Produto',
+    )
+    quantity = models.IntegerField(verbose_name='Quantidade')
+    kind = models.CharField(
+        max_length=20, choices=KIND_CHOICES, verbose_name='Tipo'
+    )
+    sale = models.ForeignKey(
+        'sales.Sale',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        verbose_name='Venda',
+    )
+    note = models.CharField(
+        max_length=255, blank=True, verbose_name='Observação'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Data'
+    )
+
+    class Meta:
+        verbose_name = 'Movimentação de Estoque'
+        verbose_name_plural = 'Movimentações de Estoque'
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Movimentações de um produto em um intervalo (estoque na data)
+            models.Index(
+                fields=['product', 'created_at'],
+                name='stockmove_product_created_idx',
+            ),
+            models.Index(
+                fields=['created_at'], name='stockmove_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.product} {self.quantity:+} ({self.get_kind_display()})'
+
+
+class InventorySnapshot(models.Model):
+    """
+    Posição do estoque de um produto em um momento (taken_at).
+
+    Um inventário é o conjunto de linhas com o mesmo taken_at; produtos
+    zerados não têm linha. Gerado por `manage.py take_inventory_snapshot`.
+    """
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='inventory_snapshots',
+        verbose_name='Produto',
+    )
+    taken_at = models.DateTimeField(verbose_name='Data do Inventário')
+    quantity = models.IntegerField(verbose_name='Quantidade')
+    cost_price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name='Preço de Custo'
+    )
+
+    class Meta:
+        verbose_name = 'Inventário'
+        verbose_name_plural = 'Inventários'
+        ordering = ['-taken_at', 'product']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'taken_at'],
+                name='inventorysnapshot_product_taken_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['taken_at'], name='inventorysnapshot_taken_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.product} em {self.taken_at:%d/%m/%Y}: {self.quantity}'
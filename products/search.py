@@ -0,0 +1,205 @@
+"""
+Busca de produtos por nome (caixa da venda e listagem de produtos).
+
+O nome é gravado normalizado em Product.search_name (minúsculas, sem
+acentos) e a busca é feita em duas etapas, sempre limitadas:
+
+1. prefixo: nomes que começam com o texto buscado, pelo índice btree de
+   search_name (intervalo >= texto e < texto + U+FFFF);
+2. trecho: nomes que contêm todas as palavras buscadas, por um índice de
+   trigramas (FTS5 no SQLite, pg_trgm no PostgreSQL).
+
+Os prefixos vêm primeiro no resultado. Os ids encontrados ficam em cache
+por alguns minutos, com a versão do catálogo (products.catalog) na chave.
+A listagem de produtos usa filter_by_search, que aplica a mesma busca a
+um queryset, sem limite, para ser combinada com filtros e paginada.
+
+Os índices de trigramas são criados pela migração 0006 e conferidos após
+cada migrate (products.search_index).
+"""
+
+import hashlib
+import unicodedata
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Length
+
+from .catalog import catalog_version, get_catalog
+from .models import Product
+from .search_index import FTS_TABLE
+
+
+SEARCH_LIMIT = 20
+SEARCH_MAX_CANDIDATES = 500
+SEARCH_CACHE_TIMEOUT = 60 * 5
+
+# Tamanho mínimo de uma palavra para o índice de trigramas
+TRIGRAM_MIN_LENGTH = 3
+
+
+def normalize(text):
+    """'  Boné  AÇÃO ' -> 'bone acao'"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def _uses_fts(connection):
+    return connection.vendor == 'sqlite'
+
+
+def _prefix_filter(term):
+    """Nomes que começam com `term`, pelo índice btree de search_name"""
+    return Q(search_name__gte=term, search_name__lt=term + '\uffff')
+
+
+def _fts_match(words):
+    """Expressão MATCH do FTS5 com as palavras de 3+ letras"""
+    return ' AND '.join(
+        '"{}"'.format(word.replace('"', '""'))
+        for word in words
+        if len(word) >= TRIGRAM_MIN_LENGTH
+    )
+
+
+def _prefix_ids(term, limit):
+    return list(
+        Product.objects.filter(_prefix_filter(term), is_active=True)
+        .order_by('search_name', 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def _fts_ids(words, exclude, limit):
+    """Busca por trecho no FTS5 (palavras com 3+ letras no MATCH)"""
+    sql = [
+        f'SELECT p.product_id FROM {FTS_TABLE} s',
+        'JOIN products_product p ON p.product_id = s.rowid',
+        f'WHERE {FTS_TABLE} MATCH %s AND p.is_active',
+    ]
+    params = [_fts_match(words)]
+    for word in words:
+        if len(word) < TRIGRAM_MIN_LENGTH:
+            sql.append("AND p.search_name LIKE %s ESCAPE '\\'")
+            params.append('%' + _escape_like(word) + '%')
+    if exclude:
+        sql.append(
+            'AND p.product_id NOT IN ({})'.format(
+                ', '.join(['%s'] * len(exclude))
+            )
+        )
+        params.extend(exclude)
+    sql.append('ORDER BY s.rank LIMIT %s')
+    params.append(limit)
+    with connections['default'].cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _escape_like(word):
+    return (
+        word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+
+
+def _contains_ids(words, exclude, limit):
+    """Busca por trecho com LIKE (usa o pg_trgm no PostgreSQL)"""
+    products = Product.objects.filter(is_active=True).exclude(pk__in=exclude)
+    for word in words:
+        products = products.filter(search_name__contains=word)
+    return list(
+        products.order_by(Length('search_name'), 'search_name', 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def _search_ids(term, limit):
+    ids = _prefix_ids(term, limit)
+    if len(ids) >= limit:
+        return ids
+
+    words = term.split()
+    if not any(len(word) >= TRIGRAM_MIN_LENGTH for word in words):
+        # Trechos de 1-2 letras não têm trigramas: só prefixo
+        return ids
+    if _uses_fts(connections['default']):
+        ids += _fts_ids(words, ids, limit - len(ids))
+    else:
+        ids += _contains_ids(words, ids, limit - len(ids))
+    return ids
+
+
+def search_product_ids(query, limit=SEARCH_LIMIT):
+    """Ids dos produtos ativos cujo nome casa com `query`, por relevância"""
+    term = normalize(query)
+    if not term:
+        return []
+    digest = hashlib.md5(term.encode()).hexdigest()
+    key = f'products:search:{catalog_version()}:{limit}:{digest}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = _search_ids(term, limit)
+        cache.set(key, ids, SEARCH_CACHE_TIMEOUT)
+    return ids
+
+
+def filter_by_search(queryset, query):
+    """
+    Produtos de `queryset` cujo nome casa com `query`, com os prefixos
+    primeiro e depois os nomes mais curtos. Sem limite: quem chama pagina
+    (e pode filtrar o queryset antes, ex.: estoque baixo).
+    """
+    term = normalize(query)
+    if not term:
+        return queryset
+    words = term.split()
+    if not any(len(word) >= TRIGRAM_MIN_LENGTH for word in words):
+        # Trechos de 1-2 letras não têm trigramas: só prefixo
+        return queryset.filter(_prefix_filter(term)).order_by(
+            'search_name', 'pk'
+        )
+
+    if _uses_fts(connections[queryset.db]):
+        queryset = queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [_fts_match(words)],
+            )
+        )
+        # O MATCH só recebe as palavras com trigramas
+        words = [word for word in words if len(word) < TRIGRAM_MIN_LENGTH]
+    for word in words:
+        queryset = queryset.filter(search_name__contains=word)
+    return queryset.annotate(
+        search_prefix=Case(
+            When(_prefix_filter(term), then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by('search_prefix', Length('search_name'), 'search_name', 'pk')
+
+
+def search_catalog(query, limit=SEARCH_LIMIT, offset=0):
+    """
+    Página de produtos com estoque para a caixa, do catálogo em memória: os
+    que casam com `query` por relevância ou, sem busca, todos por nome.
+    Retorna (produtos, há_mais).
+    """
+    catalog = get_catalog()
+    wanted = offset + limit + 1
+    if not normalize(query):
+        rows = catalog.in_stock(wanted)
+    else:
+        rows = []
+        # Candidatos a mais: parte deles pode estar sem estoque
+        candidates = min(wanted * 5, SEARCH_MAX_CANDIDATES)
+        for pk in search_product_ids(query, limit=candidates):
+            row = catalog.get(pk)
+            if row is not None and row.quantity > 0:
+                rows.append(row)
+                if len(rows) >= wanted:
+                    break
+    return rows[offset : offset + limit], len(rows) > offset + limit
@@ -0,0 +1,130 @@
+"""
+Índice de trigramas da busca por trecho (products.search).
+
+FTS5 mantido por gatilhos no SQLite e GIN com pg_trgm no PostgreSQL,
+criados pela migração 0006. No SQLite, migrações que recriam a tabela
+products_product (AlterField, RemoveField...) apagam os gatilhos e a busca
+deixa de ver produtos novos sem nenhum erro. Por isso:
+
+- ensure_search_index roda após cada migrate (products.apps) e recria o
+  que faltar;
+- `manage.py explain_hot_queries --check` falha se faltar alguma parte.
+"""
+
+from django.db import connections, models
+from django.db.migrations.recorder import MigrationRecorder
+
+
+FTS_TABLE = 'products_product_search'
+FTS_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+PG_TRGM_INDEX = 'product_search_name_trgm_idx'
+MIGRATION = ('products', '0006_product_search_index')
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        search_name,
+        content='products_product',
+        content_rowid='product_id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai
+    AFTER INSERT ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_name)
+        VALUES (new.product_id, new.search_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad
+    AFTER DELETE ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_name)
+        VALUES ('delete', old.product_id, old.search_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au
+    AFTER UPDATE OF search_name ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_name)
+        VALUES ('delete', old.product_id, old.search_name);
+        INSERT INTO {FTS_TABLE}(rowid, search_name)
+        VALUES (new.product_id, new.search_name);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [f'DROP TRIGGER IF EXISTS {name}' for name in FTS_TRIGGERS] + [
+    f'DROP TABLE IF EXISTS {FTS_TABLE}'
+]
+
+
+def trigram_index():
+    # Fora do estado dos modelos: só existe no PostgreSQL
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+
+    return GinIndex(
+        OpClass('search_name', name='gin_trgm_ops'),
+        condition=models.Q(is_active=True),
+        name=PG_TRGM_INDEX,
+    )
+
+
+def create_search_index(schema_editor, model):
+    """
+    (Re)cria o índice do zero; no SQLite o FTS5 é reconstruído a partir
+    de search_name.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_DROP + SQLITE_INDEX:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_TRGM_INDEX}')
+        schema_editor.add_index(model, trigram_index())
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_TRGM_INDEX}')
+
+
+def missing_search_index(connection):
+    """Nomes das partes do índice que não existem no banco"""
+    if connection.vendor == 'sqlite':
+        expected = [FTS_TABLE] + FTS_TRIGGERS
+        sql = 'SELECT name FROM sqlite_master WHERE name IN ({})'.format(
+            ', '.join(['%s'] * len(expected))
+        )
+    elif connection.vendor == 'postgresql':
+        expected = [PG_TRGM_INDEX]
+        sql = 'SELECT indexname FROM pg_indexes WHERE indexname = %s'
+    else:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, expected)
+        found = {row[0] for row in cursor.fetchall()}
+    return [name for name in expected if name not in found]
+
+
+def ensure_search_index(using='default'):
+    """
+    Recria o índice se a migração 0006 já foi aplicada e alguma parte
+    sumiu. Devolve o que faltava (lista vazia se nada mudou).
+    """
+    from .models import Product
+
+    connection = connections[using]
+    if MIGRATION not in MigrationRecorder(connection).applied_migrations():
+        return []
+    missing = missing_search_index(connection)
+    if missing:
+        with connection.schema_editor() as schema_editor:
+            create_search_index(schema_editor, Product)
+    return missing
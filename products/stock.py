@@ -0,0 +1,143 @@
+"""
+Movimentação de estoque com UPDATEs atômicos.
+
+Em vez de ler o produto, alterar a quantidade em Python e salvar (o que
+exige travar a linha durante toda a operação), cada movimento é um único
+UPDATE condicional para todos os produtos de uma venda:
+
+    UPDATE product SET quantity = quantity - n
+    WHERE product_id IN (...) AND quantity >= n
+
+Se alguma linha não for afetada, falta estoque: o movimento é desfeito e
+InsufficientStock informa quais produtos não tinham a quantidade pedida.
+Cada movimento também grava as StockMovement correspondentes em lote.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .catalog import bump_stock_version
+from .models import Product, StockMovement
+
+
+class InsufficientStock(ValueError):
+    """Estoque insuficiente (ou produto inexistente) em uma baixa"""
+
+    def __init__(self, shortages):
+        # shortages: lista de (nome, disponível, solicitado)
+        self.shortages = shortages
+        super().__init__(
+            'Estoque insuficiente: '
+            + '; '.join(
+                f'{name} ({available} disponível, {requested} solicitado)'
+                for name, available, requested in shortages
+            )
+        )
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _clean(lines):
+    return {pk: quantity for pk, quantity in lines.items() if quantity}
+
+
+def _per_product(lines):
+    """Quantidade de cada produto como expressão SQL (CASE product_id)"""
+    return Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in lines.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def record_movements(lines, kind, sale_id=None, note=''):
+    """
+    Grava as movimentações ({product_id: quantidade assinada}) em um único
+    INSERT. Quem altera Product.quantity sem take_stock/return_stock deve
+    registrar a mesma diferença aqui.
+    """
+    if sale_id and not note:
+        note = f'Venda #{sale_id}'
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                product_id=pk,
+                quantity=quantity,
+                kind=kind,
+                sale_id=sale_id,
+                note=note,
+            )
+            for pk, quantity in sorted(lines.items())
+            if quantity
+        ]
+    )
+
+
+def take_stock(
+    lines, kind=StockMovement.KIND_SALE, sale_id=None, note=''
+):
+    """
+    Baixa o estoque de vários produtos ({product_id: quantidade}) em um
+    único UPDATE. Levanta InsufficientStock sem alterar nada se algum
+    produto não tiver a quantidade pedida.
+    """
+    lines = _clean(lines)
+    if not lines:
+        return
+    amount = _per_product(lines)
+    try:
+        with transaction.atomic():
+            updated = Product.objects.filter(
+                pk__in=lines, quantity__gte=amount
+            ).update(quantity=F('quantity') - amount)
+            if updated != len(lines):
+                raise _Rollback
+            record_movements(
+                {pk: -quantity for pk, quantity in lines.items()},
+                kind,
+                sale_id=sale_id,
+                note=note,
+            )
+            bump_stock_version()
+    except _Rollback:
+        found = {
+            pk: (name, quantity)
+            for pk, name, quantity in Product.objects.filter(
+                pk__in=lines
+            ).values_list('pk', 'name', 'quantity')
+        }
+        shortages = []
+        for pk, requested in sorted(lines.items()):
+            name, available = found.get(pk, (f'Produto #{pk}', 0))
+            if available < requested:
+                shortages.append((name, available, requested))
+        raise InsufficientStock(shortages)
+
+
+def return_stock(
+    lines, kind=StockMovement.KIND_RETURN, sale_id=None, note=''
+):
+    """Devolve ao estoque vários produtos ({product_id: quantidade})"""
+    lines = _clean(lines)
+    if not lines:
+        return
+    amount = _per_product(lines)
+    with transaction.atomic():
+        Product.objects.filter(pk__in=lines).update(
+            quantity=F('quantity') + amount
+        )
+        record_movements(lines, kind, sale_id=sale_id, note=note)
+        bump_stock_version()
+
+
+def sale_lines(sale):
+    """{product_id: quantidade} dos itens de uma venda"""
+    from sales.models import SaleItem
+
+    return dict(
+        SaleItem.objects.filter(sale_id=sale.pk).values_list(
+            'product_id', 'quantity'
+        )
+    )
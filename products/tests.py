@@ -1,3 +1,174 @@
-from django.test import TestCase
+import io
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from products.importer import import_products
+from products.models import Product, StockMovement
+from products.search import filter_by_search
+from products.search_index import ensure_search_index, missing_search_index
+from products.stock import InsufficientStock, take_stock
+from products.views import PRODUCT_LIST_PAGE_SIZE
+
+
+class ImportProductsTests(TestCase):
+    def test_error_lines_count_the_header(self):
+        csv_file = io.StringIO(
+            'name,sale_price,cost_price\n'
+            'Boa,10,5\n'
+            'Ruim,abc,5\n'
+            ',1,1\n'
+        )
+
+        result = import_products(csv_file)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([error.line for error in result.errors], [3, 4])
+        self.assertTrue(Product.objects.filter(name='Boa').exists())
+
+    def test_semicolon_file_keeps_line_numbers(self):
+        csv_file = io.StringIO(
+            'name;sale_price;cost_price\n'
+            'Boa;19,90;5\n'
+            'Ruim;;5\n'
+        )
+
+        result = import_products(csv_file, dry_run=True)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([error.line for error in result.errors], [3])
+        self.assertFalse(Product.objects.exists())
+
+    def test_missing_columns(self):
+        result = import_products(io.StringIO('name,quantity\nBoa,1\n'))
+
+        self.assertEqual([error.line for error in result.errors], [1])
+        self.assertEqual(result.created, 0)
+
+
+class TakeStockTests(TestCase):
+    def setUp(self):
+        self.shirt = Product.objects.create(
+            name='Camisa', sale_price=10, cost_price=5, quantity=5
+        )
+        self.cap = Product.objects.create(
+            name='Boné', sale_price=10, cost_price=5, quantity=1
+        )
+
+    def quantities(self):
+        return dict(
+            Product.objects.filter(
+                pk__in=[self.shirt.pk, self.cap.pk]
+            ).values_list('pk', 'quantity')
+        )
+
+    def sale_movements(self):
+        return StockMovement.objects.filter(kind=StockMovement.KIND_SALE)
+
+    def test_takes_all_lines(self):
+        take_stock({self.shirt.pk: 2, self.cap.pk: 1})
+
+        self.assertEqual(
+            self.quantities(), {self.shirt.pk: 3, self.cap.pk: 0}
+        )
+        self.assertEqual(
+            sorted(self.sale_movements().values_list('quantity', flat=True)),
+            [-2, -1],
+        )
+
+    def test_shortage_changes_nothing(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            take_stock({self.shirt.pk: 2, self.cap.pk: 3})
+
+        self.assertEqual(raised.exception.shortages, [('Boné', 1, 3)])
+        self.assertEqual(
+            self.quantities(), {self.shirt.pk: 5, self.cap.pk: 1}
+        )
+        self.assertFalse(self.sale_movements().exists())
+
+    def test_missing_product_is_a_shortage(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            take_stock({self.shirt.pk: 1, 999999: 1})
+
+        self.assertEqual(
+            raised.exception.shortages, [('Produto #999999', 0, 1)]
+        )
+        self.assertEqual(self.quantities()[self.shirt.pk], 5)
+
+
+class ProductTableSearchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('estoque', password='x')
+        self.client.force_login(user)
+        # bulk_create não passa por Product.save (search_name)
+        Product.objects.bulk_create(
+            Product(
+                name=f'Camisa {number}',
+                search_name=f'camisa {number}',
+                sale_price=10,
+                cost_price=5,
+                quantity=50,
+                low_quantity=5,
+            )
+            for number in range(210)
+        )
+        self.low = Product.objects.create(
+            name='Camisa Lisa',
+            sale_price=10,
+            cost_price=5,
+            quantity=1,
+            low_quantity=5,
+        )
+
+    def get(self, **params):
+        return self.client.get(reverse('search_products'), params)
+
+    def test_stock_filter_applies_before_pagination(self):
+        # O produto com estoque baixo é o último dos que casam com a busca
+        response = self.get(search='camisa', filter='estoque_baixo')
+
+        self.assertEqual(
+            [product.pk for product in response.context['products']],
+            [self.low.pk],
+        )
+        self.assertIsNone(response.context['next_page'])
+
+    def test_pages_through_all_matches(self):
+        seen = []
+        page = 1
+        while page:
+            response = self.get(search='camisa', page=page)
+            seen += [product.pk for product in response.context['products']]
+            page = response.context['next_page']
+
+        self.assertEqual(len(seen), 211)
+        self.assertEqual(len(set(seen)), 211)
+        first = self.get(search='camisa')
+        self.assertEqual(
+            len(first.context['products']), PRODUCT_LIST_PAGE_SIZE
+        )
+
+
+class SearchIndexTests(TransactionTestCase):
+    # DDL do SQLite não roda dentro da transação do TestCase
+    def test_lost_triggers_are_reported_and_restored(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Gatilhos do FTS5 só existem no SQLite')
+        # Como depois de uma migração que recria products_product
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER products_product_search_ai')
+        self.assertEqual(
+            missing_search_index(connection), ['products_product_search_ai']
+        )
+
+        self.assertEqual(ensure_search_index(), ['products_product_search_ai'])
+
+        self.assertEqual(missing_search_index(connection), [])
+        product = Product.objects.create(
+            name='Camiseta Polo', sale_price=10, cost_price=5, quantity=1
+        )
+        self.assertEqual(
+            list(filter_by_search(Product.objects.all(), 'polo')), [product]
+        )
@@ -4,6 +4,7 @@ from .views import (
     ProductCreateView,
     ProductUpdateView,
     delete_product,
+    product_import,
     search_products,
 )
 
@@ -11,6 +12,7 @@ urlpatterns = [
     path('', ProductListView.as_view(), name='product_list'),
     path('search/', search_products, name='search_products'),
     path('create/', ProductCreateView.as_view(), name='product_create'),
+    path('import/', product_import, name='product_import'),
     path(
         'update/<int:pk>/', ProductUpdateView.as_view(), name='product_update'
     ),
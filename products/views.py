@@ -1,13 +1,19 @@
+import io
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, CreateView, UpdateView
 from products.models import Product
-from products.forms import ProductForm
+from products.forms import ProductForm, ProductImportForm
+from products.importer import import_products
+from products.search import filter_by_search
 from django.http import HttpRequest
 from django.shortcuts import render, get_object_or_404, redirect
 from django.db.models import F
 
 
+PRODUCT_LIST_PAGE_SIZE = 50
+
+
 class ProductListView(LoginRequiredMixin, ListView):
     model = Product
     template_name = 'product_list.html'
@@ -42,14 +48,42 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
     success_url = '/products/'
 
 
+@login_required
+def product_import(request):
+    """Importação do catálogo via upload de CSV"""
+    result = None
+    form = ProductImportForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['file']
+        # Lê o upload em streaming, sem carregar o arquivo em memória
+        stream = io.TextIOWrapper(
+            upload.file, encoding='utf-8-sig', newline=''
+        )
+        try:
+            result = import_products(
+                stream, dry_run=form.cleaned_data['dry_run']
+            )
+        except UnicodeDecodeError:
+            form.add_error('file', 'O arquivo precisa estar em UTF-8.')
+
+    return render(
+        request,
+        'product_import.html',
+        {
+            'form': form,
+            'result': result,
+            'section_name': 'Importar Produtos',
+        },
+    )
+
+
 @login_required
 def delete_product(request, pk):
     product = get_object_or_404(Product, pk=pk, is_active=True)
 
     if request.method == 'POST':
-        # Soft delete
-        product.is_active = False
-        product.save()
+        # Soft delete (sem regravar a quantidade)
+        product.soft_delete()
 
         return redirect('product_list')
 
@@ -57,25 +91,56 @@ def delete_product(request, pk):
 
 
 @login_required
-def search_products(request: HttpRequest):
+async def search_products(request: HttpRequest):
+    """
+    Página da tabela de produtos: busca, filtro e ordenação no mesmo
+    queryset; as páginas seguintes vêm ao rolar a tabela.
+    """
     search = request.GET.get('search', '')
     filter_option = request.GET.get('filter', '')
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
 
     # 🔹 Mostra apenas produtos ativos
     products = Product.objects.filter(is_active=True)
 
-    if search:
-        products = products.filter(name__icontains=search)
-
     if filter_option == 'estoque_baixo':
         products = products.filter(quantity__lte=F('low_quantity'))
     elif filter_option == 'estoque_normal':
         products = products.filter(quantity__gt=F('low_quantity'))
-    elif filter_option == 'maior_preco':
-        products = products.order_by('-sale_price')
-    elif filter_option == 'menor_preco':
-        products = products.order_by('sale_price')
 
-    context = {'products': products}
-
-    return render(request, 'partials/_product_table.html', context)
+    # Ordem de relevância da busca (trocada pelos filtros de preço)
+    products = filter_by_search(products, search)
+    if filter_option == 'maior_preco':
+        products = products.order_by('-sale_price', 'pk')
+    elif filter_option == 'menor_preco':
+        products = products.order_by('sale_price', 'pk')
+    elif not search.strip():
+        products = products.order_by('pk')
+
+    # Uma a mais para saber se há próxima página. Carregadas aqui: o
+    # template não pode consultar o banco no event loop
+    offset = (page - 1) * PRODUCT_LIST_PAGE_SIZE
+    products = [
+        product
+        async for product in products[
+            offset : offset + PRODUCT_LIST_PAGE_SIZE + 1
+        ]
+    ]
+    has_more = len(products) > PRODUCT_LIST_PAGE_SIZE
+
+    context = {
+        'products': products[:PRODUCT_LIST_PAGE_SIZE],
+        'search': search,
+        'filter': filter_option,
+        'page': page,
+        'next_page': page + 1 if has_more else None,
+    }
+    template = (
+        'partials/_product_table.html'
+        if page == 1
+        else 'partials/_product_rows.html'
+    )
+    return render(request, template, context)
@@ -1,9 +1,43 @@
+from django import forms
 from django.contrib import admin
 from .models import Sale, SaleItem, Payment
 
 
+class SaleItemAdminForm(forms.ModelForm):
+    """
+    Item no inline do admin. SaleItem.save baixa o estoque e levanta
+    InsufficientStock; aqui a falta vira erro no formulário em vez de 500.
+    """
+
+    class Meta:
+        model = SaleItem
+        fields = ['product', 'quantity']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        product = cleaned_data.get('product')
+        quantity = cleaned_data.get('quantity')
+        if product is None or quantity is None:
+            return cleaned_data
+        # O que o item já reservou volta para o cálculo
+        reserved = (
+            self.instance.quantity
+            if self.instance.pk and self.instance.product_id == product.pk
+            else 0
+        )
+        requested = quantity - reserved
+        if requested > product.quantity:
+            self.add_error(
+                'quantity',
+                f'Estoque insuficiente ({product.quantity} disponível, '
+                f'{requested} solicitado).',
+            )
+        return cleaned_data
+
+
 class SaleItemInline(admin.TabularInline):
     model = SaleItem
+    form = SaleItemAdminForm
     extra = 0
     readonly_fields = ('price',)
 
@@ -20,13 +54,25 @@ class SaleAdmin(admin.ModelAdmin):
         'id',
         'get_client',
         'status',
-        'total',
+        'total_amount',
         'paid_amount',
         'balance',
         'created_at',
     )
+    list_select_related = ('client',)
     inlines = [SaleItemInline, PaymentInline]
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = (
+        'total_amount',
+        'paid_amount',
+        'created_at',
+        'updated_at',
+    )
+
+    def delete_queryset(self, request, queryset):
+        # A ação "excluir selecionados" usa QuerySet.delete, que não passa
+        # por Sale.delete (resumos diários e estorno dos fiados)
+        for sale in queryset:
+            sale.delete()
 
     def get_client(self, obj):
         return obj.get_client_display()
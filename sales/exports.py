@@ -0,0 +1,177 @@
+"""
+Exportação de vendas, itens e pagamentos em CSV via streaming.
+
+As linhas vêm de values_list().iterator(), sem instanciar modelos nem
+carregar o período inteiro em memória, e são escritas uma a uma na resposta
+(ou no arquivo, pelo comando `manage.py export_sales`).
+"""
+
+import csv
+
+from django.utils import timezone
+
+from .models import Payment, Sale, SaleItem
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Separador e decimais no padrão do Excel em português
+CSV_DELIMITER = ';'
+
+
+class Echo:
+    """Pseudo-arquivo: writerow devolve a linha em vez de gravá-la"""
+
+    def write(self, value):
+        return value
+
+
+def _money(value):
+    return str(value).replace('.', ',') if value is not None else ''
+
+
+def _datetime(value):
+    return timezone.localtime(value).strftime('%d/%m/%Y %H:%M:%S')
+
+
+def _sales(start_date, end_date):
+    statuses = dict(Sale.STATUS_CHOICES)
+    rows = (
+        Sale.objects.filter(
+            created_at__gte=start_date, created_at__lte=end_date
+        )
+        .order_by('pk')
+        .values_list(
+            'pk',
+            'created_at',
+            'status',
+            'client_id',
+            'client__name',
+            'client_name',
+            'total_amount',
+            'paid_amount',
+        )
+    )
+    for pk, created, status, client_id, client, name, total, paid in (
+        rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ):
+        yield [
+            pk,
+            _datetime(created),
+            statuses.get(status, status),
+            client_id or '',
+            client or name,
+            _money(total),
+            _money(paid),
+            _money(total - paid),
+        ]
+
+
+def _items(start_date, end_date):
+    statuses = dict(Sale.STATUS_CHOICES)
+    rows = (
+        SaleItem.objects.filter(
+            sale__created_at__gte=start_date, sale__created_at__lte=end_date
+        )
+        .order_by('sale_id', 'pk')
+        .values_list(
+            'sale_id',
+            'sale__created_at',
+            'sale__status',
+            'product_id',
+            'product__name',
+            'quantity',
+            'price',
+        )
+    )
+    for sale_id, created, status, product_id, product, quantity, price in (
+        rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ):
+        yield [
+            sale_id,
+            _datetime(created),
+            statuses.get(status, status),
+            product_id,
+            product,
+            quantity,
+            _money(price),
+            _money(price * quantity),
+        ]
+
+
+def _payments(start_date, end_date):
+    rows = (
+        Payment.objects.filter(
+            created_at__gte=start_date, created_at__lte=end_date
+        )
+        .order_by('pk')
+        .values_list(
+            'pk', 'sale_id', 'created_at', 'method', 'amount', 'note'
+        )
+    )
+    for pk, sale_id, created, method, amount, note in rows.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        yield [
+            pk,
+            sale_id,
+            _datetime(created),
+            method or '',
+            _money(amount),
+            note or '',
+        ]
+
+
+# tipo: (cabeçalho, gerador de linhas)
+EXPORTS = {
+    'vendas': (
+        [
+            'Venda',
+            'Data',
+            'Status',
+            'ID Cliente',
+            'Cliente',
+            'Total',
+            'Pago',
+            'Saldo',
+        ],
+        _sales,
+    ),
+    'itens': (
+        [
+            'Venda',
+            'Data da Venda',
+            'Status da Venda',
+            'ID Produto',
+            'Produto',
+            'Quantidade',
+            'Preço Unitário',
+            'Subtotal',
+        ],
+        _items,
+    ),
+    'pagamentos': (
+        ['Pagamento', 'Venda', 'Data', 'Forma', 'Valor', 'Observação'],
+        _payments,
+    ),
+}
+
+
+def export_filename(kind, start_date, end_date):
+    return (
+        f'{kind}_{start_date.strftime("%Y%m%d")}_'
+        f'{end_date.strftime("%Y%m%d")}.csv'
+    )
+
+
+def iter_export_csv(kind, start_date, end_date):
+    """
+    Gera as linhas CSV (já formatadas) da exportação `kind` no período.
+
+    A primeira linha leva o BOM UTF-8 para o Excel reconhecer os acentos.
+    """
+    header, rows = EXPORTS[kind]
+    writer = csv.writer(Echo(), delimiter=CSV_DELIMITER)
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows(start_date, end_date):
+        yield writer.writerow(row)
@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Round
+
+from sales.models import Payment, Sale, SaleItem
+
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def expected_totals():
+    """Totais recalculados a partir dos itens e pagamentos de cada venda"""
+    items_total = (
+        SaleItem.objects.filter(sale=OuterRef('pk'))
+        .values('sale')
+        # Arredondado aos centavos: no SQLite a soma é feita em ponto
+        # flutuante (3 × 99.90 = 299.70000000000005)
+        .annotate(total=Round(Sum(F('price') * F('quantity')), 2))
+        .values('total')
+    )
+    payments_total = (
+        Payment.objects.filter(sale=OuterRef('pk'))
+        .values('sale')
+        .annotate(total=Round(Sum('amount'), 2))
+        .values('total')
+    )
+    return {
+        'total_amount': Coalesce(
+            Subquery(items_total, output_field=MONEY), Decimal('0.00')
+        ),
+        'paid_amount': Coalesce(
+            Subquery(payments_total, output_field=MONEY), Decimal('0.00')
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica se Sale.total_amount e Sale.paid_amount batem com os itens '
+        'e pagamentos de cada venda. Use --fix para corrigir divergências.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Corrige as vendas com totais divergentes.',
+        )
+
+    def handle(self, *args, **options):
+        expected = expected_totals()
+        divergent = (
+            Sale.objects.annotate(
+                expected_total=expected['total_amount'],
+                expected_paid=expected['paid_amount'],
+            )
+            .filter(
+                ~Q(total_amount=F('expected_total'))
+                | ~Q(paid_amount=F('expected_paid'))
+            )
+            .values_list(
+                'pk',
+                'total_amount',
+                'expected_total',
+                'paid_amount',
+                'expected_paid',
+            )
+        )
+
+        divergent = list(divergent)
+        for pk, total, expected_total, paid, expected_paid in divergent:
+            self.stdout.write(
+                f'Venda #{pk}: total {total} (esperado {expected_total}), '
+                f'pago {paid} (esperado {expected_paid})'
+            )
+
+        if not divergent:
+            self.stdout.write(self.style.SUCCESS('Todos os totais conferem.'))
+            return
+
+        if not options['fix']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{len(divergent)} venda(s) com totais divergentes. '
+                    f'Execute novamente com --fix para corrigir.'
+                )
+            )
+            return
+
+        with transaction.atomic():
+            Sale.objects.filter(pk__in=[row[0] for row in divergent]).update(
+                **expected_totals()
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'{len(divergent)} venda(s) corrigida(s).')
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.reports import parse_report_period
+from sales.exports import EXPORTS, iter_export_csv
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta vendas, itens ou pagamentos de um período em CSV, lendo as '
+        'linhas em blocos (memória constante para qualquer período).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument(
+            '--start',
+            help='Primeiro dia (AAAA-MM-DD). Padrão: últimos 30 dias.',
+        )
+        parser.add_argument('--end', help='Último dia (AAAA-MM-DD).')
+        parser.add_argument(
+            '--output',
+            '-o',
+            help='Arquivo de saída (padrão: saída padrão).',
+        )
+
+    def handle(self, *args, **options):
+        start_date, end_date = parse_report_period(
+            {'start_date': options['start'], 'end_date': options['end']}
+        )
+        if start_date > end_date:
+            raise CommandError('A data inicial é posterior à final.')
+
+        lines = iter_export_csv(options['kind'], start_date, end_date)
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = -1  # sem contar o cabeçalho
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            for line in lines:
+                f.write(line)
+                count += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{count} linha(s) exportada(s) para {options["output"]}.'
+            )
+        )
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:42
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Round
+
+
+def fill_sale_totals(apps, schema_editor):
+    Sale = apps.get_model('sales', 'Sale')
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    Payment = apps.get_model('sales', 'Payment')
+    money = DecimalField(max_digits=12, decimal_places=2)
+
+    items_total = (
+        SaleItem.objects.filter(sale=OuterRef('pk'))
+        .values('sale')
+        # Arredondado aos centavos, como em check_sale_totals: no SQLite a
+        # soma é feita em ponto flutuante (3 × 99.90 = 299.70000000000005)
+        .annotate(total=Round(Sum(F('price') * F('quantity')), 2))
+        .values('total')
+    )
+    payments_total = (
+        Payment.objects.filter(sale=OuterRef('pk'))
+        .values('sale')
+        .annotate(total=Round(Sum('amount'), 2))
+        .values('total')
+    )
+    Sale.objects.update(
+        total_amount=Coalesce(
+            Subquery(items_total, output_field=money), Decimal('0.00')
+        ),
+        paid_amount=Coalesce(
+            Subquery(payments_total, output_field=money), Decimal('0.00')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.RunPython(fill_sale_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_hot_filter_indexes'),
+        ('sales', '0002_sale_total_amount_paid_amount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(models.F('sale'), django.db.models.functions.text.Lower('method'), name='payment_sale_method_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['status', 'created_at'], name='sale_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['created_at', 'id'], name='sale_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['created_at'], name='sale_open_created_idx'),
+        ),
+    ]
@@ -1,7 +1,23 @@
 from decimal import Decimal
 from django.db import models, transaction
 from django.db.models import F, Sum, Q
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, Lower
+
+
+class SaleQuerySet(models.QuerySet):
+    def with_items(self):
+        """
+        Vendas com cliente e itens (com o produto) já carregados: duas
+        consultas por página da venda, sem N+1 nos templates.
+        """
+        return self.select_related('client').prefetch_related(
+            models.Prefetch(
+                'items',
+                queryset=SaleItem.objects.select_related('product').order_by(
+                    'pk'
+                ),
+            )
+        )
 
 
 class Sale(models.Model):
@@ -27,6 +43,40 @@ class Sale(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Totais desnormalizados, mantidos por SaleItem.save/delete e
+    # Payment.save/delete (ver `manage.py check_sale_totals`)
+    total_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+    )
+    paid_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+    )
+
+    objects = SaleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Filtros por status e período (relatórios, rollups, lista)
+            models.Index(
+                fields=['status', 'created_at'], name='sale_status_created_idx'
+            ),
+            # Paginação por cursor da lista de vendas (-created_at, -id)
+            models.Index(
+                fields=['created_at', 'id'], name='sale_created_id_idx'
+            ),
+            # Vendas em aberto são poucas; índice parcial pequeno
+            models.Index(
+                fields=['created_at'],
+                condition=Q(status='open'),
+                name='sale_open_created_idx',
+            ),
+        ]
 
     def __str__(self):
         who = (
@@ -38,21 +88,13 @@ class Sale(models.Model):
 
     @property
     def total(self):
-        agg = self.items.aggregate(total=Sum(F('price') * F('quantity')))
-        total = agg['total'] or Decimal('0.00')
         # Garantir que o total tenha exatamente 2 casas decimais
-        return total.quantize(Decimal('0.01'))
-
-    @property
-    def paid_amount(self):
-        agg = self.payments.aggregate(total=Sum('amount'))
-        paid = agg['total'] or Decimal('0.00')
-        # Garantir que o valor pago tenha exatamente 2 casas decimais
-        return paid.quantize(Decimal('0.01'))
+        return Decimal(self.total_amount).quantize(Decimal('0.01'))
 
     @property
     def balance(self):
-        return (self.total - self.paid_amount).quantize(Decimal('0.01'))
+        paid = Decimal(self.paid_amount).quantize(Decimal('0.01'))
+        return (self.total - paid).quantize(Decimal('0.01'))
 
     @property
     def credit_amount(self):
@@ -60,86 +102,52 @@ class Sale(models.Model):
         balance = self.balance
         return abs(balance) if balance < 0 else Decimal('0.00')
 
-    def get_client_display(self):
-        return self.client.name if self.client else self.client_name
-
-    def update_client_debt_cache(self):
-        """
-        Recalcula e atualiza a dívida do cliente.
-
-        A dívida do cliente é SIMPLESMENTE a soma de todos os pagamentos fiados
-        que ele fez em TODAS as vendas (abertas e finalizadas).
-
-        Pagamentos fiados são dívidas que o cliente deve pagar depois.
-        Não importa se a venda está aberta ou finalizada, o pagamento fiado
-        sempre aumenta a dívida do cliente.
-
-        Exemplo:
-        - Venda de 7 reais
-        - Pagamento de 6 reais no PIX (não-fiado) - não afeta a dívida
-        - Pagamento de 1 real fiado (conta do cliente) - aumenta a dívida em 1
-        - Dívida = 1 real (apenas o pagamento fiado)
+    @classmethod
+    def add_to_totals(cls, sale_id, total=0, paid=0):
+        """Soma diferenças aos totais desnormalizados com um único UPDATE"""
+        from dashboard.fragments import invalidate_fragments
 
-        IMPORTANTE: Este método SEMPRE recalcula do zero, substituindo o valor atual.
-        Isso garante que não há duplicação.
-        """
-        if not self.client:
-            return
+        cls.objects.filter(pk=sale_id).update(
+            total_amount=F('total_amount') + total,
+            paid_amount=F('paid_amount') + paid,
+        )
+        # UPDATE não dispara post_save: os cards de vendas abertas mudam
+        invalidate_fragments('kpis')
 
-        Payment = self.payments.model
+    def get_client_display(self):
+        return self.client.name if self.client else self.client_name
 
-        # Calcular APENAS a soma de todos os pagamentos fiados (não quitados)
-        # Pagamentos fiados são dívidas que o cliente deve pagar
-        # Quando quitados, o método é alterado de "fiado" para "quitado", então não são mais contabilizados
-        # Não importa o status da venda, pagamentos fiados sempre aumentam a dívida
-        
-        # Buscar todos os pagamentos fiados do cliente (apenas método exatamente "fiado")
-        pagamentos_fiado = Payment.objects.filter(
-            sale__client=self.client,
-            method__iexact='fiado'
-        )
-        
-        # Calcular a soma dos valores dos pagamentos fiados
-        # Garantir que valores pequenos (como 0.01) sejam contabilizados corretamente
-        pagamentos_fiado_total_raw = pagamentos_fiado.aggregate(
-            total=Sum('amount')
-        )['total']
-        
-        # Converter para Decimal e garantir que valores pequenos sejam preservados
-        if pagamentos_fiado_total_raw is None:
-            pagamentos_fiado_total = Decimal('0.00')
-        else:
-            # Garantir que seja Decimal e quantizado para 2 casas decimais
-            pagamentos_fiado_total = Decimal(str(pagamentos_fiado_total_raw)).quantize(Decimal('0.01'))
-
-        # IMPORTANTE: Preservar dívidas iniciais cadastradas manualmente
-        # A dívida total = dívida inicial (campo initial_debt) + pagamentos fiados
-        from clients.models import Client
-        
-        # Buscar o cliente atual para obter a dívida inicial
-        client_atual = Client.objects.get(pk=self.client.pk)
-        divida_inicial = client_atual.initial_debt or Decimal('0.00')
-        
-        # A dívida final é a soma da dívida inicial + pagamentos fiados
-        # Isso garante que dívidas iniciais cadastradas manualmente sejam preservadas
-        # IMPORTANTE: Incluir TODOS os centavos, mesmo 0.01
-        divida_final = (divida_inicial + pagamentos_fiado_total).quantize(Decimal('0.01'))
-
-        # Atualizar a dívida do cliente
-        Client.objects.filter(pk=self.client.pk).update(
-            client_debts=divida_final
-        )
-        # Recarregar o cliente para garantir sincronização
-        self.client.refresh_from_db()
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.status == self.STATUS_FINALIZED:
+                # Retirar a venda dos resumos diários (vale para a view de
+                # exclusão e para o admin)
+                from dashboard.rollups import apply_sale
+
+                apply_sale(self, sign=-1)
+            # Os pagamentos saem em cascata (sem Payment.delete); estornar
+            # os fiados da conta do cliente
+            if self.client_id:
+                from clients.ledger import record_debt
+                from clients.models import DebtLedgerEntry
+
+                fiado = self.payments.fiado().aggregate(total=Sum('amount'))
+                record_debt(
+                    self.client_id,
+                    -(fiado['total'] or 0),
+                    DebtLedgerEntry.KIND_REVERSAL,
+                    note=f'Venda #{self.pk} excluída',
+                )
+            return super().delete(*args, **kwargs)
 
     def finalize_and_reserve_stock(self, skip_debt_update=False):
         """
         Finaliza a venda. O estoque já foi reservado quando os itens foram adicionados.
         
         Args:
-            skip_debt_update: Se True, não atualiza o cache da dívida do cliente.
-                             Mantido para compatibilidade, mas não é mais necessário
-                             já que sempre recalculamos do zero sem duplicação.
+            skip_debt_update: Mantido para compatibilidade; a dívida do cliente
+                             é atualizada pelos próprios pagamentos fiados
+                             (clients.ledger), independente do status.
         """
         if self.status != self.STATUS_OPEN:
             return
@@ -156,20 +164,28 @@ class Sale(models.Model):
             # Apenas mudar o status para finalizada
             sale_locked.status = self.STATUS_FINALIZED
             sale_locked.save(update_fields=['status', 'updated_at'])
-            # Sempre recalcular a dívida (não há mais duplicação pois recalculamos do zero)
-            if not skip_debt_update:
-                sale_locked.update_client_debt_cache()
+            # Contabilizar a venda nos resumos diários do dashboard
+            from dashboard.rollups import apply_sale
+
+            apply_sale(sale_locked)
 
     def cancel(self):
         if self.status == self.STATUS_CANCELLED:
             return
         with transaction.atomic():
-            for item in self.items.select_related('product'):
-                item.product.quantity += item.quantity
-                item.product.save(update_fields=['quantity'])
+            if self.status == self.STATUS_FINALIZED:
+                # Retirar a venda dos resumos diários do dashboard
+                from dashboard.rollups import apply_sale
+
+                apply_sale(self, sign=-1)
+            from products.models import StockMovement
+            from products.stock import return_stock, sale_lines
+
+            return_stock(
+                sale_lines(self), StockMovement.KIND_CANCEL, sale_id=self.pk
+            )
             self.status = self.STATUS_CANCELLED
             self.save(update_fields=['status', 'updated_at'])
-            self.update_client_debt_cache()
 
     def reopen(self):
         if self.status not in [self.STATUS_CANCELLED, self.STATUS_FINALIZED]:
@@ -178,19 +194,25 @@ class Sale(models.Model):
             if self.status == self.STATUS_CANCELLED:
                 # Se estava cancelada, o estoque já foi devolvido no cancel()
                 # Agora precisamos reservar novamente ao reabrir
-                for item in self.items.select_related('product'):
-                    if item.product.quantity < item.quantity:
-                        raise ValueError(
-                            f'Estoque insuficiente para {item.product.name} '
-                            f'({item.product.quantity} disponível, {item.quantity} solicitado).'
-                        )
-                    item.product.quantity -= item.quantity
-                    item.product.save(update_fields=['quantity'])
+                # (InsufficientStock, um ValueError, se faltar estoque)
+                from products.models import StockMovement
+                from products.stock import sale_lines, take_stock
+
+                take_stock(
+                    sale_lines(self),
+                    StockMovement.KIND_REOPEN,
+                    sale_id=self.pk,
+                )
+            else:
+                # Retirar a venda dos resumos diários; ela volta a ser
+                # contabilizada quando for finalizada novamente
+                from dashboard.rollups import apply_sale
+
+                apply_sale(self, sign=-1)
             # Se estava finalizada, o estoque já está reservado, não precisa fazer nada
             # Apenas mudar o status para aberta
             self.status = self.STATUS_OPEN
             self.save(update_fields=['status', 'updated_at'])
-            self.update_client_debt_cache()
 
     def apply_payment(self, amount, method=None, note=None):
         if amount <= 0:
@@ -237,32 +259,85 @@ class Sale(models.Model):
             # IMPORTANTE: Recarregar a venda do banco para garantir que o pagamento foi salvo
             sale_locked.refresh_from_db()
 
-            # IMPORTANTE: NÃO adicionar manualmente pagamentos fiados à dívida
-            # A dívida será recalculada do zero pelo update_client_debt_cache()
-            # Isso garante que não há duplicação
+            # Pagamentos fiados entram na dívida do cliente pelo próprio
+            # Payment.save (lançamento no extrato de dívidas)
 
             # Recalcular o valor pago e o saldo após criar o pagamento
             sale_locked.refresh_from_db()
             current_balance = sale_locked.balance
 
-            # Verificar se é pagamento fiado
-            is_fiado = method and method.strip().lower() == 'fiado'
-
             # Só finalizar se o saldo for zero ou negativo (tudo foi pago, incluindo centavos)
             # Não usar tolerância - o saldo deve ser exatamente zero ou negativo
             if current_balance <= Decimal('0.00'):
-                # Finalizar a venda
-                # Se o último pagamento foi fiado, a dívida já será recalculada no finalize
-                # Se não foi fiado, também será recalculada
-                sale_locked.finalize_and_reserve_stock(skip_debt_update=False)
-            else:
-                # Se não finalizou, recalcular a dívida apenas se o pagamento foi fiado
-                # Se foi pagamento não-fiado, não precisa recalcular (não afeta a dívida)
-                if is_fiado:
-                    # Garantir que o cliente está atualizado antes de calcular a dívida
-                    if sale_locked.client:
-                        sale_locked.client.refresh_from_db()
-                    sale_locked.update_client_debt_cache()
+                sale_locked.finalize_and_reserve_stock()
+
+    def add_items(self, lines):
+        """
+        Adiciona vários produtos de uma vez (ex.: carrinho do leitor de
+        código de barras). `lines` é um dict {product_id: quantidade}.
+
+        Tudo acontece em uma transação: o estoque de todos os produtos é
+        baixado em um único UPDATE condicional (products.stock) e os itens
+        são gravados em lote. Nada é gravado se algum produto não existir
+        ou não tiver estoque suficiente.
+        """
+        from products.models import Product
+        from products.stock import take_stock
+
+        if not lines:
+            raise ValueError('Nenhum item informado.')
+        if any(quantity <= 0 for quantity in lines.values()):
+            raise ValueError('Quantidade inválida.')
+
+        with transaction.atomic():
+            sale_locked = Sale.objects.select_for_update().get(pk=self.pk)
+            if sale_locked.status != self.STATUS_OPEN:
+                raise ValueError('Venda não está aberta.')
+
+            products = {
+                product.pk: product
+                for product in Product.objects.filter(pk__in=lines).only(
+                    'pk', 'name', 'sale_price'
+                )
+            }
+            missing = sorted(set(lines) - set(products))
+            if missing:
+                raise ValueError(
+                    'Produto(s) não encontrado(s): '
+                    + ', '.join(str(pk) for pk in missing)
+                )
+            # Baixa condicional de todos os produtos em um único UPDATE
+            take_stock(lines, sale_id=self.pk)
+
+            existing = {
+                item.product_id: item
+                for item in SaleItem.objects.select_for_update().filter(
+                    sale=sale_locked, product_id__in=lines
+                )
+            }
+            new_items, updated_items = [], []
+            total_diff = Decimal('0.00')
+            for pk, product in products.items():
+                quantity = lines[pk]
+                item = existing.get(pk)
+                if item is not None:
+                    item.quantity += quantity
+                    updated_items.append(item)
+                else:
+                    item = SaleItem(
+                        sale=sale_locked,
+                        product=product,
+                        quantity=quantity,
+                        price=Decimal(str(product.sale_price)).quantize(
+                            Decimal('0.01')
+                        ),
+                    )
+                    new_items.append(item)
+                total_diff += item.price * quantity
+
+            SaleItem.objects.bulk_create(new_items)
+            SaleItem.objects.bulk_update(updated_items, ['quantity'])
+            Sale.add_to_totals(self.pk, total=total_diff)
 
 
 class SaleItem(models.Model):
@@ -293,24 +368,97 @@ class SaleItem(models.Model):
             
             creating = self.pk is None
             if not creating:
-                old = SaleItem.objects.select_for_update().get(pk=self.pk)
+                # A venda vem junto (status para os resumos, sem outra
+                # consulta)
+                old = (
+                    SaleItem.objects.select_for_update()
+                    .select_related('sale')
+                    .get(pk=self.pk)
+                )
                 diff = self.quantity - old.quantity
             else:
                 diff = self.quantity
 
-            super().save(*args, **kwargs)
-            if creating or diff > 0:
-                to_sub = diff if not creating else self.quantity
-                self.product.quantity = max(self.product.quantity - to_sub, 0)
+            if creating:
+                total_diff = self.price * self.quantity
+            else:
+                total_diff = (
+                    self.price * self.quantity - old.price * old.quantity
+                )
+
+            from products.stock import return_stock, take_stock
+
+            # Baixa condicional: InsufficientStock se faltar estoque
+            if diff > 0:
+                take_stock({self.product_id: diff}, sale_id=self.sale_id)
             elif diff < 0:
-                self.product.quantity += abs(diff)
-            self.product.save(update_fields=['quantity'])
+                return_stock(
+                    {self.product_id: -diff}, sale_id=self.sale_id
+                )
+            super().save(*args, **kwargs)
+            if total_diff:
+                Sale.add_to_totals(self.sale_id, total=total_diff)
+            if diff or total_diff:
+                sale = self._finalized_sale(None if creating else old.sale)
+                if sale is not None:
+                    # Edição pelo inline do admin: ajustar os resumos
+                    from dashboard.rollups import apply_sale_item
+
+                    if not creating:
+                        apply_sale_item(
+                            sale,
+                            old.product_id,
+                            old.quantity,
+                            old.price,
+                            sign=-1,
+                        )
+                    apply_sale_item(
+                        sale, self.product_id, self.quantity, self.price
+                    )
 
     def delete(self, *args, **kwargs):
         with transaction.atomic():
-            self.product.quantity += self.quantity
-            self.product.save(update_fields=['quantity'])
-            super().delete(*args, **kwargs)
+            from products.stock import return_stock
+
+            return_stock(
+                {self.product_id: self.quantity}, sale_id=self.sale_id
+            )
+            Sale.add_to_totals(self.sale_id, total=-self.price * self.quantity)
+            sale = self._finalized_sale()
+            if sale is not None:
+                from dashboard.rollups import apply_sale_item
+
+                apply_sale_item(
+                    sale, self.product_id, self.quantity, self.price, sign=-1
+                )
+            return super().delete(*args, **kwargs)
+
+    def _finalized_sale(self, sale=None):
+        """A venda, se já estiver finalizada (contabilizada nos resumos)"""
+        if sale is None and SaleItem.sale.is_cached(self):
+            sale = self.sale
+        if sale is None:
+            return (
+                Sale.objects.filter(
+                    pk=self.sale_id, status=Sale.STATUS_FINALIZED
+                )
+                .only('pk', 'created_at')
+                .first()
+            )
+        return sale if sale.status == Sale.STATUS_FINALIZED else None
+
+
+class PaymentQuerySet(models.QuerySet):
+    def fiado(self):
+        """
+        Pagamentos fiados (método "fiado", sem diferenciar maiúsculas).
+
+        Filtra por Lower('method') em vez de method__iexact para usar o
+        índice funcional payment_sale_method_lower_idx.
+        """
+        return self.alias(method_lower=Lower('method')).filter(
+            method_lower='fiado'
+        )
 
 
 class Payment(models.Model):
@@ -322,5 +470,69 @@ class Payment(models.Model):
     note = models.CharField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PaymentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                'sale',
+                Lower('method'),
+                name='payment_sale_method_lower_idx',
+            ),
+        ]
+
     def __str__(self):
         return f'R${self.amount} - Venda #{self.sale_id}'
+
+    @property
+    def is_fiado(self):
+        # Mesmo critério de PaymentQuerySet.fiado()
+        return (self.method or '').lower() == 'fiado'
+
+    @property
+    def debt_amount(self):
+        """Quanto este pagamento soma na dívida do cliente"""
+        return self.amount if self.is_fiado else 0
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            if self.pk is None:
+                paid_diff = self.amount
+                debt_diff = self.debt_amount
+            elif update_fields is None or {'amount', 'method'} & set(
+                update_fields
+            ):
+                old = Payment.objects.select_for_update().get(pk=self.pk)
+                paid_diff = self.amount - old.amount
+                debt_diff = self.debt_amount - old.debt_amount
+            else:
+                paid_diff = debt_diff = 0
+
+            super().save(*args, **kwargs)
+            if paid_diff:
+                Sale.add_to_totals(self.sale_id, paid=paid_diff)
+            if debt_diff:
+                from clients.ledger import record_payment_debt
+                from clients.models import DebtLedgerEntry
+
+                # Fiado que deixa de ser devido (ou diminui) é quitação
+                record_payment_debt(
+                    self,
+                    debt_diff,
+                    DebtLedgerEntry.KIND_SETTLEMENT
+                    if debt_diff < 0
+                    else DebtLedgerEntry.KIND_FIADO,
+                )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            Sale.add_to_totals(self.sale_id, paid=-self.amount)
+            if self.debt_amount:
+                from clients.ledger import record_payment_debt
+                from clients.models import DebtLedgerEntry
+
+                record_payment_debt(
+                    self, -self.debt_amount, DebtLedgerEntry.KIND_REVERSAL
+                )
+            return super().delete(*args, **kwargs)
@@ -1,3 +1,181 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.models import DailyProductSales, DailySalesSummary
+from products.models import Product
+from sales.models import Sale, SaleItem
+from sales.views import SALE_LIST_PAGE_SIZE, _parse_cursor
+
+
+class SaleItemAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser('admin', password='x')
+        )
+        self.product = Product.objects.create(
+            name='Camisa', sale_price=10, cost_price=5, quantity=3
+        )
+        self.sale = Sale.objects.create()
+        self.sale.add_items({self.product.pk: 2})
+        self.item = SaleItem.objects.get(sale=self.sale)
+
+    def post_quantity(self, quantity):
+        return self.client.post(
+            reverse('admin:sales_sale_change', args=[self.sale.pk]),
+            {
+                'client_name': '',
+                'status': Sale.STATUS_OPEN,
+                'items-TOTAL_FORMS': 1,
+                'items-INITIAL_FORMS': 1,
+                'items-0-id': self.item.pk,
+                'items-0-sale': self.sale.pk,
+                'items-0-product': self.product.pk,
+                'items-0-quantity': quantity,
+                'payments-TOTAL_FORMS': 0,
+                'payments-INITIAL_FORMS': 0,
+            },
+        )
+
+    def test_quantity_above_stock_is_a_form_error(self):
+        # 2 reservados + 1 em estoque: 4 passa do disponível
+        response = self.post_quantity(4)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Estoque insuficiente')
+        self.item.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.item.quantity, self.product.quantity), (2, 1))
+
+    def test_quantity_within_stock_is_saved(self):
+        response = self.post_quantity(3)
+
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.item.quantity, self.product.quantity), (3, 0))
+
+
+class SaleRollupTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Camisa',
+            sale_price=Decimal('10.00'),
+            cost_price=Decimal('5.00'),
+            quantity=10,
+            low_quantity=1,
+        )
+        self.sale = Sale.objects.create()
+        self.sale.add_items({self.product.pk: 2})
+        self.sale.finalize_and_reserve_stock()
+        self.sale.refresh_from_db()
+
+    def summary(self):
+        return DailySalesSummary.objects.get(date=timezone.localdate())
+
+    def product_row(self):
+        return DailyProductSales.objects.get(
+            date=timezone.localdate(), product=self.product
+        )
+
+    def assertRollups(self, count, total, quantity):
+        summary = self.summary()
+        self.assertEqual(
+            (summary.sales_count, summary.sales_total, summary.items_quantity),
+            (count, Decimal(total), quantity),
+        )
+        row = self.product_row()
+        self.assertEqual((row.quantity, row.total), (quantity, Decimal(total)))
+
+    def test_finalize_counts_sale(self):
+        self.assertRollups(1, '20.00', 2)
+
+    def test_delete_removes_finalized_sale(self):
+        self.sale.delete()
+
+        self.assertRollups(0, '0.00', 0)
+
+    def test_admin_bulk_delete_removes_finalized_sale(self):
+        request = RequestFactory().post('/')
+        site._registry[Sale].delete_queryset(
+            request, Sale.objects.filter(pk=self.sale.pk)
+        )
+
+        self.assertFalse(Sale.objects.exists())
+        self.assertRollups(0, '0.00', 0)
+
+    def test_item_edits_on_finalized_sale_update_rollups(self):
+        item = SaleItem.objects.get(sale=self.sale)
+        item.quantity = 3
+        item.save()
+        self.assertRollups(1, '30.00', 3)
+
+        item.delete()
+        self.assertRollups(1, '0.00', 0)
+
+    def test_item_edits_on_open_sale_do_not_touch_rollups(self):
+        self.sale.reopen()
+        item = SaleItem.objects.get(sale=self.sale)
+        item.quantity = 1
+        item.save()
+
+        self.assertRollups(0, '0.00', 0)
+
+
+class SaleListCursorTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('caixa'))
+        Sale.objects.bulk_create(
+            Sale(status=Sale.STATUS_FINALIZED) for _ in range(60)
+        )
+        # Metade das vendas no mesmo instante: o id desempata
+        now = timezone.now()
+        pks = list(Sale.objects.order_by('pk').values_list('pk', flat=True))
+        Sale.objects.filter(pk__in=pks[:30]).update(created_at=now)
+        for offset, pk in enumerate(pks[30:], start=1):
+            Sale.objects.filter(pk=pk).update(
+                created_at=now - timedelta(minutes=offset)
+            )
+        self.expected = list(
+            Sale.objects.order_by('-created_at', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def pages(self, query=''):
+        url = reverse('sale_list_page')
+        seen = []
+        while query is not None:
+            response = self.client.get(f'{url}?{query}')
+            page = [sale.pk for sale in response.context['sales']]
+            self.assertLessEqual(len(page), SALE_LIST_PAGE_SIZE)
+            seen += page
+            query = response.context['next_query']
+        return seen
+
+    def test_pages_follow_created_at_and_id(self):
+        self.assertEqual(self.pages(), self.expected)
+
+    def test_cursor_keeps_filters(self):
+        Sale.objects.filter(pk__in=self.expected[::2]).update(
+            status=Sale.STATUS_OPEN
+        )
+
+        self.assertEqual(self.pages('status=open'), self.expected[::2])
+
+    def test_invalid_cursor_is_first_page(self):
+        self.assertIsNone(_parse_cursor('lixo'))
+        self.assertIsNone(_parse_cursor('2026-01-01T00:00:00_x'))
+        response = self.client.get(
+            reverse('sale_list_page'), {'cursor': 'lixo'}
+        )
+        self.assertTrue(response.context['is_first_page'])
+        self.assertEqual(
+            [sale.pk for sale in response.context['sales']],
+            self.expected[:SALE_LIST_PAGE_SIZE],
+        )
@@ -4,7 +4,11 @@ from . import views
 
 urlpatterns = [
     path('', views.sale_list, name='sale_list'),
+    path('page/', views.sale_list_page, name='sale_list_page'),
     path('create/', views.sale_create, name='sale_create'),
+    path(
+        'exportar/<str:kind>/', views.export_sales, name='export_sales'
+    ),
     path('<int:sale_id>/', views.sale_detail, name='sale_detail'),
     path(
         '<int:sale_id>/header/',
@@ -17,6 +21,7 @@ urlpatterns = [
         name='pay_modal_fragment',
     ),
     path('<int:sale_id>/add-item/', views.add_item, name='add_item'),
+    path('<int:sale_id>/add-items/', views.add_items, name='add_items'),
     path('<int:sale_id>/pay/', views.pay_sale, name='pay_sale'),
     path('<int:sale_id>/cancel/', views.cancel_sale, name='cancel_sale'),
     path('<int:sale_id>/reopen/', views.reopen_sale, name='reopen_sale'),
@@ -1,23 +1,122 @@
+import json
 from decimal import Decimal, InvalidOperation
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.decorators.http import require_POST
-from django.http import HttpResponseBadRequest
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
 from django.db import transaction
 from django.db.models import Q, F
+from django.utils.dateparse import parse_date, parse_datetime
+from .exports import EXPORTS, export_filename, iter_export_csv
 from .models import Sale, SaleItem
-from products.models import Product
+from products.models import Product, StockMovement
+from products.search import search_catalog
+from products.stock import InsufficientStock, return_stock, sale_lines
 from clients.models import Client
+from core.shortcuts import aget_object_or_404
+from dashboard.reports import parse_report_period
 from django.contrib.auth.decorators import login_required
 
+SALE_LIST_PAGE_SIZE = 25
+PRODUCT_PICKER_PAGE_SIZE = 20
+
+
+def _filtered_sales(params):
+    """Vendas filtradas por status, período (created_at) e cliente"""
+    sales = Sale.objects.select_related('client')
+
+    status = params.get('status', '')
+    if status in dict(Sale.STATUS_CHOICES):
+        sales = sales.filter(status=status)
+
+    for param, lookup in (
+        ('date_from', 'created_at__date__gte'),
+        ('date_to', 'created_at__date__lte'),
+    ):
+        day = parse_date(params.get(param) or '')
+        if day:
+            sales = sales.filter(**{lookup: day})
+
+    client_id = params.get('client', '')
+    if client_id.isdigit():
+        sales = sales.filter(client_id=int(client_id))
+
+    return sales.order_by('-created_at', '-id')
+
+
+def _parse_cursor(value):
+    """Cursor no formato '<created_at ISO>_<id>' da última venda exibida"""
+    created_at, _, pk = (value or '').rpartition('_')
+    created_at = parse_datetime(created_at)
+    if created_at is None or not pk.isdigit():
+        return None
+    return created_at, int(pk)
+
+
+def _sale_list_page(request):
+    """
+    Uma página da lista de vendas usando paginação por cursor (keyset).
+
+    Em vez de OFFSET, cada página continua a partir de (created_at, id) da
+    última venda exibida, então o custo é o mesmo em qualquer página.
+    """
+    sales = _filtered_sales(request.GET)
+    cursor = _parse_cursor(request.GET.get('cursor'))
+    if cursor:
+        created_at, pk = cursor
+        sales = sales.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    page = list(sales[: SALE_LIST_PAGE_SIZE + 1])
+    next_query = None
+    if len(page) > SALE_LIST_PAGE_SIZE:
+        page = page[:SALE_LIST_PAGE_SIZE]
+        last = page[-1]
+        params = request.GET.copy()
+        params['cursor'] = f'{last.created_at.isoformat()}_{last.pk}'
+        next_query = params.urlencode()
+
+    return {
+        'sales': page,
+        'next_query': next_query,
+        'is_first_page': cursor is None,
+    }
+
+
 @login_required
 def sale_list(request):
-    sales = Sale.objects.all().order_by('-created_at')
+    context = _sale_list_page(request)
+    context.update(
+        {
+            'section_name': 'Lista de Vendas',
+            'clients': Client.objects.only('client_id', 'name').order_by(
+                'name'
+            ),
+            'status_choices': Sale.STATUS_CHOICES,
+            'filters': request.GET,
+            'export_kinds': [
+                ('vendas', 'Vendas'),
+                ('itens', 'Itens vendidos'),
+                ('pagamentos', 'Pagamentos'),
+            ],
+        }
+    )
+    return render(request, 'sale_list.html', context)
+
+
+@login_required
+def sale_list_page(request):
+    """Fragmento HTMX com a próxima página da lista (scroll infinito)"""
     return render(
-        request,
-        'sale_list.html',
-        {'sales': sales, 'section_name': 'Lista de Vendas'},
+        request, 'partials/sale_list_rows.html', _sale_list_page(request)
     )
 
+
 @login_required
 def sale_create(request):
     clients = Client.objects.all()
@@ -57,15 +156,18 @@ def _get_header_color_for_sale(sale):
     )
 
 
+def _load_sale(sale_id):
+    """Venda com cliente e itens para renderizar os fragmentos da venda"""
+    return get_object_or_404(Sale.objects.with_items(), pk=sale_id)
+
+
 def sale_detail(request, sale_id):
-    sale = get_object_or_404(Sale, pk=sale_id)
+    sale = _load_sale(sale_id)
     header_color = _get_header_color_for_sale(sale)
 
-    products = Product.objects.filter(quantity__gt=0).order_by('name')
-
+    # Os produtos são carregados pela busca do modal (search_products)
     context = {
         'sale': sale,
-        'products': products,
         'header_color': header_color,
         'section_name': 'Detalhes Da Comanda',
     }
@@ -76,15 +178,17 @@ def sale_detail(request, sale_id):
     return render(request, 'sale_detail.html', context)
 
 
-def sale_header_fragment(request, sale_id):
-    sale = get_object_or_404(Sale, pk=sale_id)
+async def sale_header_fragment(request, sale_id):
+    sale = await aget_object_or_404(
+        Sale.objects.select_related('client'), pk=sale_id
+    )
     return render(
         request, 'partials/sale_header_fragment.html', {'sale': sale}
     )
 
 
-def pay_modal_fragment(request, sale_id):
-    sale = get_object_or_404(Sale, pk=sale_id)
+async def pay_modal_fragment(request, sale_id):
+    sale = await aget_object_or_404(Sale, pk=sale_id)
     return render(request, 'partials/modals/pay_modal.html', {'sale': sale})
 
 
@@ -108,42 +212,87 @@ def add_item(request, sale_id):
     except ValueError:
         return HttpResponseBadRequest('Quantidade inválida.')
 
-    with transaction.atomic():
+    try:
+        product = Product.objects.get(product_id=int(product_id))
+    except Product.DoesNotExist:
+        return HttpResponseBadRequest('Produto não encontrado.')
 
-        try:
-            product = Product.objects.select_for_update().get(
-                product_id=int(product_id)
+    try:
+        with transaction.atomic():
+            sale_item = (
+                SaleItem.objects.select_for_update()
+                .filter(sale=sale, product=product)
+                .first()
             )
-        except Product.DoesNotExist:
-            return HttpResponseBadRequest('Produto não encontrado.')
 
-        if product.quantity < quantity:
-            return HttpResponseBadRequest('Estoque insuficiente.')
+            # O save() do model baixa o estoque com um UPDATE condicional
+            # (products.stock) e levanta InsufficientStock se faltar
+            if sale_item:
+                # Atualizar quantidade existente
+                sale_item.quantity += quantity
+                sale_item.save()
+            else:
+                # Criar novo item
+                # Garantir que o preço tenha exatamente 2 casas decimais
+                price = Decimal(str(product.sale_price)).quantize(
+                    Decimal('0.01')
+                )
+                sale_item = SaleItem.objects.create(
+                    sale=sale,
+                    product=product,
+                    quantity=quantity,
+                    price=price,
+                )
+    except InsufficientStock:
+        return HttpResponseBadRequest('Estoque insuficiente.')
+
+    sale = _load_sale(sale_id)
+    return render(request, 'partials/sale_items_fragment.html', {'sale': sale})
 
-        sale_item = (
-            SaleItem.objects.select_for_update()
-            .filter(sale=sale, product=product)
-            .first()
-        )
 
-        if sale_item:
-            # Atualizar quantidade existente - o método save() do model vai gerenciar o estoque
-            sale_item.quantity += quantity
-            sale_item.save()
-        else:
-            # Criar novo item - o método save() do model vai gerenciar o estoque
-            # Garantir que o preço tenha exatamente 2 casas decimais
-            from decimal import Decimal
-            price = Decimal(str(product.sale_price)).quantize(Decimal('0.01'))
-            sale_item = SaleItem.objects.create(
-                sale=sale,
-                product=product,
-                quantity=quantity,
-                price=price,
-            )
+def _parse_cart(request):
+    """
+    Lê o carrinho enviado em JSON ({"items": [{"product_id", "quantity"}]})
+    ou em campos de formulário repetidos (product_id / quantity).
+    Produtos repetidos (leituras seguidas do mesmo código) são somados.
+    """
+    if request.content_type == 'application/json':
+        try:
+            items = json.loads(request.body or b'{}').get('items') or []
+            pairs = [
+                (item['product_id'], item.get('quantity', 1)) for item in items
+            ]
+        except (ValueError, AttributeError, TypeError, KeyError):
+            raise ValueError('Carrinho inválido.')
+    else:
+        product_ids = request.POST.getlist('product_id')
+        quantities = request.POST.getlist('quantity')
+        if quantities and len(quantities) != len(product_ids):
+            raise ValueError('Carrinho inválido.')
+        pairs = zip(product_ids, quantities or ['1'] * len(product_ids))
+
+    lines = {}
+    for product_id, quantity in pairs:
+        try:
+            product_id, quantity = int(product_id), int(quantity)
+        except (TypeError, ValueError):
+            raise ValueError('Item inválido no carrinho.')
+        if quantity <= 0:
+            raise ValueError('Quantidade inválida.')
+        lines[product_id] = lines.get(product_id, 0) + quantity
+    return lines
+
 
-    sale.refresh_from_db()
+@require_POST
+def add_items(request, sale_id):
+    """Adiciona um carrinho inteiro à venda em uma única transação"""
+    sale = get_object_or_404(Sale, pk=sale_id)
+    try:
+        sale.add_items(_parse_cart(request))
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
 
+    sale = _load_sale(sale_id)
     return render(request, 'partials/sale_items_fragment.html', {'sale': sale})
 
 
@@ -161,7 +310,7 @@ def remove_item(request, sale_id, item_id):
     with transaction.atomic():
         item.delete()
 
-    sale.refresh_from_db()
+    sale = _load_sale(sale_id)
     return render(request, 'partials/sale_items_fragment.html', {'sale': sale})
 
 
@@ -204,8 +353,7 @@ def pay_sale(request, sale_id):
     except ValueError as e:
         return HttpResponseBadRequest(str(e))
 
-    sale.refresh_from_db()
-
+    sale = _load_sale(sale_id)
     return render(
         request,
         'partials/sale_items_fragment.html',
@@ -232,22 +380,35 @@ def pix_qr(request, sale_id):
     return render(request, 'partials/pix_qr.html', context)
 
 
-def search_products(request, sale_id):
+async def search_products(request, sale_id):
+    """
+    Página do seletor de produtos do modal "Adicionar Item", carregada só
+    quando o modal abre; as páginas seguintes vêm ao rolar a lista.
+    """
     query = (request.GET.get('search') or '').strip()
-    sale = get_object_or_404(Sale, pk=sale_id)
-    if query:
-        products = Product.objects.filter(
-            Q(name__icontains=query) & Q(quantity__gt=0) & Q(is_active=True)
-        ).order_by('name')[:20]
-    else:
-        products = Product.objects.filter(
-            quantity__gt=0, is_active=True
-        ).order_by('name')[:20]
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    sale = await aget_object_or_404(Sale, pk=sale_id)
+    # Catálogo em memória: não consulta a tabela de produtos (a não ser
+    # para sincronizar, por isso fora do event loop)
+    products, has_more = await sync_to_async(search_catalog)(
+        query,
+        limit=PRODUCT_PICKER_PAGE_SIZE,
+        offset=(page - 1) * PRODUCT_PICKER_PAGE_SIZE,
+    )
 
     return render(
         request,
         'partials/search_results_fragment.html',
-        {'products': products, 'sale': sale},
+        {
+            'products': products,
+            'sale': sale,
+            'search': query,
+            'page': page,
+            'next_page': page + 1 if has_more else None,
+        },
     )
 
 
@@ -258,11 +419,10 @@ def cancel_sale(request, sale_id):
         sale.cancel()
     except Exception as e:
         return HttpResponseBadRequest(str(e))
-    products = Product.objects.filter(quantity__gt=0).order_by('name')
     return render(
         request,
         'partials/sale_detail_fragment.html',
-        {'sale': sale, 'products': products},
+        {'sale': _load_sale(sale_id)},
     )
 
 
@@ -273,11 +433,10 @@ def reopen_sale(request, sale_id):
         sale.reopen()
     except Exception as e:
         return HttpResponseBadRequest(str(e))
-    products = Product.objects.filter(quantity__gt=0).order_by('name')
     return render(
         request,
         'partials/sale_detail_fragment.html',
-        {'sale': sale, 'products': products},
+        {'sale': _load_sale(sale_id)},
     )
 
 
@@ -286,8 +445,25 @@ def delete_sale(request, sale_id):
     sale = get_object_or_404(Sale, pk=sale_id)
     with transaction.atomic():
         if sale.status == Sale.STATUS_FINALIZED:
-            for item in sale.items.select_related('product'):
-                item.product.quantity += item.quantity
-                item.product.save(update_fields=['quantity'])
+            return_stock(
+                sale_lines(sale),
+                StockMovement.KIND_SALE_DELETE,
+                sale_id=sale.pk,
+            )
         sale.delete()
     return redirect('sale_list')
+
+
+@login_required
+def export_sales(request, kind):
+    """Exporta vendas, itens ou pagamentos do período em CSV (streaming)"""
+    if kind not in EXPORTS:
+        raise Http404('Exportação desconhecida.')
+    start_date, end_date = parse_report_period(request.GET)
+    filename = export_filename(kind, start_date, end_date)
+    response = StreamingHttpResponse(
+        iter_export_csv(kind, start_date, end_date),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response